@@ -1,13 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import scan, history
+from app.routers import scan, history, metrics, stats, health
+from app.routers.scan import ScanAdmissionMiddleware, UploadLimitMiddleware
+from app.utils.jobs import resume_pending_jobs
+from app.utils.pool import start_pool, stop_pool
+from app.utils.runner import load_tool_inventory
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reanuda los análisis en segundo plano pendientes (si JOB_PERSIST=1)
+    resume_pending_jobs()
+    # Rutas y versiones de las herramientas, en segundo plano para no retrasar
+    # el arranque; /health informa de ellas cuando están resueltas
+    inventory = asyncio.ensure_future(load_tool_inventory())
+    # Arranca los backends de larga duración (servidor trivy, si se configura)
+    await start_pool()
+    yield
+    inventory.cancel()
+    await stop_pool()
 
 app = FastAPI(
     title="Auditor Docker/K8s",
     description="API para analizar configuraciones de Docker y Kubernetes",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+# Control de admisión y límite del cuerpo de las subidas, antes de recibir
+# el formulario (el último añadido se ejecuta primero: el 413 no espera turno)
+app.add_middleware(ScanAdmissionMiddleware)
+app.add_middleware(UploadLimitMiddleware)
+
 # Middleware CORS para permitir conexión desde React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -24,3 +49,6 @@ def root():
 
 app.include_router(scan.router)
 app.include_router(history.router)
+app.include_router(metrics.router)
+app.include_router(stats.router)
+app.include_router(health.router)
@@ -0,0 +1,64 @@
+"""
+maintenance.py
+
+Mantenimiento del historial (ejecutar desde backend/):
+
+    python -m app.maintenance prune [--max-age-days 90] [--max-entries 100000] [--job-ttl 3600]
+    python -m app.maintenance compact
+    python -m app.maintenance prune --max-age-days 90 --compact
+
+prune borra los análisis más antiguos según la retención indicada (por
+defecto HISTORY_MAX_AGE_DAYS y HISTORY_MAX_ENTRIES) y compact recomprime los
+blobs, borra los que no se usan y devuelve el espacio al disco (ver
+app.utils.storage). prune borra además los trabajos en segundo plano
+terminados hace más de --job-ttl segundos (por defecto JOB_TTL).
+"""
+
+import argparse
+import json
+import os
+
+from app.utils import storage
+
+HISTORY_MAX_AGE_DAYS = os.getenv("HISTORY_MAX_AGE_DAYS")
+HISTORY_MAX_ENTRIES = os.getenv("HISTORY_MAX_ENTRIES")
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+
+
+def prune(args):
+    deleted = storage.prune_results(args.max_age_days, args.max_entries)
+    deleted_jobs = storage.prune_jobs(args.job_ttl)
+    print(json.dumps({"deleted": deleted, "deleted_jobs": deleted_jobs}))
+    if args.compact:
+        compact(args)
+
+
+def compact(args):
+    print(json.dumps(storage.compact()))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance", description="Mantenimiento del historial")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prune_parser = commands.add_parser("prune", help="Borra los análisis fuera de la retención")
+    prune_parser.add_argument("--max-age-days", type=float,
+                              default=float(HISTORY_MAX_AGE_DAYS) if HISTORY_MAX_AGE_DAYS else None,
+                              help="Borra los análisis con más días de antigüedad")
+    prune_parser.add_argument("--max-entries", type=int,
+                              default=int(HISTORY_MAX_ENTRIES) if HISTORY_MAX_ENTRIES else None,
+                              help="Conserva solo los análisis más recientes")
+    prune_parser.add_argument("--job-ttl", type=float, default=JOB_TTL,
+                              help="Borra los trabajos terminados hace más de estos segundos")
+    prune_parser.add_argument("--compact", action="store_true", help="Compacta después de borrar")
+    prune_parser.set_defaults(func=prune)
+
+    compact_parser = commands.add_parser("compact", help="Recomprime, borra blobs sin uso y ejecuta VACUUM")
+    compact_parser.set_defaults(func=compact)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.utils.admission import admission_status
+from app.utils.pool import pool_status
+from app.utils.runner import tool_inventory
+from app.utils.trivy import cached_trivy_db_version
+
+router = APIRouter()
+
+@router.get("/health")
+def get_health():
+    """
+    Endpoint de readiness: estado de las herramientas y de los backends.
+
+    Functionality:
+    ---------------
+    - Solo devuelve datos ya resueltos en memoria (app.utils.runner y
+      app.utils.pool); no lanza ningún proceso.
+    - status:
+        - starting (503): todavía se están resolviendo las herramientas.
+        - degraded (200): falta alguna herramienta o el servidor trivy
+          configurado no responde; los análisis devolverán resultados parciales.
+        - ok (200).
+    - tools: ruta y versión de cada herramienta (path None si no está instalada).
+    - trivy_db: versión de la base de datos de trivy, si ya se ha consultado.
+    - pool: estado del servidor trivy y de la agrupación de linters.
+    - admission: ocupación y cola de cada presupuesto de admisión
+      (app.utils.admission).
+    """
+
+    inventory = tool_inventory()
+    pool = pool_status()
+    trivy_server = pool["trivy_server"]
+    missing = [tool for tool, info in inventory["tools"].items() if info["path"] is None]
+
+    if not inventory["loaded"]:
+        status = "starting"
+    elif missing or (trivy_server["enabled"] and not trivy_server["healthy"]):
+        status = "degraded"
+    else:
+        status = "ok"
+
+    return JSONResponse(status_code=503 if status == "starting" else 200, content={
+        "status": status,
+        "missing_tools": missing,
+        "tools": inventory["tools"],
+        "trivy_db": cached_trivy_db_version(),
+        "pool": pool,
+        "admission": admission_status(),
+    })
@@ -1,28 +1,82 @@
-from fastapi import APIRouter
-from app.utils.storage import load_all_results
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+from app.utils.storage import iter_results, get_result
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+
+def _to_utc_iso(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
 @router.get("/history/")
-def get_history():
+def get_history(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(None, description="id del último análisis de la página anterior"),
+    filename: str | None = None,
+    tool: str | None = None,
+    severity: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fields: str | None = Query(None, description="Campos separados por comas, p.ej. id,timestamp,filename"),
+):
     """
 
     Functionality:
     ---------------
-    Devuelve el historial de análisis previos que han sido guardados en el sistema.
+    Devuelve el historial de análisis previos que han sido guardados en el sistema,
+    paginado y ordenado del más reciente al más antiguo.
 
     Logic:
     -------
-    - Llama a la función load_all_results() del módulo app.utils.storage
-      para cargar todos los resultados almacenados.
-    - Calcula la cantidad total de análisis guardados.
+    - Llama a iter_results() del módulo app.utils.storage, que recorre la base de
+      datos fila a fila aplicando filtros por filename, tool, severity y rango
+      temporal (since/until).
+    - Pide un elemento más que limit para saber si existe una página siguiente.
+    - Si se indica fields, solo devuelve esos campos; con campos de resumen
+      (id, timestamp, filename, tools_run, tool_status, findings_count, severity_counts)
+      no se cargan contenidos ni resultados completos.
     - Devuelve un JSON con:
-        - count: número de resultados encontrados.
-        - history: lista con todos los resultados previos.
+        - count: número de resultados de esta página.
+        - history: lista con los resultados de la página.
+        - next_cursor: valor de cursor para la página siguiente, o None.
     """
 
-    results = load_all_results()
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if field_list is not None and "id" not in field_list:
+        field_list.insert(0, "id")
+
+    page = list(iter_results(
+        limit=limit + 1,
+        before_id=cursor,
+        filename=filename,
+        tool=tool,
+        severity=severity,
+        since=_to_utc_iso(since),
+        until=_to_utc_iso(until),
+        fields=field_list,
+    ))
+    has_more = len(page) > limit
+    page = page[:limit]
+
     return {
-        "count": len(results),
-        "history": results
+        "count": len(page),
+        "history": page,
+        "next_cursor": page[-1]["id"] if has_more else None
     }
+
+@router.get("/history/{entry_id}")
+def get_history_entry(entry_id: int):
+    """
+    Devuelve un análisis completo del historial por su id.
+    """
+
+    entry = get_result(entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Análisis no encontrado")
+    return JSONResponse(entry)
@@ -0,0 +1,26 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import HISTORY_BYTES, HISTORY_ENTRIES, render_metrics
+from app.utils.storage import history_stats
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expone las métricas del pipeline en formato de texto de Prometheus.
+
+    Functionality:
+    ---------------
+    - Actualiza el tamaño del historial (número de análisis y bytes de la
+      base de datos) en el momento de la consulta.
+    - Devuelve todas las métricas de app.utils.metrics: latencia por etapa y
+      por fase de cada herramienta, ejecuciones por estado, hallazgos por
+      herramienta y severidad, consultas a las cachés y análisis en curso.
+    """
+
+    stats = await asyncio.to_thread(history_stats)
+    HISTORY_ENTRIES.set(stats["entries"])
+    HISTORY_BYTES.set(stats["bytes"])
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,181 +1,494 @@
-from fastapi import APIRouter, UploadFile, File
-import subprocess
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import Headers, QueryParams
+import asyncio
+import hashlib
 import tempfile
+import shutil
 import os
 import json
-import re
-from app.utils.parsers import (
-    normalize_hadolint,
-    normalize_trivy,
-    normalize_kubelinter,
-    normalize_dclint,
+from app.utils.admission import AdmissionError, admit, check_admission, scan_slots
+from app.utils.cache import file_hash
+from app.utils.jobs import QueueFullError, get_job, new_job_path, submit
+from app.utils.metrics import server_timing_header, start_request_timing, timed
+from app.utils.pipeline import (
+    analyze_file,
+    detect_linter,
+    is_cached,
+    run_linter,
+    run_linter_batch,
 )
-from app.utils.suggestions import (
-    suggest_remediations_dockerfile,
-    suggest_remediations_docker_compose,
-    suggest_remediations_kubernetes_yaml
-)
-
-from app.utils.storage import save_result
+from app.utils.storage import get_result
 
 router = APIRouter()
 
-def extract_image_name(filename: str, content: str) -> str | None:
+# Tamaño máximo de cada archivo subido (por defecto 20 MB)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Tamaño máximo del cuerpo completo de /scan/batch (por defecto 120 MB)
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(120 * 1024 * 1024)))
+# Margen para las cabeceras y separadores del multipart
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Cada cuántos segundos se comprueba si el cliente sigue conectado
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# Límite del cuerpo de cada endpoint de subida
+BODY_LIMITS = {
+    "/scan/": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "/scan/batch": BATCH_MAX_BYTES + MULTIPART_OVERHEAD_BYTES,
+}
+
+class UploadLimitMiddleware:
+    """
+    Middleware ASGI que limita el tamaño del cuerpo de /scan/ y /scan/batch
+    antes de que se lea: el formulario multipart se recibe (y se vuelca a
+    disco) antes de ejecutar el endpoint, así que _save_upload() no puede
+    evitar que se reciba un archivo demasiado grande.
+
+    - Si Content-Length supera el límite se responde 413 sin leer nada.
+    - Si no hay Content-Length (chunked), se cuentan los bytes recibidos y
+      se corta con 413 al superar el límite.
     """
-    Extrae el nombre de la imagen desde el contenido del archivo, 
-    según del tipo que sea.
 
-    Args:
-    -----------
-    filename : str
-        Nombre del archivo subido.
-    content : str
-        Contenido del archivo.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = BODY_LIMITS.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"La petición supera el máximo de {limit} bytes"
+        length = Headers(scope=scope).get("content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # El endpoint la convierte en la respuesta 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def _save_upload(upload: UploadFile, path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Copia un archivo subido a disco por bloques, sin cargarlo entero en memoria,
+    y calcula su SHA-256 por el camino.
 
     Returns:
     --------
-    str | None
-        El nombre de la imagen encontrada, o None si no se ha detectado.
+    str
+        SHA-256 del contenido.
+
+    Raises:
+    -------
+    HTTPException
+        413 si el archivo supera max_bytes (el archivo parcial se elimina).
+    """
+
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                out.close()
+                os.unlink(path)
+                raise HTTPException(status_code=413, detail=f"El archivo supera el máximo de {max_bytes} bytes")
+            sha256.update(chunk)
+            out.write(chunk)
+    return sha256.hexdigest()
+
+async def _cancel_on_disconnect(request: Request, coro):
+    """
+    Ejecuta una corrutina y la cancela si el cliente se desconecta antes de
+    que termine; al cancelarse se matan los procesos de las herramientas en curso.
+
+    Raises:
+    -------
+    HTTPException
+        499 si el cliente se ha desconectado.
     """
 
-    if "Dockerfile" in filename:
-        match = re.search(r'^FROM\s+([\w\-./:]+)', content, re.MULTILINE)
-    elif filename.endswith(".yaml") or filename.endswith(".yml") or "compose" in filename:
-        match = re.search(r'image:\s*"?([\w\-./:]+)"?', content)
-    else:
-        match = None
-    return match.group(1) if match else None
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="El cliente cerró la conexión")
+    finally:
+        if not task.done():
+            task.cancel()
+
+class ScanAdmissionMiddleware:
+    """
+    Middleware ASGI que aplica el control de admisión (app.utils.admission)
+    a /scan/ y /scan/batch antes de recibir el cuerpo, de modo que un 429 o
+    503 no cuesta la transferencia del archivo.
+
+    - /scan/ (salvo background=true, que espera en la cola de jobs) reserva
+      capacidad según Content-Length y la mantiene hasta que termina de
+      enviarse la respuesta, también en modo stream.
+    - /scan/batch solo comprueba que la cola no esté llena; cada archivo
+      espera después su turno en scan_batch().
+    Los rechazos llevan la cabecera Retry-After.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or scope["method"] != "POST" or path not in ("/scan/", "/scan/batch"):
+            await self.app(scope, receive, send)
+            return
+
+        ticket = None
+        try:
+            if path == "/scan/batch":
+                check_admission()
+            elif QueryParams(scope["query_string"]).get("background", "").lower() not in ("1", "true", "yes", "on"):
+                length = Headers(scope=scope).get("content-length") or ""
+                ticket = await admit(min(int(length), MAX_UPLOAD_BYTES) if length.isdigit() else 0)
+        except AdmissionError as exc:
+            response = JSONResponse(status_code=exc.status_code, content={"detail": str(exc)},
+                                    headers={"Retry-After": str(exc.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+def _format_event(event: dict, stream: str) -> str:
+    if stream == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+async def _stream_scan(filename: str, path: str, digest: str, mode: str, previous: dict | None, stream: str):
+    """
+    Ejecuta analyze_file() y emite sus eventos (progress, tool y result o
+    error) según se producen. Si el cliente se desconecta, el generador se
+    cierra y se cancela el análisis.
+    """
+
+    events = asyncio.Queue()
+
+    def progress(step: str, status: str):
+        events.put_nowait({"event": "progress", "step": step, "status": status})
+
+    def on_step(tool: str, status: str, findings: list):
+        events.put_nowait({"event": "tool", "tool": tool, "status": status, "findings": findings})
+
+    task = asyncio.ensure_future(analyze_file(
+        filename, path, digest, progress=progress, mode=mode, previous=previous, on_step=on_step
+    ))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield _format_event(event, stream)
+        try:
+            yield _format_event({"event": "result", **task.result()}, stream)
+        except Exception as exc:
+            yield _format_event({"event": "error", "detail": str(exc) or exc.__class__.__name__}, stream)
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if os.path.exists(path):
+            os.unlink(path)
 
 @router.post("/scan/")
-async def scan_file(file: UploadFile = File(...)):
+async def scan_file(
+    request: Request,
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Encola el análisis y devuelve un id de trabajo"),
+    mode: str = Query("full", pattern="^(full|fast)$", description="fast: solo reglas internas, sin herramientas externas"),
+    previous_id: int | None = Query(None, description="Análisis anterior del mismo archivo para un reanálisis incremental"),
+    stream: str | None = Query(None, pattern="^(ndjson|sse)$", description="Envía los hallazgos de cada herramienta según terminan"),
+):
     """
     Endpoint principal de análisis de archivos.
 
     Flujo:
     ------
-    1. Guarda el archivo.
+    1. Guarda el archivo en disco por bloques (como máximo MAX_UPLOAD_BYTES;
+       UploadLimitMiddleware rechaza con 413 los cuerpos mayores antes de
+       recibirlos).
     2. Detecta el tipo de archivo (Dockerfile, docker-compose o manifiesto de Kubernetes).
     3. Ejecuta la herramienta de análisis correspondiente:
         - hadolint (Dockerfile)
         - dclint (docker-compose.yaml)
         - kube-linter (manifiestos Kubernetes)
-    4. Si hay imagen asociada, ejecuta trivy para detectar vulnerabilidades.
+    4. Ejecuta trivy sobre cada imagen referenciada (todas las etapas, servicios
+       o contenedores, deduplicadas) para detectar vulnerabilidades, en paralelo
+       con el paso 3, como subprocesos asíncronos.
     5. Estandariza resultados.
     6. Genera una versión remediada.
+    Los pasos 3, 5 y 6 se sirven desde la caché si el mismo contenido ya se
+    analizó con la misma versión de la herramienta; el paso 4 usa la caché por
+    imagen de trivy.
     7. Devuelve resultados y sugerencias.
 
+    Cada herramienta tiene un timeout (TOOL_TIMEOUT, app.utils.runner). Si una
+    herramienta lo supera o falla, se devuelven los resultados del resto y
+    tool_status indica el estado de cada una. Si el cliente se desconecta, se
+    cancelan las herramientas en curso.
+
+    Con mode=fast no se lanza ningún proceso externo: solo se ejecutan las
+    reglas internas (app.utils.dockerfile_rules y app.utils.kubernetes_rules),
+    pensado para comprobaciones tipo pre-commit en milisegundos.
+
+    La cabecera Server-Timing de la respuesta desglosa la duración de cada
+    etapa (upload, read, yaml, cada herramienta, remediation, save).
+
+    Con previous_id (id de un análisis anterior del mismo archivo
+    docker-compose o Kubernetes) solo se vuelven a analizar los servicios o
+    documentos que han cambiado: el linter se ejecuta sobre ellos, trivy solo
+    sobre sus imágenes y el resto de hallazgos y remediaciones se reutilizan
+    (app.utils.incremental). La respuesta incluye "incremental" con lo
+    reanalizado y lo reutilizado.
+
+    Con stream=ndjson o stream=sse la respuesta se envía por partes (NDJSON
+    o Server-Sent Events) según avanza el análisis:
+        - {"event": "progress", "step", "status"}: cada herramienta y la
+          remediación pasan a running, done, timeout o error.
+        - {"event": "tool", "tool", "status", "findings"}: hallazgos
+          normalizados de una herramienta en cuanto termina.
+        - {"event": "result", ...}: el resultado completo (como sin stream),
+          siempre al final; o {"event": "error", "detail"} si el análisis falla.
+    En SSE el tipo va en el campo event y el JSON en data. En este modo no
+    se envía la cabecera Server-Timing.
+
+    Con background=true el archivo se encola en app.utils.jobs y se responde
+    al momento con 202 y el id del trabajo; el estado se consulta en
+    /scan/jobs/{job_id}.
+
+    Control de admisión (app.utils.admission): como mucho SCAN_CONCURRENCY
+    análisis (y SCAN_MEMORY_BUDGET de memoria estimada) a la vez; el resto
+    espera en una cola de SCAN_QUEUE_MAX peticiones. Si la cola está llena
+    se responde 429, y si la espera supera SCAN_QUEUE_TIMEOUT o el sistema
+    tiene menos de MIN_AVAILABLE_MEMORY libre, 503; ambos con Retry-After.
+    La admisión se decide antes de recibir el archivo (ScanAdmissionMiddleware).
+    Los trabajos en segundo plano esperan su turno en la cola de jobs.
+
     Returns:
     --------
     dict
         Contiene:
+        - id (identificador del análisis en el historial)
         - filename
         - original_content
         - tools_run
+        - tool_status (ok, timeout o error para cada herramienta)
+        - partial (true si alguna herramienta no terminó correctamente)
         - results
         - normalized_findings
         - suggested_content (archivo modificado con buenas prácticas)
+        - cache (hit/miss/shared de la caché para cada herramienta y la remediación)
+        - incremental (solo con previous_id): previous_id, applied, changed,
+          reused, removed y tools (full, partial o reused para cada paso)
     """
 
     filename = file.filename
     suffix = os.path.splitext(filename)[1]
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp.flush()
+    previous = None
+    if previous_id is not None:
+        previous = await asyncio.to_thread(get_result, previous_id)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Análisis anterior no encontrado")
 
-        decoded_content = content.decode()
-        results = {}
+    if background:
+        path = new_job_path(suffix)
+        await _save_upload(file, path)
+        try:
+            job = submit(filename, path, mode, previous_id)
+        except QueueFullError as exc:
+            os.unlink(path)
+            raise HTTPException(status_code=503, detail=str(exc),
+                                headers={"Retry-After": str(scan_slots.retry_after())})
+        return JSONResponse(status_code=202, content={
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/scan/jobs/{job['id']}"
+        })
 
-        if "Dockerfile" in filename or filename.endswith(".Dockerfile"):
-            output = subprocess.run(
-                ["hadolint", "--format", "json", tmp.name],
-                capture_output=True, text=True
-            )
-            try:
-                results["hadolint"] = json.loads(output.stdout)
-            except json.JSONDecodeError:
-                results["hadolint"] = {"error": "Error parsing hadolint output"}
-
-        elif "docker-compose" in filename or filename.endswith("compose.yaml"):
-            output = subprocess.run(
-                ["dclint", "-f", "json", tmp.name],
-                capture_output=True, text=True
-            )
-            try:
-                results["dclint"] = json.loads(output.stdout)
-            except json.JSONDecodeError:
-                results["dclint"] = {"error": "Error parsing dclint output"}
-
-        elif filename.endswith(".yaml") or filename.endswith(".yml"):
-            output = subprocess.run(
-                ["kube-linter", "lint", "--format", "json", tmp.name],
-                capture_output=True, text=True
-            )
-            try:
-                results["kube-linter"] = json.loads(output.stdout)
-            except json.JSONDecodeError:
-                results["kube-linter"] = {"error": "Error parsing kube-linter output"}
-
-        image = extract_image_name(filename, decoded_content)
-        if image:
-            output = subprocess.run(
-                ["trivy", "image", "--quiet", "--format", "json", image],
-                capture_output=True, text=True
-            )
+    if stream is not None:
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            digest = await _save_upload(file, path)
+        except BaseException:
+            os.unlink(path)
+            raise
+        media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+        return StreamingResponse(
+            _stream_scan(filename, path, digest, mode, previous, stream), media_type=media_type,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    timings = start_request_timing()
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        with timed("upload"):
+            digest = await _save_upload(file, path)
+        result = await _cancel_on_disconnect(request, analyze_file(filename, path, digest, mode=mode, previous=previous))
+        # El resultado ya es JSON nativo: se serializa directamente, sin
+        # jsonable_encoder (que recorre cada hallazgo y es mucho más lento)
+        return JSONResponse(result, headers={"Server-Timing": server_timing_header(timings)})
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+@router.post("/scan/batch")
+async def scan_batch(
+    files: list[UploadFile] = File(default=[]),
+    archive: UploadFile | None = File(default=None),
+    mode: str = Query("full", pattern="^(full|fast)$"),
+):
+    """
+    Analiza muchos archivos en una sola petición.
+
+    Flujo:
+    ------
+    1. Recibe varios archivos (campo files) y/o un tar o zip (campo archive),
+       como mucho BATCH_MAX_BYTES en total, y los guarda en un directorio temporal.
+    2. Clasifica cada archivo con las mismas reglas que /scan/ (detect_linter);
+       los que no son Dockerfile, docker-compose o Kubernetes se omiten.
+    3. Agrupa por herramienta los archivos que no están en la caché: hadolint,
+       dclint y kube-linter se ejecutan una sola vez sobre todas las rutas del grupo.
+    4. Cada archivo sigue el mismo pipeline que /scan/ (trivy, normalización,
+       remediación y guardado en el historial). mode funciona igual que en /scan/.
+       Los archivos comparten el control de admisión de /scan/: si la cola
+       está llena se responde 429 antes de recibir nada
+       (ScanAdmissionMiddleware), y cada archivo espera su turno sin ser
+       rechazado.
+
+    Returns:
+    --------
+    StreamingResponse
+        NDJSON con una línea por archivo según se completa (mismo formato que
+        /scan/, o {"filename", "skipped"|"error"}), y una última línea
+        {"done": true, "files": n}.
+    """
+
+    workdir = tempfile.mkdtemp(prefix="scan-batch-")
+    try:
+        entries = []
+        for upload in files:
+            path = os.path.join(workdir, f"upload-{len(entries)}{os.path.splitext(upload.filename)[1]}")
+            await _save_upload(upload, path)
+            entries.append((upload.filename, path))
+
+        if archive is not None:
+            # tarfile y zipfile solo se cargan si se sube un archivo comprimido
+            from app.utils.archives import ARCHIVE_MAX_BYTES, ArchiveError, extract_archive
+            archive_path = os.path.join(workdir, "archive")
+            await _save_upload(archive, archive_path, ARCHIVE_MAX_BYTES)
+            archive_dir = os.path.join(workdir, "archive-entries")
+            os.mkdir(archive_dir)
             try:
-                trivy_data = json.loads(output.stdout)
-                trivy_findings = []
-                for target in trivy_data.get("Results", []):
-                    for vuln in target.get("Vulnerabilities", []):
-                        trivy_findings.append({
-                            "VulnerabilityID": vuln.get("VulnerabilityID"),
-                            "PkgName": vuln.get("PkgName"),
-                            "InstalledVersion": vuln.get("InstalledVersion"),
-                            "FixedVersion": vuln.get("FixedVersion"),
-                            "Severity": vuln.get("Severity"),
-                            "Title": vuln.get("Title"),
-                            "Description": vuln.get("Description", "")[:200]
-                        })
-                results["trivy"] = trivy_findings
-            except json.JSONDecodeError:
-                results["trivy"] = {"error": "Error parsing trivy output"}
-
-        os.unlink(tmp.name)
-
-        normalized = []
-        if "hadolint" in results and isinstance(results["hadolint"], list):
-            normalized += normalize_hadolint(results["hadolint"], filename)
-        if "trivy" in results and isinstance(results["trivy"], list):
-            normalized += normalize_trivy(results["trivy"], filename)
-        if "kube-linter" in results and isinstance(results["kube-linter"], dict):
-            normalized += normalize_kubelinter(results["kube-linter"], filename)
-        if "dclint" in results and isinstance(results["dclint"], list):
-            normalized += normalize_dclint(results["dclint"], filename)
-
-        if "Dockerfile" in filename or filename.endswith(".Dockerfile"):
-            suggested_content = suggest_remediations_dockerfile(decoded_content)
-        elif "docker-compose" in filename or filename.endswith("compose.yaml"):
-            suggested_content = suggest_remediations_docker_compose(decoded_content)
-        elif filename.endswith(".yaml") or filename.endswith(".yml"):
-            suggested_content = suggest_remediations_kubernetes_yaml(decoded_content)
-        else:
-            suggested_content = ""
-
-        save_result({
-            "filename": filename,
-            "original_content": decoded_content,
-            "suggested_content": suggested_content,
-            "tools_run": list(results.keys()),
-            "results": results,
-            "normalized_findings": normalized
-        })
+                entries += await asyncio.to_thread(
+                    extract_archive, archive_path, archive_dir, lambda name: detect_linter(name) is not None
+                )
+            except ArchiveError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    async def stream():
+        tasks = []
+        try:
+            digests = {}
+            groups = {}
+            for filename, path in entries:
+                linter = detect_linter(filename)
+                if linter is None or mode == "fast":
+                    continue
+                digests[path] = await asyncio.to_thread(file_hash, path)
+                # Solo se agrupan los archivos que no están ya en la caché
+                if not await is_cached(linter, digests[path]):
+                    groups.setdefault(linter, []).append(path)
+
+            # Una ejecución por linter para todos los archivos del grupo
+            group_tasks = {
+                tool: asyncio.ensure_future(run_linter_batch(tool, paths))
+                for tool, paths in groups.items()
+            }
+
+            def linter_result(tool: str, path: str):
+                async def run():
+                    if path not in groups.get(tool, []):
+                        return await run_linter(tool, path)
+                    return (await group_tasks[tool])[path]
+                return run
+
+            async def scan_entry(filename: str, path: str):
+                linter = detect_linter(filename)
+                if linter is None:
+                    return {"filename": filename, "skipped": "Tipo de archivo no soportado"}
+                try:
+                    with await admit(os.path.getsize(path), block=True):
+                        return await analyze_file(filename, path, digests.get(path), linter_result(linter, path), mode=mode)
+                except UnicodeDecodeError:
+                    return {"filename": filename, "error": "El archivo no es texto UTF-8"}
+                except Exception as exc:
+                    # Un archivo que falla no interrumpe el resto del lote
+                    return {"filename": filename, "error": str(exc) or exc.__class__.__name__}
+
+            tasks = [asyncio.ensure_future(scan_entry(filename, path)) for filename, path in entries]
+            tasks += group_tasks.values()
+            for finished in asyncio.as_completed(tasks[:len(entries)]):
+                yield json.dumps(await finished) + "\n"
+            yield json.dumps({"done": True, "files": len(entries)}) + "\n"
+        finally:
+            # Si el cliente se desconecta, se cancelan los análisis pendientes
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/scan/jobs/{job_id}")
+def get_scan_job(job_id: str):
+    """
+    Devuelve el estado de un análisis en segundo plano.
+
+    Returns:
+    --------
+    dict
+        Contiene:
+        - id, filename
+        - status (queued, running, done o error)
+        - progress (estado de cada herramienta y de la remediación)
+        - created_at, started_at, finished_at
+        - result (misma respuesta que /scan/ cuando status es done)
+        - error
+    """
 
-        return {
-            "filename": filename,
-            "original_content": decoded_content,
-            "tools_run": list(results.keys()),
-            "results": results,
-            "normalized_findings": normalized,
-            "suggested_content": suggested_content
-        }
\ No newline at end of file
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return JSONResponse(job)
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import date
+from fastapi import APIRouter, Query
+from app.utils.storage import ROLLUP_DIMENSIONS, stats_top, stats_totals, stats_trend
+
+router = APIRouter()
+
+MAX_TOP = 100
+
+def _day(value: date | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+@router.get("/stats/")
+async def get_stats(since: date | None = None, until: date | None = None):
+    """
+    Devuelve los totales del historial en un rango de días (UTC).
+
+    Functionality:
+    ---------------
+    - since es inclusivo y until exclusivo; sin ellos se usa todo el historial.
+    - Se calcula a partir de los agregados diarios de app.utils.storage
+      (tabla rollups), sin recorrer los análisis.
+    - Devuelve un JSON con:
+        - scans: número de análisis.
+        - findings: número de hallazgos.
+        - severity_counts: hallazgos por severidad.
+        - tool_counts: hallazgos por herramienta.
+    """
+
+    return await asyncio.to_thread(stats_totals, _day(since), _day(until))
+
+@router.get("/stats/trend")
+async def get_stats_trend(since: date | None = None, until: date | None = None, tool: str | None = None):
+    """
+    Devuelve la evolución diaria de los hallazgos por severidad.
+
+    Functionality:
+    ---------------
+    - Un elemento por día con análisis o hallazgos: day, scans, findings y
+      severity_counts, en orden cronológico.
+    - tool limita los hallazgos a los de una herramienta.
+    """
+
+    return {"days": await asyncio.to_thread(stats_trend, _day(since), _day(until), tool)}
+
+@router.get("/stats/top")
+async def get_stats_top(
+    dimension: str = Query("rule", pattern=f"^({'|'.join(ROLLUP_DIMENSIONS)})$"),
+    limit: int = Query(10, ge=1, le=MAX_TOP),
+    since: date | None = None,
+    until: date | None = None,
+    severity: str | None = None,
+):
+    """
+    Devuelve las reglas, imágenes, archivos o herramientas con más hallazgos.
+
+    Functionality:
+    ---------------
+    - dimension: rule (reglas más frecuentes), image (imágenes más
+      vulnerables), file o tool.
+    - severity cuenta solo los hallazgos de esa severidad.
+    - Cada elemento incluye key, findings y severity_counts.
+    """
+
+    return {
+        "dimension": dimension,
+        "top": await asyncio.to_thread(stats_top, dimension, limit, _day(since), _day(until), severity),
+    }
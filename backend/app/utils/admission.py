@@ -0,0 +1,311 @@
+"""
+admission.py
+
+Control de admisión y contrapresión de los análisis.
+
+Cada análisis ocupa un hueco de un presupuesto global (SCAN_CONCURRENCY) y,
+si se configura SCAN_MEMORY_BUDGET, una cantidad de memoria estimada a
+partir del tamaño del archivo. Cuando no hay capacidad la petición espera
+en una cola FIFO acotada:
+
+- Si la cola está llena (SCAN_QUEUE_MAX) se responde al momento con 429.
+- Si la espera supera SCAN_QUEUE_TIMEOUT segundos se responde con 503.
+- Si la memoria disponible del sistema (MemAvailable de /proc/meminfo) es
+  menor que MIN_AVAILABLE_MEMORY se responde con 503 sin encolar.
+
+Las respuestas incluyen Retry-After, estimado a partir de la duración media
+de los análisis y de la longitud de la cola.
+
+Además de la concurrencia por herramienta de app.utils.runner, los
+procesos externos comparten un presupuesto de memoria (TOOL_MEMORY_BUDGET)
+en el que cada ejecución reserva TOOL_MEMORY_<HERRAMIENTA> bytes (trivy
+carga la base de datos de vulnerabilidades y es el más costoso). Las
+herramientas esperan sin límite de cola: la petición ya fue admitida.
+
+Los análisis en segundo plano y los archivos de /scan/batch usan los mismos
+presupuestos, esperando sin ser rechazados (sus colas ya están acotadas).
+
+La ocupación, la profundidad de cola, el tiempo de espera y los rechazos se
+exponen en /metrics (app.utils.metrics).
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+from app.utils.metrics import (
+    ADMISSION_IN_USE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTIONS,
+    ADMISSION_WAIT_SECONDS,
+)
+
+MB = 1024 * 1024
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "8"))
+SCAN_QUEUE_MAX = int(os.getenv("SCAN_QUEUE_MAX", "32"))
+SCAN_QUEUE_TIMEOUT = float(os.getenv("SCAN_QUEUE_TIMEOUT", "30"))
+# Memoria estimada de los análisis en curso (bytes, 0 = sin límite)
+SCAN_MEMORY_BUDGET = int(os.getenv("SCAN_MEMORY_BUDGET", "0"))
+SCAN_MEMORY_BASE = int(os.getenv("SCAN_MEMORY_BASE", str(16 * MB)))
+# Bytes de memoria estimados por byte subido (parseo YAML, remediación, respuesta)
+SCAN_MEMORY_PER_BYTE = float(os.getenv("SCAN_MEMORY_PER_BYTE", "20"))
+MIN_AVAILABLE_MEMORY = int(os.getenv("MIN_AVAILABLE_MEMORY", "0"))
+# Memoria estimada de los procesos externos en curso (bytes, 0 = sin límite)
+TOOL_MEMORY_BUDGET = int(os.getenv("TOOL_MEMORY_BUDGET", "0"))
+DEFAULT_TOOL_MEMORY = {
+    "trivy": 512 * MB,
+    "dclint": 128 * MB,
+    "kube-linter": 128 * MB,
+    "hadolint": 64 * MB,
+}
+RETRY_AFTER_MAX = 60
+
+
+class AdmissionError(RuntimeError):
+    """
+    La petición no se admite; status_code es 429 o 503 y retry_after los
+    segundos sugeridos para reintentar.
+    """
+
+    def __init__(self, detail: str, status_code: int, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Budget:
+    """
+    Semáforo ponderado con cola FIFO acotada: cada petición reserva un peso
+    (huecos o bytes) y espera por orden de llegada si no cabe.
+    """
+
+    def __init__(self, name: str, capacity: int, queue_max: int | None = None, timeout: float | None = None):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.queue_max = queue_max
+        self.timeout = timeout
+        self.used = 0
+        self._waiters = deque()
+        self._hold_seconds = None
+        ADMISSION_IN_USE.set(0, budget=name)
+        ADMISSION_QUEUE_DEPTH.set(0, budget=name)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def is_full(self) -> bool:
+        return self.queue_max is not None and len(self._waiters) >= self.queue_max
+
+    def retry_after(self) -> int:
+        """
+        Segundos estimados hasta que haya capacidad para una petición nueva.
+        """
+        if self._hold_seconds is None:
+            return 1
+        pending = (len(self._waiters) + 1) * self._hold_seconds / self.capacity
+        return max(1, min(RETRY_AFTER_MAX, math.ceil(pending)))
+
+    def _update_gauges(self):
+        ADMISSION_IN_USE.set(self.used, budget=self.name)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), budget=self.name)
+
+    async def acquire(self, weight: int = 1, block: bool = False) -> int:
+        """
+        Reserva weight unidades (como máximo la capacidad, para que una
+        petición grande pueda ejecutarse sola).
+
+        Args:
+            weight (int): Unidades a reservar.
+            block (bool): Espera sin límite de cola ni de tiempo.
+
+        Returns:
+            int: Unidades reservadas, que deben devolverse con release().
+
+        Raises:
+            AdmissionError: 429 si la cola está llena o 503 si la espera supera el timeout.
+        """
+        weight = min(weight, self.capacity)
+        start = time.monotonic()
+        if not self._waiters and self.used + weight <= self.capacity:
+            self.used += weight
+            self._update_gauges()
+            ADMISSION_WAIT_SECONDS.observe(0.0, budget=self.name)
+            return weight
+
+        if not block and self.is_full():
+            ADMISSION_REJECTIONS.inc(reason="queue_full")
+            raise AdmissionError("Demasiados análisis en cola", 429, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (weight, waiter)
+        self._waiters.append(entry)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, None if block else self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            granted = waiter.done() and not waiter.cancelled()
+            if not granted:
+                # _wake() ya puede haber quitado de la cola la espera cancelada
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self._update_gauges()
+                self._wake()
+            if isinstance(exc, asyncio.CancelledError):
+                if granted:
+                    # Se concedió justo al cancelarse: se devuelve
+                    self.release(weight)
+                raise
+            if not granted:
+                ADMISSION_REJECTIONS.inc(reason="timeout")
+                raise AdmissionError("Tiempo de espera en cola agotado", 503, self.retry_after())
+            # Se concedió justo al vencer el timeout: la petición sigue adelante
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start, budget=self.name)
+        return weight
+
+    def release(self, weight: int, held_seconds: float | None = None):
+        """
+        Devuelve unidades reservadas y, si se indica, registra cuánto tiempo
+        se ocuparon (para estimar Retry-After).
+        """
+        self.used -= weight
+        if held_seconds is not None:
+            # Media móvil exponencial de la duración de cada reserva
+            previous = self._hold_seconds
+            self._hold_seconds = held_seconds if previous is None else 0.8 * previous + 0.2 * held_seconds
+        self._update_gauges()
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if self.used + weight > self.capacity:
+                break
+            self._waiters.popleft()
+            self.used += weight
+            waiter.set_result(None)
+        self._update_gauges()
+
+
+scan_slots = Budget("scans", SCAN_CONCURRENCY, SCAN_QUEUE_MAX, SCAN_QUEUE_TIMEOUT)
+scan_memory = Budget("memory", SCAN_MEMORY_BUDGET, SCAN_QUEUE_MAX, SCAN_QUEUE_TIMEOUT) if SCAN_MEMORY_BUDGET > 0 else None
+tool_memory = Budget("tool_memory", TOOL_MEMORY_BUDGET) if TOOL_MEMORY_BUDGET > 0 else None
+
+
+def available_memory() -> int | None:
+    """
+    Devuelve la memoria disponible del sistema en bytes (Linux), o None si no se conoce.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def estimate_memory(size: int) -> int:
+    """
+    Estima la memoria que necesita el análisis de un archivo de size bytes.
+    """
+    return SCAN_MEMORY_BASE + int(size * SCAN_MEMORY_PER_BYTE)
+
+
+def check_admission():
+    """
+    Comprueba sin reservar nada si se aceptaría una petición nueva.
+
+    Raises:
+        AdmissionError: 503 si falta memoria en el sistema o 429 si la cola está llena.
+    """
+    if MIN_AVAILABLE_MEMORY > 0:
+        available = available_memory()
+        if available is not None and available < MIN_AVAILABLE_MEMORY:
+            ADMISSION_REJECTIONS.inc(reason="memory")
+            raise AdmissionError("Memoria insuficiente en el servidor", 503, scan_slots.retry_after())
+    for budget in (scan_slots, scan_memory):
+        if budget is not None and budget.is_full():
+            ADMISSION_REJECTIONS.inc(reason="queue_full")
+            raise AdmissionError("Demasiados análisis en cola", 429, budget.retry_after())
+
+
+class Ticket:
+    """
+    Reserva de un análisis admitido. release() es idempotente; también se
+    libera al salir de un bloque with.
+    """
+
+    def __init__(self, memory: int):
+        self.memory = memory
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        scan_slots.release(1, time.monotonic() - self.started)
+        if scan_memory is not None:
+            scan_memory.release(self.memory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+async def admit(size: int = 0, block: bool = False) -> Ticket:
+    """
+    Espera a que haya capacidad para un análisis y la reserva.
+
+    Args:
+        size (int): Tamaño del archivo subido en bytes (para estimar la memoria).
+        block (bool): Espera sin rechazos (análisis ya aceptados: trabajos en
+            segundo plano y archivos de /scan/batch).
+
+    Returns:
+        Ticket: Reserva que debe liberarse al terminar (with await admit(...)).
+
+    Raises:
+        AdmissionError: Si no se admite la petición (429 o 503).
+    """
+    if not block:
+        check_admission()
+    await scan_slots.acquire(1, block)
+    memory = 0
+    if scan_memory is not None:
+        try:
+            memory = await scan_memory.acquire(estimate_memory(size), block)
+        except BaseException:
+            scan_slots.release(1)
+            raise
+    return Ticket(memory)
+
+
+def tool_memory_weight(tool: str) -> int:
+    """
+    Devuelve la memoria estimada de una ejecución de la herramienta
+    (TOOL_MEMORY_<HERRAMIENTA>, en bytes).
+    """
+    env_name = "TOOL_MEMORY_" + tool.upper().replace("-", "_")
+    return int(os.getenv(env_name, DEFAULT_TOOL_MEMORY.get(tool, 64 * MB)))
+
+
+def admission_status() -> dict:
+    """
+    Devuelve la ocupación y la cola de cada presupuesto.
+    """
+    return {
+        budget.name: {"used": budget.used, "capacity": budget.capacity, "queued": budget.queue_depth}
+        for budget in (scan_slots, scan_memory, tool_memory)
+        if budget is not None
+    }
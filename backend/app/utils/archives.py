@@ -0,0 +1,98 @@
+"""
+archives.py
+
+Extracción segura de archivos tar y zip subidos al endpoint /scan/batch.
+
+Las entradas nunca se escriben con su ruta original (evita path traversal):
+se guardan en el directorio de destino con un nombre secuencial que conserva
+la extensión, y se devuelve la ruta original como nombre lógico del archivo.
+Solo se extraen ficheros regulares y se limitan el número de entradas y el
+tamaño total descomprimido. Un archivo dañado o truncado se rechaza como
+ArchiveError, igual que un formato no soportado.
+"""
+
+import gzip
+import lzma
+import os
+import posixpath
+import tarfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+
+ARCHIVE_MAX_FILES = int(os.getenv("ARCHIVE_MAX_FILES", "1000"))
+ARCHIVE_MAX_BYTES = int(os.getenv("ARCHIVE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+class ArchiveError(ValueError):
+    """
+    Archivo comprimido no soportado, dañado o que supera los límites configurados.
+    """
+
+
+# Errores de zipfile, tarfile y los descompresores con un archivo dañado o truncado
+_DAMAGED_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error, gzip.BadGzipFile, lzma.LZMAError)
+
+
+@contextmanager
+def _damaged_as_archive_error():
+    try:
+        yield
+    except _DAMAGED_ERRORS as exc:
+        raise ArchiveError(f"El archivo comprimido está dañado o incompleto: {exc}") from exc
+
+
+def _iter_members(archive_path: str):
+    """
+    Recorre los ficheros regulares de un tar o zip como pares (nombre, fileobj).
+    """
+    with _damaged_as_archive_error():
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        with zf.open(info) as fileobj:
+                            yield info.filename, fileobj
+            return
+        if tarfile.is_tarfile(archive_path):
+            with tarfile.open(archive_path) as tf:
+                for member in tf:
+                    if member.isfile():
+                        yield member.name, tf.extractfile(member)
+            return
+        raise ArchiveError("Formato de archivo no soportado (se espera tar o zip)")
+
+
+def extract_archive(archive_path: str, dest_dir: str, accept=None) -> list[tuple[str, str]]:
+    """
+    Extrae un tar o zip en dest_dir.
+
+    Args:
+        archive_path (str): Ruta del archivo comprimido.
+        dest_dir (str): Directorio donde se escriben las entradas.
+        accept (Callable | None): Filtro opcional por nombre de entrada; las
+            entradas rechazadas no se extraen.
+
+    Returns:
+        list[tuple[str, str]]: Pares (nombre original, ruta extraída).
+
+    Raises:
+        ArchiveError: Si el formato no es válido o se superan los límites.
+    """
+    extracted = []
+    total_bytes = 0
+    for name, fileobj in _iter_members(archive_path):
+        if accept is not None and not accept(name):
+            continue
+        if len(extracted) >= ARCHIVE_MAX_FILES:
+            raise ArchiveError(f"El archivo supera el máximo de {ARCHIVE_MAX_FILES} entradas")
+
+        path = os.path.join(dest_dir, f"{len(extracted)}{os.path.splitext(name)[1]}")
+        with open(path, "wb") as out, _damaged_as_archive_error():
+            while chunk := fileobj.read(64 * 1024):
+                total_bytes += len(chunk)
+                if total_bytes > ARCHIVE_MAX_BYTES:
+                    raise ArchiveError(f"El contenido descomprimido supera {ARCHIVE_MAX_BYTES} bytes")
+                out.write(chunk)
+        extracted.append((posixpath.normpath(name), path))
+    return extracted
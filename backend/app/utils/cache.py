@@ -0,0 +1,283 @@
+"""
+cache.py
+
+Caché de resultados de análisis direccionada por contenido.
+
+La clave de cada entrada combina el SHA-256 del archivo subido con el nombre
+y la versión de la herramienta, de modo que un mismo archivo analizado con la
+misma versión de una herramienta no vuelve a lanzar ningún subproceso.
+
+Política de expulsión:
+    - Tamaño máximo (SCAN_CACHE_MAX_ENTRIES): se expulsa la entrada usada
+      hace más tiempo (LRU).
+    - TTL (SCAN_CACHE_TTL, en segundos): las entradas caducadas se descartan
+      al consultarlas.
+
+Caché compartida entre procesos:
+    Si se define CACHE_DIR, además de la caché en memoria de cada proceso
+    (primer nivel) las entradas se guardan en disco (segundo nivel), de modo
+    que los workers de uvicorn y las réplicas del mismo nodo comparten los
+    resultados de las herramientas. Cada entrada es un archivo JSON que se
+    escribe en un temporal del mismo directorio y se renombra (os.replace),
+    así que ningún proceso lee nunca una entrada a medias. Cada espacio de
+    nombres (scan, trivy) guarda como mucho CACHE_DIR_MAX_ENTRIES entradas;
+    al superarlo, un único proceso a la vez borra las caducadas y las usadas
+    hace más tiempo.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.locks import file_lock
+
+SCAN_CACHE_MAX_ENTRIES = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "1024"))
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "86400"))
+# Directorio de la caché compartida entre procesos ("" = solo en memoria)
+CACHE_DIR = os.getenv("CACHE_DIR", "")
+CACHE_DIR_MAX_ENTRIES = int(os.getenv("CACHE_DIR_MAX_ENTRIES", "10000"))
+# Cada cuántas escrituras de un proceso se comprueba el tamaño del directorio
+CACHE_DIR_PRUNE_EVERY = 256
+
+
+def content_hash(content: bytes) -> str:
+    """
+    Devuelve el SHA-256 en hexadecimal del contenido de un archivo.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """
+    Devuelve el SHA-256 de un archivo leyéndolo por bloques.
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(64 * 1024):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def cache_key(digest: str, tool: str, version: str) -> str:
+    """
+    Construye la clave de caché para un contenido, herramienta y versión.
+    """
+    return f"{digest}:{tool}:{version}"
+
+
+class TTLCache:
+    """
+    Caché LRU con tamaño máximo y caducidad por TTL, segura entre hilos.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Devuelve el valor almacenado o None si no existe o ha caducado.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        """
+        Guarda un valor, expulsando las entradas menos usadas si se supera el tamaño máximo.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Caché en un directorio compartido entre procesos, con escrituras atómicas.
+    """
+
+    def __init__(self, directory: str, max_entries: int, ttl: float, encode=None, decode=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self._writes = 0
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], name + ".json")
+
+    def lock_path(self, key: str) -> str:
+        """
+        Archivo de bloqueo para que un solo proceso calcule la entrada key.
+        """
+        return self._path(key)[:-len(".json")] + ".lock"
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item.get("key") != key:
+            return None
+        if item["expires_at"] < time.time():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        try:
+            # La fecha de modificación marca el último uso (para expulsar por LRU)
+            os.utime(path)
+        except OSError:
+            pass
+        value = item["value"]
+        return self.decode(value) if self.decode else value
+
+    def set(self, key: str, value):
+        path = self._path(key)
+        item = {
+            "key": key,
+            "expires_at": time.time() + self.ttl,
+            "value": self.encode(value) if self.encode else value,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(item, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._writes += 1
+        if self._writes % CACHE_DIR_PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Borra las entradas caducadas y, si siguen sobrando, las usadas hace
+        más tiempo. Si otro proceso ya está podando, no hace nada.
+
+        Returns:
+            int: Número de archivos borrados.
+        """
+        with file_lock(os.path.join(self.directory, ".prune.lock"), blocking=False) as locked:
+            if not locked:
+                return 0
+            now = time.time()
+            entries, stale = [], []
+            for entry in os.scandir(self.directory):
+                if not entry.is_dir():
+                    continue
+                for item in os.scandir(entry.path):
+                    try:
+                        mtime = item.stat().st_mtime
+                    except OSError:
+                        continue
+                    if item.name.endswith(".json"):
+                        (stale if mtime < now - self.ttl else entries).append((mtime, item.path))
+                    elif item.name.startswith(".tmp-") and mtime < now - 3600:
+                        # Temporales de escrituras interrumpidas
+                        stale.append((mtime, item.path))
+                    elif item.name.endswith(".lock") and mtime < now - self.ttl:
+                        # Bloqueos de claves antiguas; en el peor caso, dos
+                        # procesos calculan a la vez la misma entrada
+                        stale.append((mtime, item.path))
+            entries.sort()
+            stale += entries[:max(0, len(entries) - self.max_entries)]
+            removed = 0
+            for _, path in stale:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError:
+                    pass
+            return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SharedCache:
+    """
+    Caché en dos niveles: TTLCache en memoria y, si se configura un
+    directorio, DiskCache compartida con el resto de procesos.
+
+    get() y set() acceden al disco desde el hilo que las llama; aget() y
+    aset() lo hacen en un hilo aparte para no bloquear el event loop.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, encode=None, decode=None):
+        self.memory = TTLCache(max_entries, ttl)
+        self.disk = DiskCache(os.path.join(CACHE_DIR, name), CACHE_DIR_MAX_ENTRIES, ttl, encode, decode) \
+            if CACHE_DIR else None
+
+    def _get_disk(self, key: str):
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self._get_disk(key)
+        return value
+
+    def set(self, key: str, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    async def aget(self, key: str):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return value
+
+    async def aset(self, key: str, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def __len__(self):
+        return len(self.memory)
+
+
+scan_cache = SharedCache("scan", SCAN_CACHE_MAX_ENTRIES, SCAN_CACHE_TTL)
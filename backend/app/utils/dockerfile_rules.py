@@ -0,0 +1,239 @@
+"""
+dockerfile_rules.py
+
+Motor de reglas para Dockerfile que se ejecuta dentro del proceso, sin lanzar
+hadolint.
+
+El Dockerfile se tokeniza una sola vez con parse_dockerfile(), que respeta:
+    - Directivas del parser al inicio del archivo (# escape=`, # syntax=...).
+    - Líneas de continuación (con el carácter de escape activo), ignorando
+      los comentarios y líneas vacías intermedias.
+    - Heredocs (RUN <<EOF ... EOF), cuyo cuerpo no se interpreta como instrucciones.
+
+Las reglas se registran con el decorador register_rule() y reciben la lista
+de instrucciones; cada una produce hallazgos en el formato normalizado de
+app.utils.parsers con tool "auditor" y número de línea.
+
+Reglas incluidas (las mismas que detecta suggest_remediations_dockerfile):
+    AUD001  FROM con etiqueta latest o sin etiqueta
+    AUD002  La etapa final termina con USER root
+    AUD003  ADD en lugar de COPY
+    AUD004  apt-get upgrade / dist-upgrade
+    AUD005  La etapa final no define USER
+    AUD006  La etapa final no define WORKDIR
+    AUD007  La etapa final no define HEALTHCHECK
+"""
+
+import re
+from typing import NamedTuple
+
+TOOL_NAME = "auditor"
+
+_DIRECTIVE_PATTERN = re.compile(r"^#\s*([a-zA-Z][a-zA-Z0-9]*)\s*=\s*(.+?)\s*$")
+# <<EOF, <<-EOF, <<"EOF" o <<'EOF' al inicio de los argumentos o tras un espacio
+_HEREDOC_PATTERN = re.compile(r"(?:^|\s)<<-?([\"']?)([A-Za-z_]\w*)\1")
+# Aritmética de shell ($((1<<2))), que no abre un heredoc
+_ARITHMETIC_PATTERN = re.compile(r"\$\(\(.*?\)\)")
+
+
+class Instruction(NamedTuple):
+    keyword: str        # Instrucción en mayúsculas (FROM, RUN, USER...)
+    args: str           # Argumentos, con las continuaciones unidas
+    line: int           # Primera línea (1-based)
+    end_line: int       # Última línea (incluye continuaciones y heredocs)
+
+
+def parse_directives(lines: list[str]) -> dict:
+    """
+    Lee las directivas del parser de las primeras líneas del Dockerfile.
+    """
+    directives = {}
+    for line in lines:
+        match = _DIRECTIVE_PATTERN.match(line.strip())
+        if not match or match.group(1).lower() in directives:
+            break
+        directives[match.group(1).lower()] = match.group(2)
+    return directives
+
+
+def parse_dockerfile(content: str) -> tuple[list[Instruction], dict]:
+    """
+    Tokeniza un Dockerfile en instrucciones lógicas.
+
+    Args:
+        content (str): Contenido del Dockerfile.
+
+    Returns:
+        tuple: (lista de Instruction, directivas del parser).
+    """
+    lines = content.splitlines()
+    directives = parse_directives(lines)
+    escape = directives.get("escape", "\\")
+    if escape not in ("\\", "`"):
+        escape = "\\"
+
+    instructions = []
+    parts, start = [], None
+    index = 0
+    while index < len(lines):
+        number = index + 1
+        stripped = lines[index].strip()
+        index += 1
+
+        if not stripped or stripped.startswith("#"):
+            # Comentarios y líneas vacías no cortan una continuación
+            continue
+
+        if start is None:
+            start = number
+        if stripped.endswith(escape):
+            parts.append(stripped[:-1].strip())
+            continue
+        parts.append(stripped)
+
+        text = " ".join(part for part in parts if part)
+        keyword, _, args = text.partition(" ")
+        end = number
+
+        heredoc = _HEREDOC_PATTERN.search(_ARITHMETIC_PATTERN.sub("", args)) \
+            if keyword.upper() in ("RUN", "COPY", "ADD") else None
+        if heredoc:
+            body = []
+            while index < len(lines) and lines[index].strip() != heredoc.group(2):
+                body.append(lines[index])
+                index += 1
+            index += 1
+            end = min(index, len(lines))
+            args = args + "\n" + "\n".join(body)
+
+        instructions.append(Instruction(keyword.upper(), args.strip(), start, end))
+        parts, start = [], None
+
+    if parts:
+        text = " ".join(part for part in parts if part)
+        keyword, _, args = text.partition(" ")
+        instructions.append(Instruction(keyword.upper(), args.strip(), start, len(lines)))
+
+    return instructions, directives
+
+
+RULES = []
+
+
+def register_rule(code: str, severity: str, fix: str | None = None):
+    """
+    Registra una regla en el motor.
+
+    La función decorada recibe la lista de instrucciones y devuelve (o produce)
+    pares (línea | None, mensaje) por cada incumplimiento.
+
+    Args:
+        code (str): Identificador de la regla (p.ej. AUD001).
+        severity (str): error, warning, info o style (como hadolint).
+        fix (str | None): Sugerencia de remediación.
+    """
+    def decorator(check):
+        RULES.append({"code": code, "severity": severity, "fix": fix, "check": check})
+        return check
+    return decorator
+
+
+def _final_stage(instructions: list[Instruction]) -> list[Instruction]:
+    last_from = max((i for i, ins in enumerate(instructions) if ins.keyword == "FROM"), default=0)
+    return instructions[last_from:]
+
+
+def _from_image(instruction: Instruction) -> tuple[str, str | None]:
+    tokens = [token for token in instruction.args.split() if not token.startswith("--")]
+    image = tokens[0] if tokens else ""
+    alias = tokens[2] if len(tokens) >= 3 and tokens[1].upper() == "AS" else None
+    return image, alias
+
+
+@register_rule("AUD001", "warning", "Usa una etiqueta de versión fija (o un digest) en lugar de latest")
+def check_latest_tag(instructions):
+    stages = set()
+    for ins in instructions:
+        if ins.keyword != "FROM":
+            continue
+        image, alias = _from_image(ins)
+        name = image.lower()
+        if name and name != "scratch" and name not in stages and "$" not in image and "@" not in image:
+            last_part = image.rsplit("/", 1)[-1]
+            if last_part.endswith(":latest"):
+                yield ins.line, f"La imagen {image} usa la etiqueta latest"
+            elif ":" not in last_part:
+                yield ins.line, f"La imagen {image} no fija etiqueta (equivale a latest)"
+        if alias:
+            stages.add(alias.lower())
+
+
+@register_rule("AUD002", "error", "Usa un usuario no root, p.ej. USER appuser")
+def check_user_root(instructions):
+    # Solo cuenta el último USER de la etapa final: las etapas intermedias
+    # pueden necesitar root para construir
+    users = [ins for ins in _final_stage(instructions) if ins.keyword == "USER"]
+    if users and users[-1].args.split(":")[0] in ("root", "0"):
+        yield users[-1].line, "El contenedor se ejecuta como root"
+
+
+@register_rule("AUD003", "warning", "Reemplaza ADD por COPY si no necesitas URLs ni descompresión")
+def check_add(instructions):
+    for ins in instructions:
+        if ins.keyword == "ADD":
+            yield ins.line, "Usa COPY en lugar de ADD"
+
+
+@register_rule("AUD004", "warning", "Elimina apt-get upgrade y fija versiones de paquetes")
+def check_apt_upgrade(instructions):
+    for ins in instructions:
+        if ins.keyword == "RUN" and re.search(r"apt-get\s+(-\S+\s+)*(dist-)?upgrade", ins.args):
+            yield ins.line, "apt-get upgrade genera imágenes no reproducibles"
+
+
+@register_rule("AUD005", "warning", "Añade un usuario no root: USER appuser")
+def check_missing_user(instructions):
+    if instructions and not any(ins.keyword == "USER" for ins in _final_stage(instructions)):
+        yield None, "La imagen final no define USER y se ejecuta como root"
+
+
+@register_rule("AUD006", "info", "Define un directorio de trabajo: WORKDIR /app")
+def check_missing_workdir(instructions):
+    if instructions and not any(ins.keyword == "WORKDIR" for ins in _final_stage(instructions)):
+        yield None, "La imagen final no define WORKDIR"
+
+
+@register_rule("AUD007", "info", "Añade un HEALTHCHECK")
+def check_missing_healthcheck(instructions):
+    if instructions and not any(ins.keyword == "HEALTHCHECK" for ins in _final_stage(instructions)):
+        yield None, "La imagen final no define HEALTHCHECK"
+
+
+def check_dockerfile(content: str, filename: str, instructions: list[Instruction] | None = None) -> list:
+    """
+    Ejecuta todas las reglas registradas sobre un Dockerfile.
+
+    Args:
+        content (str): Contenido del Dockerfile.
+        filename (str): Nombre del archivo analizado.
+        instructions (list | None): Instrucciones ya obtenidas con
+            parse_dockerfile(); si es None se tokeniza el contenido.
+
+    Returns:
+        list: Hallazgos en el formato normalizado de app.utils.parsers.
+    """
+    if instructions is None:
+        instructions, _ = parse_dockerfile(content)
+    findings = []
+    for registered in RULES:
+        for line, message in registered["check"](instructions):
+            findings.append({
+                "tool": TOOL_NAME,
+                "file": filename,
+                "rule": registered["code"],
+                "severity": registered["severity"],
+                "message": message,
+                "line": line,
+                "fix": registered["fix"]
+            })
+    return findings
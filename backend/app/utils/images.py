@@ -0,0 +1,181 @@
+"""
+images.py
+
+Extracción de todas las imágenes referenciadas por un archivo:
+
+- Dockerfile: cada FROM de cada etapa, resolviendo los ARG declarados antes
+  del FROM (${VAR}, $VAR, ${VAR:-defecto}) y omitiendo scratch y las
+  referencias a etapas anteriores. Las instrucciones se obtienen con el
+  tokenizador de app.utils.dockerfile_rules (directiva escape, heredocs...).
+- docker-compose: el campo image de cada servicio (con ${VAR:-defecto}).
+- Kubernetes: la imagen de cada contenedor (containers, initContainers,
+  ephemeralContainers) de cada documento.
+
+Las imágenes se deduplican y cada una conserva la lista de orígenes (etapa,
+servicio o contenedor) donde aparece, para atribuirle sus hallazgos.
+"""
+
+import re
+
+from app.utils.dockerfile_rules import Instruction, parse_dockerfile
+from app.utils.manifests import describe_object, iter_containers, parse_yaml
+
+_VAR_PATTERN = re.compile(r"\$\{(\w+)(?::?([-+])([^}]*))?\}|\$(\w+)")
+# Argumentos de ARG y FROM (sin la palabra clave)
+_ARG_PATTERN = re.compile(r"^(\w+)(?:=(\S*))?")
+_FROM_PATTERN = re.compile(r"^(?:--platform=\S+\s+)?(\S+)(?:\s+AS\s+(\S+))?", re.IGNORECASE)
+
+
+def substitute_variables(value: str, variables: dict) -> str | None:
+    """
+    Sustituye variables estilo shell (${VAR}, $VAR, ${VAR:-defecto}, ${VAR:+alt}).
+
+    Returns:
+        str | None: Valor resuelto, o None si queda alguna variable sin valor.
+    """
+    unresolved = False
+
+    def _replace(match):
+        nonlocal unresolved
+        name = match.group(1) or match.group(4)
+        operator, operand = match.group(2), match.group(3)
+        current = variables.get(name)
+        if operator == "-":
+            return current if current else operand
+        if operator == "+":
+            return operand if current else ""
+        if current is None:
+            unresolved = True
+            return ""
+        return current
+
+    resolved = _VAR_PATTERN.sub(_replace, value)
+    return None if unresolved else resolved
+
+
+def _add(images: dict, image: str | None, origin: str):
+    if not image:
+        return
+    origins = images.setdefault(image, [])
+    if origin not in origins:
+        origins.append(origin)
+
+
+def extract_dockerfile_images(content: str, instructions: list[Instruction] | None = None) -> dict:
+    """
+    Extrae las imágenes base de todas las etapas de un Dockerfile.
+
+    Args:
+        content (str): Contenido del Dockerfile.
+        instructions (list | None): Instrucciones ya obtenidas con
+            parse_dockerfile(); si es None se tokeniza el contenido.
+
+    Returns:
+        dict: {imagen: [orígenes]} en orden de aparición.
+    """
+    if instructions is None:
+        instructions, _ = parse_dockerfile(content)
+    images = {}
+    global_args = {}
+    stages = set()
+    stage_index = 0
+    seen_from = False
+
+    for ins in instructions:
+        if ins.keyword == "ARG" and not seen_from:
+            arg = _ARG_PATTERN.match(ins.args)
+            if not arg:
+                continue
+            name, default = arg.group(1), arg.group(2)
+            if default is not None:
+                global_args[name] = substitute_variables(default, global_args)
+            else:
+                global_args.setdefault(name, None)
+            continue
+
+        match = _FROM_PATTERN.match(ins.args) if ins.keyword == "FROM" else None
+        if not match:
+            continue
+        seen_from = True
+        reference, alias = match.group(1), match.group(2)
+        origin = f"stage {alias or stage_index}"
+        stage_index += 1
+
+        image = substitute_variables(reference, global_args)
+        if image is not None and image.lower() != "scratch" and image.lower() not in stages:
+            _add(images, image, origin)
+        if alias:
+            stages.add(alias.lower())
+
+    return images
+
+
+def extract_compose_images(parsed) -> dict:
+    """
+    Extrae las imágenes de todos los servicios de un docker-compose ya parseado.
+
+    Returns:
+        dict: {imagen: [orígenes]} en orden de aparición.
+    """
+    images = {}
+    services = parsed.get("services") if isinstance(parsed, dict) else None
+    if not isinstance(services, dict):
+        return images
+    for name, service in services.items():
+        if isinstance(service, dict) and isinstance(service.get("image"), str):
+            _add(images, substitute_variables(service["image"], {}), f"service {name}")
+    return images
+
+
+def extract_kubernetes_images(documents: list) -> dict:
+    """
+    Extrae las imágenes de todos los contenedores de todos los documentos.
+
+    Returns:
+        dict: {imagen: [orígenes]} en orden de aparición.
+    """
+    images = {}
+    for doc in documents:
+        if not isinstance(doc, dict):
+            continue
+        for _, container in iter_containers(doc):
+            if isinstance(container.get("image"), str):
+                _add(images, container["image"],
+                     f"{describe_object(doc)} container {container.get('name', '?')}")
+    return images
+
+
+def extract_images(linter: str | None, content: str, documents: list | None = None) -> dict:
+    """
+    Extrae todas las imágenes de un archivo según su tipo.
+
+    Args:
+        linter (str | None): Tipo de archivo según detect_linter()
+            (hadolint, dclint o kube-linter).
+        content (str): Contenido del archivo.
+        documents (list | None): Documentos YAML ya parseados con parse_yaml(),
+            o instrucciones del Dockerfile (parse_dockerfile()); si es None se
+            parsea el contenido.
+
+    Returns:
+        dict: {imagen: [orígenes]} deduplicado y en orden de aparición.
+    """
+    if linter == "hadolint":
+        return extract_dockerfile_images(content, documents)
+    if linter not in ("dclint", "kube-linter"):
+        return {}
+
+    if documents is None:
+        documents = parse_yaml(content)
+    if documents is None:
+        # YAML inválido: se buscan las claves image: línea a línea
+        images = {}
+        for number, line in enumerate(content.splitlines(), start=1):
+            match = re.match(r'\s*-?\s*image:\s*["\']?([^\s"\']+)', line)
+            if match:
+                _add(images, match.group(1), f"line {number}")
+        return images
+
+    if linter == "dclint":
+        return extract_compose_images(documents[0] if documents else None)
+    return extract_kubernetes_images(documents)
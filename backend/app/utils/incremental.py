@@ -0,0 +1,341 @@
+"""
+incremental.py
+
+Reanálisis incremental de YAML (docker-compose y Kubernetes) a partir de un
+análisis anterior del historial.
+
+El archivo se divide en unidades: cada documento en Kubernetes (identificado
+por Kind/namespace/nombre) y cada servicio en docker-compose. Comparando el
+hash del texto de cada unidad con el del contenido guardado se sabe qué
+unidades han cambiado, y con ello:
+
+- kube-linter se ejecuta sobre una copia del archivo en la que las líneas
+  de las unidades sin cambios se sustituyen por líneas vacías, de modo que
+  los números de línea siguen siendo válidos. Como hay comprobaciones entre
+  objetos (p.ej. dangling-service), las unidades sin cambios relacionadas
+  con una modificada o eliminada (selectores, nombres referenciados) se
+  vuelven a analizar con ella, junto con todo su grupo de unidades
+  relacionadas.
+- Los hallazgos y los informes guardados de las demás unidades sin cambios
+  se reutilizan.
+- dclint se ejecuta siempre sobre el archivo completo: sus reglas comparan
+  servicios entre sí (puertos, nombres de contenedor, depends_on...).
+- Solo se analizan con trivy las imágenes usadas en unidades modificadas.
+- La remediación de Kubernetes reutiliza los documentos ya remediados.
+
+Si el YAML no es válido, cambia algo fuera de las unidades (p.ej. las claves
+de primer nivel de un docker-compose) o algún hallazgo guardado no se puede
+atribuir a su unidad, se hace el análisis completo de esa parte.
+"""
+
+import hashlib
+
+from app.utils.manifests import yaml_loader
+
+
+def _end_line(lines: list[str], mark) -> int:
+    """
+    Convierte la marca de fin de un nodo en el índice (exclusivo) de su última línea.
+    """
+    if mark.line < len(lines) and lines[mark.line][:mark.column].strip():
+        return mark.line + 1
+    return mark.line
+
+
+def _hash_lines(lines: list[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def _scalar(node, *path):
+    import yaml
+    for key in path:
+        if not isinstance(node, yaml.MappingNode):
+            return None
+        node = next((value for name, value in node.value if name.value == key), None)
+    return node.value if isinstance(node, yaml.ScalarNode) else None
+
+
+# Listas cuyos elementos tienen un nombre propio del objeto, que no hace
+# referencia a otros objetos (contenedores, volúmenes, puertos...)
+LOCAL_NAME_LISTS = {"containers", "initContainers", "ephemeralContainers", "volumes", "volumeMounts", "ports", "env"}
+
+
+def _label_pairs(node) -> frozenset:
+    import yaml
+    if not isinstance(node, yaml.MappingNode):
+        return frozenset()
+    return frozenset(
+        f"{key.value}={value.value}" for key, value in node.value if isinstance(value, yaml.ScalarNode)
+    )
+
+
+def _references(node, name: str) -> dict:
+    """
+    Recoge lo que relaciona un objeto de Kubernetes con otros: su nombre, sus
+    etiquetas (del objeto y de la plantilla de pods), sus selectores y todos
+    los valores escalares (nombres referenciados: backend de un Ingress,
+    scaleTargetRef, serviceAccountName, roleRef...), salvo los nombres
+    locales de LOCAL_NAME_LISTS.
+    """
+    import yaml
+    refs = {"name": name, "labels": set(), "selectors": [], "scalars": set()}
+    pending = [(node, None)]
+    while pending:
+        current, parent = pending.pop()
+        if isinstance(current, yaml.MappingNode):
+            for key, value in current.value:
+                if key.value == "name" and parent in LOCAL_NAME_LISTS:
+                    continue
+                if key.value == "labels":
+                    refs["labels"] |= _label_pairs(value)
+                elif key.value in ("selector", "matchLabels", "podSelector"):
+                    pairs = _label_pairs(value)
+                    # Un podSelector vacío selecciona todos los pods
+                    if pairs or key.value == "podSelector":
+                        refs["selectors"].append(pairs)
+                pending.append((value, key.value))
+        elif isinstance(current, yaml.SequenceNode):
+            pending.extend((item, parent) for item in current.value)
+        elif isinstance(current, yaml.ScalarNode):
+            refs["scalars"].add(current.value)
+    return refs
+
+
+def _related(a: dict, b: dict) -> bool:
+    """
+    Indica si dos objetos de Kubernetes se relacionan: uno nombra al otro o
+    uno selecciona las etiquetas del otro.
+    """
+    return (
+        b["name"] in a["scalars"] or a["name"] in b["scalars"]
+        or any(selector <= b["labels"] for selector in a["selectors"])
+        or any(selector <= a["labels"] for selector in b["selectors"])
+    )
+
+
+def _add_unit(units: dict, key: str, label: str, lines: list[str], start: int, end: int, refs: dict | None = None):
+    unique, count = key, 1
+    while unique in units:
+        count += 1
+        unique = f"{key}#{count}"
+    units[unique] = {
+        "label": label,
+        "start": start + 1,     # Líneas 1-based, ambos extremos incluidos
+        "end": end,
+        "hash": _hash_lines(lines[start:end]),
+        "refs": refs,
+    }
+
+
+def split_units(linter: str, content: str) -> dict | None:
+    """
+    Divide un YAML en unidades (documentos o servicios).
+
+    Args:
+        linter (str): dclint o kube-linter.
+        content (str): Contenido YAML.
+
+    Returns:
+        dict | None: {"units": {clave: {label, start, end, hash, refs}}, "outside": hash
+        del texto que no pertenece a ninguna unidad, "documents": número de
+        documentos}, o None si el YAML no es válido o no tiene la forma esperada.
+    """
+    import yaml
+    lines = content.splitlines()
+    units = {}
+    documents = 0
+    try:
+        if linter == "kube-linter":
+            for node in yaml.compose_all(content, Loader=yaml_loader()):
+                documents += 1
+                if not isinstance(node, yaml.MappingNode):
+                    continue
+                kind = _scalar(node, "kind") or "Object"
+                name = _scalar(node, "metadata", "name") or "<sin nombre>"
+                namespace = _scalar(node, "metadata", "namespace") or ""
+                _add_unit(units, f"{kind}/{namespace}/{name}", f"{kind}/{name}",
+                          lines, node.start_mark.line, _end_line(lines, node.end_mark),
+                          _references(node, name))
+        else:
+            root = yaml.compose(content, Loader=yaml_loader())
+            documents = 1
+            services = next((value for key, value in root.value if key.value == "services"), None) \
+                if isinstance(root, yaml.MappingNode) else None
+            if not isinstance(services, yaml.MappingNode):
+                return None
+            for key, value in services.value:
+                _add_unit(units, str(key.value), f"service {key.value}",
+                          lines, key.start_mark.line, _end_line(lines, value.end_mark))
+    except yaml.YAMLError:
+        return None
+
+    inside = set()
+    for unit in units.values():
+        inside.update(range(unit["start"] - 1, unit["end"]))
+    outside = [line for number, line in enumerate(lines) if number not in inside]
+    return {"units": units, "outside": _hash_lines(outside), "documents": documents}
+
+
+def plan_rescan(linter: str, old_content: str, new_content: str) -> dict | None:
+    """
+    Compara el contenido nuevo con el de un análisis anterior unidad a unidad.
+
+    Returns:
+        dict | None: Plan con:
+            - changed / unchanged / removed: claves de las unidades.
+            - changed_labels / unchanged_labels: etiquetas (Kind/nombre o
+              "service nombre") para atribuir hallazgos sin número de línea.
+            - relinted / relinted_labels: unidades sin cambios que el linter
+              vuelve a analizar por estar relacionadas con unidades
+              modificadas o eliminadas.
+            - reused_labels: etiquetas cuyos hallazgos del linter se reutilizan.
+            - shifts: {clave reutilizada: (inicio antiguo, fin antiguo, desplazamiento)}.
+            - old_order / new_order: claves en orden de aparición.
+            - aligned: True si cada documento es una unidad (en Kubernetes),
+              de modo que old_order y new_order corresponden a los documentos.
+            - partial_content: contenido nuevo con las unidades reutilizadas en blanco.
+        None si no se puede hacer un reanálisis incremental.
+    """
+    if linter not in ("dclint", "kube-linter"):
+        return None
+    old, new = split_units(linter, old_content), split_units(linter, new_content)
+    if old is None or new is None or not new["units"]:
+        return None
+    # En docker-compose, un cambio fuera de los servicios afecta a todo el archivo
+    if linter == "dclint" and old["outside"] != new["outside"]:
+        return None
+
+    changed, unchanged = [], []
+    for key, unit in new["units"].items():
+        previous = old["units"].get(key)
+        if previous is not None and previous["hash"] == unit["hash"]:
+            unchanged.append(key)
+        else:
+            changed.append(key)
+    removed = [key for key in old["units"] if key not in new["units"]]
+
+    relinted = set()
+    if linter == "kube-linter":
+        relinted = _relinted(old["units"], new["units"], changed, unchanged, removed)
+    kept = [key for key in unchanged if key not in relinted]
+    shifts = {}
+    lines = new_content.splitlines()
+    for key in kept:
+        unit, previous = new["units"][key], old["units"][key]
+        shifts[key] = (previous["start"], previous["end"], unit["start"] - previous["start"])
+        for number in range(unit["start"] - 1, unit["end"]):
+            lines[number] = ""
+
+    changed_labels = {new["units"][key]["label"] for key in changed}
+    relinted_labels = {new["units"][key]["label"] for key in relinted}
+    return {
+        "changed": changed,
+        "unchanged": unchanged,
+        "removed": removed,
+        "relinted": [key for key in unchanged if key in relinted],
+        "relinted_labels": relinted_labels,
+        "changed_labels": changed_labels,
+        "unchanged_labels": {new["units"][key]["label"] for key in unchanged} - changed_labels,
+        "reused_labels": {new["units"][key]["label"] for key in kept} - changed_labels - relinted_labels,
+        "shifts": shifts,
+        "old_order": list(old["units"]),
+        "new_order": list(new["units"]),
+        "aligned": old["documents"] == len(old["units"]) and new["documents"] == len(new["units"]),
+        "partial_content": "\n".join(lines) + "\n",
+    }
+
+
+def _relinted(old_units: dict, new_units: dict, changed: list, unchanged: list, removed: list) -> set:
+    """
+    Unidades sin cambios que hay que volver a analizar: las relacionadas
+    (directa o indirectamente) con una unidad modificada, o con una
+    eliminada según el contenido anterior.
+    """
+    seeds = {
+        key for key in unchanged
+        if any(_related(old_units[key]["refs"], old_units[gone]["refs"]) for gone in removed)
+    }
+    pending = list(changed) + list(seeds)
+    linted = set(pending)
+    while pending:
+        current = new_units[pending.pop()]["refs"]
+        for key in unchanged:
+            if key not in linted and _related(current, new_units[key]["refs"]):
+                linted.add(key)
+                pending.append(key)
+    return linted - set(changed)
+
+
+def reuse_findings(findings: list, plan: dict) -> list | None:
+    """
+    Selecciona los hallazgos guardados de un linter que pertenecen a unidades
+    sin cambios, ajustando su número de línea.
+
+    Los hallazgos con línea se atribuyen por rango de líneas; los de
+    kube-linter (sin línea) por su objeto (Kind/nombre). Los hallazgos con
+    línea de unidades modificadas se descartan, porque el linter los vuelve
+    a generar.
+
+    Returns:
+        list | None: Hallazgos reutilizables, o None si alguno no se puede atribuir.
+    """
+    reused = []
+    for finding in findings:
+        line = finding.get("line")
+        if isinstance(line, int):
+            for start, end, shift in plan["shifts"].values():
+                if start <= line <= end:
+                    reused.append({**finding, "line": line + shift})
+                    break
+            continue
+        if finding.get("object"):
+            if finding["object"] in plan["reused_labels"]:
+                reused.append(finding)
+            continue
+        if finding.get("tool") == "dclint":
+            # Hallazgos de archivo: el linter los vuelve a generar sobre el contenido parcial
+            continue
+        return None
+    return reused
+
+
+def reuse_reports(result, plan: dict) -> list:
+    """
+    Selecciona los informes guardados de kube-linter (salida JSON) que
+    pertenecen a unidades reutilizadas.
+    """
+    if not isinstance(result, dict):
+        return []
+    return [
+        report for report in result.get("Reports") or []
+        if _report_label(report) in plan["reused_labels"]
+    ]
+
+
+def _report_label(report: dict) -> str:
+    k8s_object = (report.get("Object") or {}).get("K8sObject") or {}
+    kind = (k8s_object.get("GroupVersionKind") or {}).get("Kind") or "Object"
+    return f"{kind}/{k8s_object.get('Name')}"
+
+
+def origin_changed(origin: str, plan: dict) -> bool:
+    """
+    Indica si un origen de imagen ("service web", "Deployment/app container c")
+    pertenece a una unidad modificada o nueva.
+    """
+    return any(origin == label or origin.startswith(label + " container ") for label in plan["changed_labels"])
+
+
+def split_documents(text: str) -> list[str]:
+    """
+    Separa la salida de yaml.dump_all en el texto de cada documento.
+    """
+    documents, current = [], []
+    for line in text.splitlines(keepends=True):
+        if line.rstrip("\n") == "---":
+            documents.append("".join(current))
+            current = []
+        else:
+            current.append(line)
+    documents.append("".join(current))
+    return documents
@@ -0,0 +1,246 @@
+"""
+jobs.py
+
+Cola de análisis en segundo plano, dentro del propio proceso.
+
+Los análisis largos (p.ej. trivy sobre imágenes grandes) se encolan y se
+devuelve inmediatamente un id de trabajo. Un conjunto de workers asyncio
+(JOB_WORKERS) consume la cola con el mismo pipeline que /scan/, y el estado,
+el progreso por herramienta y el resultado final se consultan por id.
+
+Configuración:
+    JOB_WORKERS       # Número de workers (por defecto 2)
+    JOB_QUEUE_MAX     # Trabajos en cola como máximo; si se llena, submit() falla
+    JOB_TTL           # Segundos que se conservan en memoria los trabajos terminados
+    JOB_PERSIST       # "1" para guardar los trabajos en la base de datos y
+                      # reanudar al arrancar los que quedaron pendientes
+    JOB_DIR           # Directorio donde se guardan los archivos pendientes
+
+Con varios workers de uvicorn, JOB_PERSIST=1 permite consultar un trabajo
+desde cualquier worker (el estado se lee de la base de datos). Cada trabajo
+guarda el proceso que lo ejecuta (owner); al arrancar, cada worker solo
+reanuda, bajo un bloqueo de archivo, los trabajos cuyo proceso ya no existe.
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.utils.admission import admit
+from app.utils.locks import file_lock
+from app.utils.pipeline import analyze_file
+from app.utils.storage import get_result, load_job, load_unfinished_jobs, prune_jobs, save_job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+JOB_PERSIST = os.getenv("JOB_PERSIST", "0") == "1"
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "auditor-jobs"))
+
+# Proceso que ejecuta los trabajos que encola este worker
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class QueueFullError(RuntimeError):
+    """
+    La cola de trabajos ha alcanzado JOB_QUEUE_MAX.
+    """
+
+
+_jobs: dict[str, dict] = {}
+_finished_at: dict[str, float] = {}
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+_last_db_prune = {"at": 0.0}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _persist(job: dict):
+    if JOB_PERSIST:
+        save_job(job)
+
+
+def _prune():
+    """
+    Elimina de memoria los trabajos terminados hace más de JOB_TTL segundos
+    y, con JOB_PERSIST, también de la base de datos (como mucho una vez por
+    minuto).
+    """
+    now = time.monotonic()
+    limit = now - JOB_TTL
+    for job_id in [job_id for job_id, finished in _finished_at.items() if finished < limit]:
+        _finished_at.pop(job_id, None)
+        _jobs.pop(job_id, None)
+    if JOB_PERSIST and now - _last_db_prune["at"] >= 60:
+        _last_db_prune["at"] = now
+        prune_jobs(JOB_TTL)
+
+
+async def _run_job(job: dict):
+    def progress(step: str, status: str):
+        job["progress"][step] = status
+
+    try:
+        # Comparte los presupuestos de /scan/ (app.utils.admission); el trabajo
+        # ya está aceptado, así que espera su turno sin ser rechazado
+        size = os.path.getsize(job["path"]) if os.path.exists(job["path"]) else 0
+        with await admit(size, block=True):
+            job["status"] = "running"
+            job["started_at"] = _now()
+            _persist(job)
+            previous = None
+            if job.get("previous_id") is not None:
+                previous = await asyncio.to_thread(get_result, job["previous_id"])
+            job["result"] = await analyze_file(
+                job["filename"], job["path"], progress=progress, mode=job.get("mode", "full"), previous=previous
+            )
+        job["status"] = "done"
+    except Exception as exc:
+        job["status"] = "error"
+        job["error"] = str(exc) or exc.__class__.__name__
+    finally:
+        job["finished_at"] = _now()
+        _finished_at[job["id"]] = time.monotonic()
+        if os.path.exists(job["path"]):
+            os.unlink(job["path"])
+        _persist(job)
+
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        try:
+            await _run_job(job)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=JOB_QUEUE_MAX)
+    if not _workers:
+        _workers.extend(asyncio.ensure_future(_worker()) for _ in range(JOB_WORKERS))
+
+
+def _enqueue(job: dict):
+    _ensure_workers()
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        raise QueueFullError("La cola de análisis está llena")
+    _jobs[job["id"]] = job
+    _persist(job)
+
+
+def submit(filename: str, path: str, mode: str = "full", previous_id: int | None = None) -> dict:
+    """
+    Encola el análisis de un archivo ya guardado en JOB_DIR.
+
+    Args:
+        filename (str): Nombre original del archivo.
+        path (str): Ruta del archivo; el trabajo lo elimina al terminar.
+        mode (str): Modo de análisis ("full" o "fast"), como en /scan/.
+        previous_id (int | None): Análisis anterior para el reanálisis incremental.
+
+    Returns:
+        dict: El trabajo creado (id, status, progress...).
+
+    Raises:
+        QueueFullError: Si la cola está llena.
+    """
+    _prune()
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "owner": _OWNER,
+        "filename": filename,
+        "path": path,
+        "mode": mode,
+        "previous_id": previous_id,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {},
+        "result": None,
+        "error": None,
+    }
+    _enqueue(job)
+    return job
+
+
+def new_job_path(suffix: str) -> str:
+    """
+    Devuelve una ruta nueva en JOB_DIR para guardar el archivo de un trabajo.
+    """
+    os.makedirs(JOB_DIR, exist_ok=True)
+    return os.path.join(JOB_DIR, f"{uuid.uuid4().hex}{suffix}")
+
+
+def get_job(job_id: str) -> dict | None:
+    """
+    Devuelve el estado público de un trabajo (sin la ruta interna), o None si no existe.
+    """
+    job = _jobs.get(job_id)
+    if job is None and JOB_PERSIST:
+        job = load_job(job_id)
+    if job is None:
+        return None
+    return {key: value for key, value in job.items() if key != "path"}
+
+
+def resume_pending_jobs():
+    """
+    Con JOB_PERSIST activo, vuelve a encolar los trabajos que quedaron en cola
+    o en ejecución al parar el proceso. Los que ya no tienen archivo se marcan
+    como error.
+    """
+    if not JOB_PERSIST:
+        return
+    os.makedirs(JOB_DIR, exist_ok=True)
+    # Un worker cada vez, para que dos workers no reanuden el mismo trabajo
+    with file_lock(os.path.join(JOB_DIR, "resume.lock")):
+        for job in load_unfinished_jobs():
+            if _owner_alive(job.get("owner")):
+                continue
+            if not job.get("path") or not os.path.exists(job["path"]):
+                job["status"] = "error"
+                job["error"] = "Trabajo interrumpido y archivo no disponible"
+                job["finished_at"] = _now()
+                save_job(job)
+                continue
+            job["status"] = "queued"
+            job["owner"] = _OWNER
+            job["progress"] = {}
+            try:
+                _enqueue(job)
+            except QueueFullError:
+                break
+
+
+def _owner_alive(owner: str | None) -> bool:
+    """
+    Indica si el trabajo lo está ejecutando otro proceso vivo. Los trabajos
+    de otro host (otra réplica) se consideran siempre de su proceso.
+    """
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    if int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,197 @@
+"""
+kubernetes_rules.py
+
+Motor de políticas para manifiestos de Kubernetes que se ejecuta dentro del
+proceso, sin lanzar kube-linter.
+
+Las reglas se registran con el decorador register_rule() indicando su ámbito:
+    - "pod": recibe la especificación de pod (hostNetwork, volúmenes...).
+    - "container": recibe cada contenedor (containers, initContainers y
+      ephemeralContainers) junto con su pod spec.
+
+Al importar el módulo las reglas quedan agrupadas por ámbito (POD_RULES y
+CONTAINER_RULES), de modo que check_kubernetes() evalúa todos los documentos
+en una sola pasada, reutilizando los documentos ya parseados con parse_yaml().
+
+Cada hallazgo usa el formato normalizado de app.utils.parsers con tool
+"auditor" y añade:
+{
+    "document": int,  # Índice del documento dentro del YAML (0-based)
+    "path": str       # Ruta tipo JSON path del campo afectado
+}
+
+Reglas incluidas:
+    AUD101  Contenedor privilegiado
+    AUD102  allowPrivilegeEscalation no es false
+    AUD103  runAsNonRoot no es true (ni en el contenedor ni en el pod)
+    AUD104  readOnlyRootFilesystem no es true
+    AUD105  Sin límites de CPU o memoria
+    AUD106  Sin requests de CPU o memoria
+    AUD107  Volumen hostPath
+    AUD108  hostNetwork, hostPID o hostIPC activados
+"""
+
+from app.utils.manifests import describe_object, find_pod_spec, iter_containers, parse_yaml
+
+TOOL_NAME = "auditor"
+
+RULES = []
+POD_RULES = []
+CONTAINER_RULES = []
+
+_SCOPES = {"pod": POD_RULES, "container": CONTAINER_RULES}
+
+
+def register_rule(code: str, severity: str, scope: str, fix: str | None = None):
+    """
+    Registra una regla en el motor.
+
+    La función decorada produce pares (ruta relativa | None, mensaje) por cada
+    incumplimiento. Las reglas de pod reciben (pod_spec) y las de contenedor
+    (container, pod_spec, field), donde field es containers, initContainers
+    o ephemeralContainers.
+
+    Args:
+        code (str): Identificador de la regla (p.ej. AUD101).
+        severity (str): error, warning o info.
+        scope (str): "pod" o "container".
+        fix (str | None): Sugerencia de remediación.
+    """
+    def decorator(check):
+        rule = {"code": code, "severity": severity, "fix": fix, "check": check}
+        RULES.append(rule)
+        _SCOPES[scope].append(rule)
+        return check
+    return decorator
+
+
+def _security_context(container: dict) -> dict:
+    context = container.get("securityContext")
+    return context if isinstance(context, dict) else {}
+
+
+@register_rule("AUD101", "error", "container", "Elimina securityContext.privileged o ponlo a false")
+def check_privileged(container, pod_spec, field):
+    if _security_context(container).get("privileged") is True:
+        yield "securityContext.privileged", "El contenedor se ejecuta en modo privilegiado"
+
+
+@register_rule("AUD102", "warning", "container", "Define securityContext.allowPrivilegeEscalation: false")
+def check_privilege_escalation(container, pod_spec, field):
+    if _security_context(container).get("allowPrivilegeEscalation") is not False:
+        yield "securityContext", "El contenedor permite escalada de privilegios"
+
+
+@register_rule("AUD103", "warning", "container", "Define securityContext.runAsNonRoot: true")
+def check_run_as_non_root(container, pod_spec, field):
+    pod_context = pod_spec.get("securityContext")
+    pod_value = pod_context.get("runAsNonRoot") if isinstance(pod_context, dict) else None
+    value = _security_context(container).get("runAsNonRoot", pod_value)
+    if value is not True:
+        yield "securityContext", "El contenedor puede ejecutarse como root"
+
+
+@register_rule("AUD104", "warning", "container", "Define securityContext.readOnlyRootFilesystem: true")
+def check_read_only_root(container, pod_spec, field):
+    if _security_context(container).get("readOnlyRootFilesystem") is not True:
+        yield "securityContext", "El sistema de archivos raíz del contenedor es escribible"
+
+
+def _missing_resources(container: dict, section: str) -> list:
+    resources = container.get("resources")
+    values = resources.get(section) if isinstance(resources, dict) else None
+    if not isinstance(values, dict):
+        values = {}
+    return [name for name in ("cpu", "memory") if name not in values]
+
+
+@register_rule("AUD105", "warning", "container", "Define resources.limits de cpu y memory")
+def check_limits(container, pod_spec, field):
+    # Los contenedores efímeros no admiten resources
+    if field == "ephemeralContainers":
+        return
+    missing = _missing_resources(container, "limits")
+    if missing:
+        yield "resources.limits", f"El contenedor no define límites de {', '.join(missing)}"
+
+
+@register_rule("AUD106", "info", "container", "Define resources.requests de cpu y memory")
+def check_requests(container, pod_spec, field):
+    if field == "ephemeralContainers":
+        return
+    missing = _missing_resources(container, "requests")
+    if missing:
+        yield "resources.requests", f"El contenedor no define requests de {', '.join(missing)}"
+
+
+@register_rule("AUD107", "error", "pod", "Sustituye hostPath por un volumen emptyDir, configMap o PVC")
+def check_host_path(pod_spec):
+    volumes = pod_spec.get("volumes")
+    if not isinstance(volumes, list):
+        return
+    for index, volume in enumerate(volumes):
+        if isinstance(volume, dict) and "hostPath" in volume:
+            host_path = volume["hostPath"].get("path") if isinstance(volume["hostPath"], dict) else None
+            yield f"volumes[{index}].hostPath", f"El volumen {volume.get('name', index)} monta la ruta del nodo {host_path}"
+
+
+@register_rule("AUD108", "error", "pod", "Elimina hostNetwork, hostPID y hostIPC del pod")
+def check_host_namespaces(pod_spec):
+    for field in ("hostNetwork", "hostPID", "hostIPC"):
+        if pod_spec.get(field) is True:
+            yield field, f"El pod comparte el espacio de nombres del nodo ({field})"
+
+
+def _finding(rule: dict, filename: str, document: int, path: str, message: str) -> dict:
+    return {
+        "tool": TOOL_NAME,
+        "file": filename,
+        "rule": rule["code"],
+        "severity": rule["severity"],
+        "message": message,
+        "line": None,
+        "fix": rule["fix"],
+        "document": document,
+        "path": path,
+    }
+
+
+def check_kubernetes(content: str, filename: str, documents: list | None = None) -> list:
+    """
+    Evalúa todas las reglas registradas sobre todos los documentos de un YAML.
+
+    Args:
+        content (str): Contenido YAML.
+        filename (str): Nombre del archivo analizado.
+        documents (list | None): Documentos ya parseados (parse_yaml); no se
+            modifican. Si es None se parsea el contenido.
+
+    Returns:
+        list: Hallazgos en el formato normalizado de app.utils.parsers.
+    """
+    if documents is None:
+        documents = parse_yaml(content)
+    if documents is None:
+        return []
+
+    findings = []
+    for document, doc in enumerate(documents):
+        found = find_pod_spec(doc)
+        if found is None:
+            continue
+        pod_path, pod_spec = found
+        name = describe_object(doc)
+
+        for rule in POD_RULES:
+            for path, message in rule["check"](pod_spec):
+                findings.append(_finding(rule, filename, document, f"{pod_path}.{path}", f"{name}: {message}"))
+
+        for container_path, container in iter_containers(doc):
+            field = container_path.rsplit(".", 1)[-1].split("[", 1)[0]
+            label = f"{name} container {container.get('name', '?')}"
+            for rule in CONTAINER_RULES:
+                for path, message in rule["check"](container, pod_spec, field):
+                    full_path = f"{container_path}.{path}" if path else container_path
+                    findings.append(_finding(rule, filename, document, full_path, f"{label}: {message}"))
+
+    return findings
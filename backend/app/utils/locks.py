@@ -0,0 +1,88 @@
+"""
+locks.py
+
+Bloqueos entre procesos mediante archivos (flock).
+
+Con varios workers de uvicorn o varias réplicas en el mismo nodo, el estado
+compartido (base de datos del historial, caché en disco, reanudación de
+trabajos) se coordina con bloqueos exclusivos sobre archivos de bloqueo. El
+sistema operativo libera el bloqueo si el proceso que lo tiene muere, de modo
+que un worker caído no deja bloqueado al resto.
+
+En plataformas sin fcntl (Windows) los bloqueos no hacen nada: solo hay un
+proceso por despliegue.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:     # pragma: no cover - Windows
+    fcntl = None
+
+# Cada cuánto se reintenta un bloqueo ocupado desde el event loop
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _open_lock(path: str) -> int:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """
+    Bloqueo exclusivo sobre un archivo, esperando si lo tiene otro proceso.
+
+    Args:
+        path (str): Ruta del archivo de bloqueo (se crea si no existe).
+        blocking (bool): Si es False no espera.
+
+    Yields:
+        bool: True si se ha obtenido el bloqueo (siempre, si blocking es True).
+    """
+    if fcntl is None:
+        yield True
+        return
+    fd = _open_lock(path)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@asynccontextmanager
+async def async_file_lock(path: str):
+    """
+    Como file_lock(), sin bloquear el event loop: reintenta cada
+    LOCK_POLL_INTERVAL segundos y se puede cancelar mientras espera.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = _open_lock(path)
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
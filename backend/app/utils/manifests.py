@@ -0,0 +1,124 @@
+"""
+manifests.py
+
+Parseo de YAML y utilidades para recorrer manifiestos de Kubernetes.
+
+Los archivos YAML (docker-compose y Kubernetes) se parsean una sola vez por
+análisis con parse_yaml(), usando el cargador en C de libyaml (CSafeLoader)
+si PyYAML se compiló con él, y los documentos resultantes se comparten entre
+la extracción de imágenes y la remediación. PyYAML se importa la primera vez
+que se parsea o se genera un YAML, no al arrancar la aplicación.
+
+Para Kubernetes, localiza la especificación de pod de cualquier tipo de
+workload (Pod, Deployment, StatefulSet, DaemonSet, ReplicaSet, Job,
+CronJob...) y recorre todos sus contenedores: containers, initContainers y
+ephemeralContainers.
+"""
+
+CONTAINER_FIELDS = ("containers", "initContainers", "ephemeralContainers")
+
+
+def yaml_loader():
+    """
+    Devuelve el cargador seguro de PyYAML (CSafeLoader si está disponible).
+    """
+    import yaml
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def dump_yaml(data, sort_keys: bool = True) -> str:
+    """
+    Serializa un documento con el serializador seguro de PyYAML (CSafeDumper si está disponible).
+    """
+    import yaml
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(data, Dumper=dumper, default_flow_style=False, sort_keys=sort_keys)
+
+
+def dump_yaml_all(documents: list) -> str:
+    """
+    Serializa varios documentos separados por ---.
+    """
+    import yaml
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump_all(documents, Dumper=dumper, default_flow_style=False)
+
+
+def parse_yaml(content: str) -> list | None:
+    """
+    Parsea todos los documentos de un YAML.
+
+    Args:
+        content (str): Contenido YAML (uno o varios documentos separados por ---).
+
+    Returns:
+        list | None: Lista de documentos, o None si el YAML no es válido.
+    """
+    import yaml
+    try:
+        return list(yaml.load_all(content, Loader=yaml_loader()))
+    except yaml.YAMLError:
+        return None
+
+
+def find_pod_spec(doc: dict) -> tuple[str, dict] | None:
+    """
+    Devuelve la especificación de pod de un documento y su ruta.
+
+    Args:
+        doc (dict): Documento de Kubernetes.
+
+    Returns:
+        tuple[str, dict] | None: (ruta tipo JSON path, pod spec), o None si el
+        documento no contiene ninguna.
+    """
+    if not isinstance(doc, dict):
+        return None
+    spec = doc.get("spec")
+    if not isinstance(spec, dict):
+        return None
+
+    if doc.get("kind") == "Pod":
+        return "spec", spec
+
+    job_template = spec.get("jobTemplate")
+    if isinstance(job_template, dict):
+        template = (job_template.get("spec") or {}).get("template")
+        if isinstance(template, dict) and isinstance(template.get("spec"), dict):
+            return "spec.jobTemplate.spec.template.spec", template["spec"]
+
+    template = spec.get("template")
+    if isinstance(template, dict) and isinstance(template.get("spec"), dict):
+        return "spec.template.spec", template["spec"]
+
+    return None
+
+
+def iter_containers(doc: dict):
+    """
+    Recorre todos los contenedores de un documento de Kubernetes.
+
+    Yields:
+        tuple[str, dict]: (ruta del contenedor, contenedor), p.ej.
+        ("spec.template.spec.initContainers[0]", {...}).
+    """
+    found = find_pod_spec(doc)
+    if found is None:
+        return
+    pod_path, pod_spec = found
+    for field in CONTAINER_FIELDS:
+        containers = pod_spec.get(field)
+        if not isinstance(containers, list):
+            continue
+        for index, container in enumerate(containers):
+            if isinstance(container, dict):
+                yield f"{pod_path}.{field}[{index}]", container
+
+
+def describe_object(doc: dict) -> str:
+    """
+    Devuelve un identificador legible de un objeto de Kubernetes (Kind/nombre).
+    """
+    kind = doc.get("kind") or "Object"
+    name = (doc.get("metadata") or {}).get("name") or "<sin nombre>"
+    return f"{kind}/{name}"
@@ -0,0 +1,218 @@
+"""
+metrics.py
+
+Métricas del pipeline de análisis en formato de texto de Prometheus, sin
+dependencias externas.
+
+Métricas expuestas en /metrics:
+    auditor_stage_seconds{stage}              # Duración de cada etapa (upload, read,
+                                              # yaml, cada herramienta, remediation, save)
+    auditor_tool_seconds{tool,phase}          # Subprocesos: spawn, run y parse (JSON)
+    auditor_tool_runs_total{tool,status}      # Ejecuciones por estado (ok, timeout, error)
+    auditor_findings_total{tool,severity}     # Hallazgos por herramienta y severidad
+    auditor_cache_requests_total{cache,result}  # Consultas a las cachés (hit, miss, shared)
+    auditor_scans_in_flight                   # Análisis en curso
+    auditor_history_entries                   # Análisis guardados en el historial
+    auditor_history_bytes                     # Tamaño de la base de datos del historial
+    auditor_admission_in_use{budget}          # Unidades ocupadas de cada presupuesto de admisión
+    auditor_admission_queue_depth{budget}     # Peticiones esperando en la cola de cada presupuesto
+    auditor_admission_wait_seconds{budget}    # Tiempo de espera hasta ser admitido
+    auditor_admission_rejections_total{reason}  # Peticiones rechazadas (queue_full, timeout, memory)
+
+Además, timed() acumula la duración de cada etapa de la petición en curso
+(mediante un ContextVar) para construir la cabecera Server-Timing.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = []
+_request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines += self._render_value(key, value)
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """
+    Contador monótono con etiquetas.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Valor que puede subir y bajar.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    Histograma con buckets acumulados, suma y recuento.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ((0,) * len(self.buckets), 0.0, 0))
+            counts = tuple(c + 1 if value <= bound else c for c, bound in zip(counts, self.buckets))
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        counts, total, count = value
+        lines = []
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts + (count,)):
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {bucket_count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("auditor_stage_seconds", "Duración de cada etapa del análisis", ("stage",))
+TOOL_SECONDS = Histogram("auditor_tool_seconds", "Duración de las fases de cada herramienta externa", ("tool", "phase"))
+TOOL_RUNS = Counter("auditor_tool_runs_total", "Ejecuciones de herramientas por estado", ("tool", "status"))
+FINDINGS = Counter("auditor_findings_total", "Hallazgos por herramienta y severidad", ("tool", "severity"))
+CACHE_REQUESTS = Counter("auditor_cache_requests_total", "Consultas a las cachés por resultado", ("cache", "result"))
+SCANS_IN_FLIGHT = Gauge("auditor_scans_in_flight", "Análisis en curso")
+HISTORY_ENTRIES = Gauge("auditor_history_entries", "Análisis guardados en el historial")
+HISTORY_BYTES = Gauge("auditor_history_bytes", "Tamaño en bytes de la base de datos del historial")
+ADMISSION_IN_USE = Gauge("auditor_admission_in_use", "Unidades ocupadas de cada presupuesto de admisión", ("budget",))
+ADMISSION_QUEUE_DEPTH = Gauge("auditor_admission_queue_depth", "Peticiones en la cola de admisión", ("budget",))
+ADMISSION_WAIT_SECONDS = Histogram("auditor_admission_wait_seconds", "Espera hasta ser admitido", ("budget",))
+ADMISSION_REJECTIONS = Counter("auditor_admission_rejections_total", "Peticiones rechazadas por el control de admisión", ("reason",))
+SCANS_IN_FLIGHT.set(0)
+
+
+def start_request_timing() -> dict:
+    """
+    Empieza a acumular las duraciones de las etapas de la petición actual.
+
+    Returns:
+        dict: {etapa: segundos}, que se rellena según avanza el análisis.
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float):
+    """
+    Registra la duración de una etapa en el histograma y, si hay una petición
+    en curso, en sus tiempos para Server-Timing.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Mide la duración del bloque como la etapa indicada.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def timed_tool(tool: str, phase: str):
+    """
+    Mide una fase (spawn, run o parse) de una herramienta externa.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool, phase=phase)
+
+
+def server_timing_header(timings: dict) -> str:
+    """
+    Construye la cabecera Server-Timing (duraciones en milisegundos).
+    """
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_metrics() -> str:
+    """
+    Devuelve todas las métricas en formato de texto de Prometheus.
+    """
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
@@ -15,8 +15,21 @@ Formato normalizado:
     "line": int | None, # Número de línea si aplica
     "fix": str | None   # Sugerencia de remediación o versión corregida
 }
+
+Los hallazgos de Trivy incluyen además:
+{
+    "image": str | None,  # Imagen analizada
+    "origin": str | None  # Etapa, servicio o contenedor que usa la imagen
+}
+
+Los de Kube-linter incluyen el objeto al que se refieren:
+{
+    "object": str | None  # Kind/nombre, como app.utils.manifests.describe_object
+}
 """
 
+from app.utils.vulns import VulnerabilityTable
+
 def normalize_hadolint(data: list, filename: str) -> list:
     """
     Estandariza la salida de Hadolint a un formato común.
@@ -46,17 +59,37 @@ def normalize_hadolint(data: list, filename: str) -> list:
     ]
 
 
-def normalize_trivy(data: list, filename: str) -> list:
+def normalize_trivy(data, filename: str, image: str | None = None, origin: str | None = None) -> list:
     """
     Normaliza la salida de Trivy a un formato común.
 
     Args:
-        data (list): Lista con vulnerabilidades detectadas por trivy.
+        data (VulnerabilityTable | list): Vulnerabilidades detectadas por
+            trivy, por columnas (app.utils.vulns) o como lista de diccionarios.
         filename (str): Nombre del archivo o imagen analizada.
+        image (str | None): Imagen a la que pertenecen las vulnerabilidades.
+        origin (str | None): Etapa, servicio o contenedor donde se usa la imagen.
 
     Returns:
         list: Lista de resultados normalizados.
     """
+    if isinstance(data, VulnerabilityTable):
+        # Directamente desde las columnas, sin pasar por un diccionario por vulnerabilidad
+        return [
+            {
+                "tool": "trivy",
+                "file": filename,
+                "rule": rule,
+                "severity": severity,
+                "message": title,
+                "line": None,
+                "fix": fix,
+                "image": image,
+                "origin": origin
+            }
+            for rule, severity, title, fix in zip(data.ids, data.severities, data.titles, data.fixed)
+        ]
+
     if not isinstance(data, list):
         return []
 
@@ -68,7 +101,9 @@ def normalize_trivy(data: list, filename: str) -> list:
             "severity": item.get("Severity"),
             "message": item.get("Title"),
             "line": None,
-            "fix": item.get("FixedVersion")
+            "fix": item.get("FixedVersion"),
+            "image": image,
+            "origin": origin
         }
         for item in data
     ]
@@ -91,6 +126,8 @@ def normalize_kubelinter(data: dict, filename: str) -> list:
 
     findings = []
     for report in data.get("Reports", []):
+        k8s_object = report.get("Object", {}).get("K8sObject") or {}
+        kind = (k8s_object.get("GroupVersionKind") or {}).get("Kind")
         findings.append({
             "tool": "kube-linter",
             "file": report.get("Object", {}).get("Metadata", {}).get("FilePath", filename),
@@ -98,7 +135,8 @@ def normalize_kubelinter(data: dict, filename: str) -> list:
             "severity": "danger",  # puedes ajustar según criticidad si se añade
             "message": report.get("Diagnostic", {}).get("Message"),
             "line": None,
-            "fix": report.get("Remediation")
+            "fix": report.get("Remediation"),
+            "object": f"{kind}/{k8s_object.get('Name')}" if kind and k8s_object.get("Name") else None
         })
     return findings
 
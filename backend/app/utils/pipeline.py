@@ -0,0 +1,693 @@
+"""
+pipeline.py
+
+Pipeline de análisis compartido por los endpoints de app.routers.scan:
+clasificación del archivo, ejecución de linters y trivy (con caché),
+normalización de hallazgos, remediación y guardado en el historial.
+
+También incluye la ejecución agrupada de linters, que permite analizar
+muchos archivos con un único proceso por herramienta.
+"""
+
+import asyncio
+import json
+import os
+from app.utils.parsers import (
+    normalize_hadolint,
+    normalize_trivy,
+    normalize_kubelinter,
+    normalize_dclint,
+)
+from app.utils.suggestions import (
+    REMEDIATION_VERSION,
+    suggest_remediations_dockerfile,
+    suggest_remediations_docker_compose,
+    suggest_remediations_kubernetes_yaml
+)
+
+from app.utils.cache import scan_cache, cache_key, content_hash
+from app.utils.dockerfile_rules import check_dockerfile, parse_dockerfile
+from app.utils.images import extract_images
+from app.utils.incremental import origin_changed, plan_rescan, reuse_findings, reuse_reports, split_documents
+from app.utils.kubernetes_rules import check_kubernetes
+from app.utils.manifests import parse_yaml
+from app.utils.metrics import (
+    CACHE_REQUESTS,
+    FINDINGS,
+    SCANS_IN_FLIGHT,
+    TOOL_RUNS,
+    timed,
+    timed_tool,
+)
+from app.utils.pool import LINTER_BATCH_TOOLS, MicroBatcher
+from app.utils.runner import UNKNOWN_VERSION, ToolTimeoutError, run_tool, tool_version
+from app.utils.storage import save_result
+from app.utils.trivy import scan_image, trivy_db_version
+
+# Número máximo de rutas por invocación agrupada de un linter
+BATCH_MAX_PATHS_PER_RUN = int(os.getenv("BATCH_MAX_PATHS_PER_RUN", "100"))
+
+def detect_linter(filename: str) -> str | None:
+    """
+    Determina qué linter corresponde a un archivo según su nombre.
+
+    Args:
+    -----------
+    filename : str
+        Nombre del archivo subido.
+
+    Returns:
+    --------
+    str | None
+        hadolint, dclint, kube-linter o None si el tipo no está soportado.
+    """
+
+    if "Dockerfile" in filename or filename.endswith(".Dockerfile"):
+        return "hadolint"
+    if "docker-compose" in filename or filename.endswith("compose.yaml"):
+        return "dclint"
+    if filename.endswith(".yaml") or filename.endswith(".yml"):
+        return "kube-linter"
+    return None
+
+# Argumentos de cada linter; las rutas a analizar se añaden al final
+LINTER_ARGS = {
+    "hadolint": ["--format", "json"],
+    "dclint": ["-f", "json"],
+    "kube-linter": ["lint", "--format", "json"],
+}
+
+async def run_linter(tool: str, path: str):
+    """
+    Ejecuta el linter indicado sobre un archivo y devuelve su salida JSON.
+    Los linters de LINTER_BATCH_TOOLS (app.utils.pool) se agrupan con las
+    peticiones concurrentes en una sola invocación.
+    """
+
+    if tool in LINTER_BATCH_TOOLS:
+        return await _linter_batcher(tool).submit(path)
+    output = await run_tool(tool, LINTER_ARGS[tool] + [path])
+    try:
+        with timed_tool(tool, "parse"):
+            return json.loads(output.stdout)
+    except json.JSONDecodeError:
+        return {"error": f"Error parsing {tool} output"}
+
+def split_linter_output(tool: str, data, paths: list[str]) -> dict:
+    """
+    Reparte la salida JSON de una ejecución agrupada de un linter entre los
+    archivos analizados, con el mismo formato que una ejecución individual.
+
+    Args:
+    -----------
+    tool : str
+        hadolint, dclint o kube-linter.
+    data : list | dict
+        Salida JSON de la ejecución agrupada.
+    paths : list[str]
+        Rutas pasadas al linter.
+
+    Returns:
+    --------
+    dict
+        Resultado del linter para cada ruta.
+    """
+
+    if isinstance(data, dict) and "error" in data:
+        return {path: data for path in paths}
+
+    by_path = {os.path.abspath(path): path for path in paths}
+    if tool == "kube-linter":
+        split = {path: {"Reports": []} for path in paths}
+        for report in (data or {}).get("Reports", []):
+            file_path = report.get("Object", {}).get("Metadata", {}).get("FilePath", "")
+            path = by_path.get(os.path.abspath(file_path))
+            if path is not None:
+                split[path]["Reports"].append(report)
+        return split
+
+    # hadolint informa la ruta en "file" y dclint en "filePath"
+    key = "file" if tool == "hadolint" else "filePath"
+    split = {path: [] for path in paths}
+    for item in data or []:
+        path = by_path.get(os.path.abspath(str(item.get(key, ""))))
+        if path is not None:
+            split[path].append(item)
+    return split
+
+async def run_linter_batch(tool: str, paths: list[str]) -> dict:
+    """
+    Ejecuta un linter una sola vez sobre muchos archivos (en bloques de
+    BATCH_MAX_PATHS_PER_RUN rutas) y devuelve el resultado de cada archivo.
+    """
+
+    split = {}
+    chunks = [paths[i:i + BATCH_MAX_PATHS_PER_RUN] for i in range(0, len(paths), BATCH_MAX_PATHS_PER_RUN)]
+    for chunk in chunks:
+        output = await run_tool(tool, LINTER_ARGS[tool] + chunk)
+        try:
+            with timed_tool(tool, "parse"):
+                data = json.loads(output.stdout)
+        except json.JSONDecodeError:
+            data = {"error": f"Error parsing {tool} output"}
+        split.update(split_linter_output(tool, data, chunk))
+    return split
+
+_batchers: dict[str, MicroBatcher] = {}
+
+def _linter_batcher(tool: str) -> MicroBatcher:
+    if tool not in _batchers:
+        _batchers[tool] = MicroBatcher(lambda paths: run_linter_batch(tool, paths))
+    return _batchers[tool]
+
+NORMALIZERS = {
+    "hadolint": normalize_hadolint,
+    "dclint": normalize_dclint,
+    "kube-linter": normalize_kubelinter,
+    "trivy": normalize_trivy,
+}
+
+REMEDIATORS = {
+    "hadolint": suggest_remediations_dockerfile,
+    "dclint": suggest_remediations_docker_compose,
+    "kube-linter": suggest_remediations_kubernetes_yaml,
+}
+
+async def is_cached(tool: str, digest: str) -> bool:
+    """
+    Indica si el resultado de una herramienta para un contenido está en la caché.
+    """
+
+    return await scan_cache.aget(cache_key(digest, tool, await tool_version(tool))) is not None
+
+async def scan_tool(tool: str, digest: str, filename: str, run):
+    """
+    Ejecuta una herramienta consultando antes la caché direccionada por contenido.
+
+    Args:
+    -----------
+    tool : str
+        Nombre de la herramienta.
+    digest : str
+        SHA-256 del contenido analizado.
+    filename : str
+        Nombre del archivo subido (se usa como "file" de los hallazgos).
+    run : Callable
+        Función sin argumentos que devuelve la corrutina que ejecuta la herramienta.
+
+    Returns:
+    --------
+    tuple
+        (resultado bruto, hallazgos normalizados, "hit" | "miss")
+    """
+
+    version = await tool_version(tool)
+    key = cache_key(digest, tool, version)
+    cached = await scan_cache.aget(key)
+    if cached is not None:
+        result, findings, status = cached["result"], cached["findings"], "hit"
+    else:
+        result = await run()
+        findings = NORMALIZERS[tool](result, filename)
+        status = "miss"
+        # Sin versión conocida el resultado no se guarda: la clave no cambiaría al actualizar la herramienta
+        if version != UNKNOWN_VERSION and not (isinstance(result, dict) and "error" in result):
+            await scan_cache.aset(key, {"result": result, "findings": findings})
+
+    # La ruta temporal no tiene sentido para el cliente: se usa el nombre subido
+    return result, [{**finding, "file": filename} for finding in findings], status
+
+async def scan_trivy(images: dict, filename: str):
+    """
+    Analiza en paralelo todas las imágenes del archivo con trivy, usando la
+    caché por imagen de app.utils.trivy. El número de procesos trivy
+    simultáneos lo limita TOOL_CONCURRENCY_TRIVY (app.utils.runner).
+
+    Args:
+    -----------
+    images : dict
+        {imagen: [orígenes]} según extract_images().
+    filename : str
+        Nombre del archivo subido.
+
+    Returns:
+    --------
+    tuple
+        (informes por imagen, hallazgos normalizados atribuidos a su origen,
+         {imagen: "hit" | "shared" | "miss"})
+        Las imágenes que fallan o superan el timeout se informan con "error"
+        y "status" ("error" | "timeout") sin interrumpir el resto.
+    """
+
+    scans = await asyncio.gather(*(scan_image(image) for image in images), return_exceptions=True)
+
+    reports = []
+    findings = []
+    status = {}
+    for (image, origins), scan in zip(images.items(), scans):
+        origin = ", ".join(origins)
+        if isinstance(scan, ToolTimeoutError):
+            status[image] = "miss"
+            reports.append({"Image": image, "Origins": origins, "error": str(scan), "status": "timeout"})
+            continue
+        if isinstance(scan, Exception):
+            status[image] = "miss"
+            reports.append({"Image": image, "Origins": origins, "error": str(scan) or scan.__class__.__name__, "status": "error"})
+            continue
+        result, status[image] = scan
+        if isinstance(result, dict) and "error" in result:
+            reports.append({"Image": image, "Origins": origins, **result, "status": "error"})
+            continue
+        findings += normalize_trivy(result, filename, image, origin)
+        # El informe por vulnerabilidad solo se materializa para la respuesta
+        reports.append({"Image": image, "Origins": origins, "Vulnerabilities": result.records()})
+    return reports, findings, status
+
+def remediate(linter: str | None, digest: str, content: str, documents: list | None = None):
+    """
+    Genera el contenido remediado, reutilizándolo desde la caché si existe.
+    Para YAML reutiliza los documentos ya parseados (que se modifican en el
+    sitio, por lo que debe ser su último uso).
+
+    Returns:
+    --------
+    tuple
+        (contenido sugerido, "hit" | "miss")
+    """
+
+    if linter not in REMEDIATORS:
+        return "", "miss"
+    # El mismo contenido se remedia distinto según el tipo de archivo detectado
+    key = cache_key(digest, f"remediation-{linter}", REMEDIATION_VERSION)
+    suggested_content = scan_cache.get(key)
+    if suggested_content is not None:
+        return suggested_content, "hit"
+    if linter == "hadolint":
+        suggested_content = REMEDIATORS[linter](content)
+    else:
+        suggested_content = REMEDIATORS[linter](content, documents)
+    scan_cache.set(key, suggested_content)
+    return suggested_content, "miss"
+
+async def _tracked(step: str, coro, progress):
+    """
+    Espera una corrutina del pipeline notificando su progreso si se pide.
+    """
+
+    if progress is None:
+        return await coro
+    progress(step, "running")
+    try:
+        output = await coro
+    except ToolTimeoutError:
+        progress(step, "timeout")
+        raise
+    except Exception:
+        progress(step, "error")
+        raise
+    progress(step, "done")
+    return output
+
+def _result_status(result) -> str:
+    """
+    Devuelve el estado de una herramienta a partir de su resultado: "error"
+    si devolvió un error y, para trivy, el peor estado de sus imágenes.
+    """
+
+    if isinstance(result, dict):
+        return "error" if "error" in result else "ok"
+    statuses = {report.get("status") for report in result if isinstance(report, dict)} if isinstance(result, list) else set()
+    if "timeout" in statuses:
+        return "timeout"
+    if "error" in statuses:
+        return "error"
+    return "ok"
+
+async def _run_step(step: str, coro, progress, on_step=None):
+    """
+    Ejecuta la tarea de una herramienta sin que su fallo o su timeout
+    interrumpa al resto, para poder devolver resultados parciales. Si se
+    indica on_step, se llama con (herramienta, estado, hallazgos) en cuanto
+    la herramienta termina.
+
+    Returns:
+    --------
+    tuple
+        (resultado, hallazgos, estado de caché, "ok" | "timeout" | "error")
+    """
+
+    try:
+        with timed(step):
+            result, findings, status = await _tracked(step, coro, progress)
+        output = result, findings, status, _result_status(result)
+    except ToolTimeoutError as exc:
+        output = {"error": str(exc)}, [], None, "timeout"
+    except Exception as exc:
+        output = {"error": str(exc) or exc.__class__.__name__}, [], None, "error"
+    if on_step is not None:
+        on_step(step, output[3], output[1])
+    return output
+
+def _record_metrics(tool_status: dict, findings: list, cache_status: dict):
+    """
+    Actualiza los contadores de ejecuciones, hallazgos y consultas a caché
+    de un análisis (ver app.utils.metrics).
+    """
+
+    for tool, status in tool_status.items():
+        TOOL_RUNS.inc(tool=tool, status=status)
+    # Se agrupa antes de actualizar el contador: trivy puede devolver miles de hallazgos
+    counts = {}
+    for finding in findings:
+        key = (finding.get("tool"), finding.get("severity"))
+        counts[key] = counts.get(key, 0) + 1
+    for (tool, severity), count in counts.items():
+        FINDINGS.inc(count, tool=tool, severity=str(severity or "unknown").lower())
+    for cache, status in cache_status.items():
+        # trivy informa el estado de cada imagen
+        for result in (status.values() if isinstance(status, dict) else [status]):
+            CACHE_REQUESTS.inc(cache=cache, result=result)
+
+def read_file(path: str, digest: str | None = None) -> tuple[str, str]:
+    """
+    Lee un archivo de texto UTF-8 del disco y calcula su SHA-256 si no se conoce.
+
+    Returns:
+    --------
+    tuple
+        (contenido decodificado, SHA-256)
+    """
+
+    with open(path, "rb") as f:
+        content = f.read()
+    return content.decode(), digest or content_hash(content)
+
+# Motores de reglas internos (sin subprocesos) para cada tipo de archivo
+NATIVE_CHECKS = {
+    "hadolint": check_dockerfile,
+    "kube-linter": check_kubernetes,
+}
+
+SCAN_MODES = ("full", "fast")
+
+async def run_native_checks(linter: str, content: str, filename: str, documents: list | None = None):
+    """
+    Ejecuta el motor de reglas interno del tipo de archivo en un hilo,
+    reutilizando los documentos YAML o las instrucciones del Dockerfile ya
+    parseados (sin modificarlos).
+
+    Returns:
+    --------
+    tuple
+        (resumen, hallazgos normalizados, None)
+    """
+
+    findings = await asyncio.to_thread(NATIVE_CHECKS[linter], content, filename, documents)
+    return {"findings": len(findings)}, findings, None
+
+async def scan_partial(linter: str, plan: dict, path: str, filename: str, reused: list, previous_result=None):
+    """
+    Ejecuta el linter solo sobre las unidades modificadas y las relacionadas
+    con ellas (el contenido parcial del plan incremental) y añade los
+    hallazgos e informes reutilizados.
+
+    Returns:
+    --------
+    tuple
+        (resultado del linter con los informes reutilizados, hallazgos, estado de caché)
+    """
+
+    base, extension = os.path.splitext(path)
+    partial_path = f"{base}.partial{extension}"
+    partial = plan["partial_content"].encode()
+    await asyncio.to_thread(_write_file, partial_path, partial)
+    try:
+        result, findings, status = await scan_tool(
+            linter, content_hash(partial), filename, lambda: run_linter(linter, partial_path)
+        )
+    finally:
+        if os.path.exists(partial_path):
+            os.unlink(partial_path)
+    if isinstance(result, dict):
+        result = {**result, "Reports": reuse_reports(previous_result, plan) + (result.get("Reports") or [])}
+    return result, reused + findings, status
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+async def _reused(result, plan: dict, findings: list):
+    if isinstance(result, dict):
+        result = {**result, "Reports": reuse_reports(result, plan)}
+    return result, findings, "reused"
+
+async def scan_trivy_incremental(images: dict, plan: dict, previous: dict, filename: str):
+    """
+    Analiza con trivy solo las imágenes usadas en unidades modificadas y
+    reutiliza del análisis anterior los informes del resto.
+
+    Returns:
+    --------
+    tuple
+        Como scan_trivy(); las imágenes reutilizadas tienen estado "reused".
+    """
+
+    previous_reports = {
+        report.get("Image"): report
+        for report in previous.get("results", {}).get("trivy") or []
+        if isinstance(report, dict) and "Vulnerabilities" in report
+    }
+    changed = {}
+    reused = {}
+    for image, origins in images.items():
+        if image in previous_reports and not any(origin_changed(origin, plan) for origin in origins):
+            reused[image] = origins
+        else:
+            changed[image] = origins
+
+    reports, findings, status = await scan_trivy(changed, filename) if changed else ([], [], {})
+    for image, origins in reused.items():
+        origin = ", ".join(origins)
+        status[image] = "reused"
+        reports.append({**previous_reports[image], "Origins": origins})
+        findings += [
+            {**finding, "file": filename, "origin": origin}
+            for finding in previous.get("normalized_findings", [])
+            if finding.get("tool") == "trivy" and finding.get("image") == image
+        ]
+    return reports, findings, status
+
+def remediate_incremental(plan: dict, previous: dict, documents: list):
+    """
+    Remedia solo los documentos de Kubernetes modificados y reutiliza los ya
+    remediados del análisis anterior.
+
+    Returns:
+    --------
+    str | None
+        Contenido sugerido, o None si no se puede reutilizar.
+    """
+
+    if previous.get("remediation_version") != REMEDIATION_VERSION or not plan["aligned"]:
+        return None
+    chunks = split_documents(previous.get("suggested_content") or "")
+    if len(chunks) != len(plan["old_order"]) or len(documents) != len(plan["new_order"]):
+        return None
+
+    old_chunks = dict(zip(plan["old_order"], chunks))
+    unchanged = set(plan["unchanged"])
+    parts = []
+    for key, doc in zip(plan["new_order"], documents):
+        if key in unchanged:
+            parts.append(old_chunks[key])
+        else:
+            parts.append(REMEDIATORS["kube-linter"]("", [doc]))
+    return "---\n".join(parts)
+
+async def analyze_file(
+    filename: str,
+    path: str,
+    digest: str | None = None,
+    run_linter_fn=None,
+    progress=None,
+    mode: str = "full",
+    previous: dict | None = None,
+    on_step=None,
+) -> dict:
+    """
+    Analiza un archivo ya guardado en disco y guarda el resultado en el historial.
+
+    Args:
+    -----------
+    filename : str
+        Nombre original del archivo (decide el linter y la remediación).
+    path : str
+        Ruta del archivo en disco; las herramientas lo leen desde ahí.
+    digest : str | None
+        SHA-256 del contenido si ya se calculó al recibirlo.
+    run_linter_fn : Callable | None
+        Alternativa a run_linter() (p.ej. el resultado de una ejecución agrupada).
+    progress : Callable | None
+        Función progress(paso, estado) que recibe "running", "done", "timeout"
+        o "error" para cada herramienta y para la remediación.
+    mode : str
+        "full" ejecuta las herramientas externas y las reglas internas;
+        "fast" solo las reglas internas (tool "auditor"), sin subprocesos.
+    previous : dict | None
+        Análisis anterior del mismo archivo (entrada completa del historial).
+        En docker-compose y Kubernetes solo se vuelven a analizar los
+        servicios o documentos modificados (ver app.utils.incremental); la
+        respuesta incluye "incremental" con las partes reutilizadas.
+    on_step : Callable | None
+        Función (herramienta, estado, hallazgos) que se llama en cuanto cada
+        herramienta termina, antes de la remediación; la usa el modo
+        streaming de /scan/.
+
+    Returns:
+    --------
+    dict
+        Respuesta del análisis (ver scan_file en app.routers.scan).
+    """
+
+    SCANS_IN_FLIGHT.inc()
+    try:
+        with timed("read"):
+            decoded_content, digest = await asyncio.to_thread(read_file, path, digest)
+
+        # Los YAML se parsean una sola vez: reglas internas, imágenes y remediación
+        # comparten los documentos. Del mismo modo, el Dockerfile se tokeniza
+        # una vez para las reglas internas y la extracción de imágenes
+        linter = detect_linter(filename)
+        documents = None
+        if linter in ("dclint", "kube-linter"):
+            with timed("yaml"):
+                documents = await asyncio.to_thread(parse_yaml, decoded_content)
+        elif linter == "hadolint":
+            documents, _ = await asyncio.to_thread(parse_dockerfile, decoded_content)
+
+        # Reanálisis incremental: solo si el análisis anterior es del mismo
+        # tipo de archivo y se hizo con las mismas versiones de las herramientas
+        plan = None
+        versions = {}
+        if linter and mode != "fast":
+            versions[linter] = await tool_version(linter)
+        if previous is not None and linter in ("dclint", "kube-linter") and mode != "fast" \
+                and detect_linter(previous.get("filename") or "") == linter:
+            with timed("plan"):
+                plan = await asyncio.to_thread(
+                    plan_rescan, linter, previous.get("original_content") or "", decoded_content
+                )
+        incremental_tools = {}
+
+        # El linter y trivy se ejecutan en paralelo, sin bloquear el event loop
+        tasks = {}
+        if linter and mode != "fast":
+            run = run_linter_fn or (lambda: run_linter(linter, path))
+            reused = None
+            # dclint se ejecuta siempre completo: sus reglas comparan servicios entre sí
+            if plan is not None and linter == "kube-linter" and versions[linter] != UNKNOWN_VERSION \
+                    and (previous.get("tool_versions") or {}).get(linter) == versions[linter] \
+                    and previous.get("tool_status", {}).get(linter) == "ok":
+                reused = reuse_findings(
+                    [f for f in previous.get("normalized_findings", []) if f.get("tool") == linter], plan
+                )
+            if reused is None:
+                tasks[linter] = scan_tool(linter, digest, filename, run)
+                incremental_tools[linter] = "full"
+            elif not plan["changed"] and not plan["relinted"]:
+                tasks[linter] = _reused(
+                    previous["results"].get(linter), plan, [{**f, "file": filename} for f in reused]
+                )
+                incremental_tools[linter] = "reused"
+            else:
+                tasks[linter] = scan_partial(
+                    linter, plan, path, filename, [{**f, "file": filename} for f in reused],
+                    previous["results"].get(linter),
+                )
+                incremental_tools[linter] = "partial"
+        if linter in NATIVE_CHECKS:
+            tasks["auditor"] = run_native_checks(linter, decoded_content, filename, documents)
+
+        images = extract_images(linter, decoded_content, documents) if mode != "fast" else {}
+        if images:
+            # La versión de la base de datos de trivy se consulta dentro del
+            # paso de trivy, en paralelo con el linter
+            async def trivy_step():
+                versions["trivy"] = await trivy_db_version()
+                if plan is not None and (previous.get("tool_versions") or {}).get("trivy") == versions["trivy"]:
+                    incremental_tools["trivy"] = "partial"
+                    return await scan_trivy_incremental(images, plan, previous, filename)
+                incremental_tools["trivy"] = "full"
+                return await scan_trivy(images, filename)
+
+            tasks["trivy"] = trivy_step()
+
+        outputs = await asyncio.gather(*(_run_step(tool, task, progress, on_step) for tool, task in tasks.items()))
+
+        results = {}
+        normalized = []
+        cache_status = {}
+        tool_status = {}
+        for tool, (result, findings, status, run_status) in zip(tasks.keys(), outputs):
+            results[tool] = result
+            normalized += findings
+            tool_status[tool] = run_status
+            if status is not None:
+                cache_status[tool] = status
+
+        if progress is not None:
+            progress("remediation", "running")
+        with timed("remediation"):
+            suggested_content = None
+            if plan is not None and linter == "kube-linter":
+                suggested_content = await asyncio.to_thread(remediate_incremental, plan, previous, documents)
+            if suggested_content is not None:
+                cache_status["remediation"] = "partial"
+                incremental_tools["remediation"] = "partial"
+            else:
+                suggested_content, cache_status["remediation"] = await asyncio.to_thread(
+                    remediate, linter, digest, decoded_content, documents
+                )
+                incremental_tools["remediation"] = "full"
+        if progress is not None:
+            progress("remediation", "done")
+
+        with timed("save"):
+            entry_id = await asyncio.to_thread(save_result, {
+                "filename": filename,
+                "original_content": decoded_content,
+                "suggested_content": suggested_content,
+                "tools_run": list(results.keys()),
+                "tool_status": tool_status,
+                "tool_versions": versions,
+                "remediation_version": REMEDIATION_VERSION,
+                "results": results,
+                "normalized_findings": normalized
+            })
+        _record_metrics(tool_status, normalized, cache_status)
+
+        response = {
+            "id": entry_id,
+            "filename": filename,
+            "original_content": decoded_content,
+            "tools_run": list(results.keys()),
+            "tool_status": tool_status,
+            "partial": any(status != "ok" for status in tool_status.values()),
+            "results": results,
+            "normalized_findings": normalized,
+            "suggested_content": suggested_content,
+            "cache": cache_status
+        }
+        if previous is not None:
+            response["incremental"] = {
+                "previous_id": previous.get("id"),
+                "applied": plan is not None,
+                "changed": sorted(plan["changed_labels"]) if plan else [],
+                "reused": sorted(plan["unchanged_labels"]) if plan else [],
+                "relinted": sorted(plan["relinted_labels"]) if plan else [],
+                "removed": plan["removed"] if plan else [],
+                "tools": incremental_tools,
+            }
+        return response
+    finally:
+        SCANS_IN_FLIGHT.dec()
@@ -0,0 +1,249 @@
+"""
+pool.py
+
+Backends de herramientas de larga duración, para no pagar en cada análisis el
+arranque de un proceso (ni la carga de la base de datos de trivy).
+
+- Servidor trivy: con TRIVY_SERVER=1 se arranca un `trivy server` local al
+  iniciar la aplicación y trivy se ejecuta en modo cliente (--server), de
+  modo que la base de datos de vulnerabilidades se carga una sola vez. Con
+  TRIVY_SERVER_URL se usa un servidor ya existente. Un vigilante comprueba
+  /healthz cada TRIVY_SERVER_HEALTH_INTERVAL segundos y reinicia el servidor
+  local si ha terminado o deja de responder; mientras no está disponible,
+  trivy se ejecuta en modo autónomo. El servidor local usa el mismo binario
+  que el resto de ejecuciones (runner.tool_path) y no se arranca si trivy no
+  está instalado.
+- Micro-lotes de linters: las ejecuciones de los linters de
+  LINTER_BATCH_TOOLS (por defecto dclint y kube-linter, cuyo arranque domina
+  el tiempo con archivos pequeños) que llegan dentro de una ventana de
+  LINTER_BATCH_WINDOW segundos se agrupan en una sola invocación.
+
+Configuración:
+    TRIVY_SERVER                    # "1" para arrancar un servidor trivy local
+    TRIVY_SERVER_URL                # Servidor externo (no se arranca ninguno local)
+    TRIVY_SERVER_LISTEN             # Dirección del servidor local (127.0.0.1:4954)
+    TRIVY_SERVER_HEALTH_INTERVAL    # Segundos entre comprobaciones de salud
+    TRIVY_SERVER_START_TIMEOUT      # Segundos de espera a que el servidor responda
+    LINTER_BATCH_TOOLS              # Linters agrupados, separados por comas
+    LINTER_BATCH_WINDOW             # Ventana de agrupación en segundos
+    LINTER_BATCH_MAX                # Máximo de archivos por lote
+"""
+
+import asyncio
+import os
+import urllib.error
+import urllib.request
+
+from app.utils.runner import tool_path
+
+TRIVY_SERVER = os.getenv("TRIVY_SERVER", "0") == "1"
+TRIVY_SERVER_URL = os.getenv("TRIVY_SERVER_URL", "")
+TRIVY_SERVER_LISTEN = os.getenv("TRIVY_SERVER_LISTEN", "127.0.0.1:4954")
+TRIVY_SERVER_HEALTH_INTERVAL = float(os.getenv("TRIVY_SERVER_HEALTH_INTERVAL", "30"))
+TRIVY_SERVER_START_TIMEOUT = float(os.getenv("TRIVY_SERVER_START_TIMEOUT", "60"))
+
+LINTER_BATCH_TOOLS = [tool.strip() for tool in os.getenv("LINTER_BATCH_TOOLS", "dclint,kube-linter").split(",") if tool.strip()]
+LINTER_BATCH_WINDOW = float(os.getenv("LINTER_BATCH_WINDOW", "0.05"))
+LINTER_BATCH_MAX = int(os.getenv("LINTER_BATCH_MAX", "50"))
+
+_trivy_server = {"process": None, "url": None, "healthy": False, "restarts": 0}
+_monitor: asyncio.Task | None = None
+
+
+def _check_health(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(f"{url}/healthz", timeout=2) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+async def trivy_server_healthy(url: str) -> bool:
+    """
+    Comprueba si un servidor trivy responde en /healthz.
+    """
+    return await asyncio.to_thread(_check_health, url)
+
+
+def trivy_server_url() -> str | None:
+    """
+    Devuelve la URL del servidor trivy si está disponible, o None para
+    ejecutar trivy en modo autónomo.
+    """
+    return _trivy_server["url"] if _trivy_server["healthy"] else None
+
+
+async def _stop_local_server():
+    process = _trivy_server["process"]
+    _trivy_server["process"] = None
+    _trivy_server["healthy"] = False
+    if process is None or process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def _start_local_server():
+    """
+    Arranca `trivy server` y espera a que responda. Si no llega a responder
+    en TRIVY_SERVER_START_TIMEOUT segundos se detiene y trivy sigue en modo
+    autónomo.
+    """
+    await _stop_local_server()
+    path = tool_path("trivy")
+    if path is None:
+        return
+    url = f"http://{TRIVY_SERVER_LISTEN}"
+    _trivy_server["url"] = url
+    try:
+        _trivy_server["process"] = await asyncio.create_subprocess_exec(
+            path, "server", "--listen", TRIVY_SERVER_LISTEN, "--quiet",
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TRIVY_SERVER_START_TIMEOUT
+    while loop.time() < deadline:
+        if _trivy_server["process"].returncode is not None:
+            break
+        if await trivy_server_healthy(url):
+            _trivy_server["healthy"] = True
+            return
+        await asyncio.sleep(0.2)
+    await _stop_local_server()
+
+
+async def _watch_trivy_server():
+    """
+    Comprueba periódicamente la salud del servidor trivy y reinicia el local
+    si ha terminado o no responde.
+    """
+    while True:
+        await asyncio.sleep(TRIVY_SERVER_HEALTH_INTERVAL)
+        process = _trivy_server["process"]
+        alive = process is None or process.returncode is None
+        _trivy_server["healthy"] = alive and await trivy_server_healthy(_trivy_server["url"])
+        if not _trivy_server["healthy"] and not TRIVY_SERVER_URL:
+            _trivy_server["restarts"] += 1
+            await _start_local_server()
+
+
+async def start_pool():
+    """
+    Arranca los backends de larga duración configurados (servidor trivy y su
+    vigilante). Se llama al iniciar la aplicación.
+    """
+    global _monitor
+    if TRIVY_SERVER_URL:
+        _trivy_server["url"] = TRIVY_SERVER_URL.rstrip("/")
+        _trivy_server["healthy"] = await trivy_server_healthy(_trivy_server["url"])
+    elif TRIVY_SERVER and tool_path("trivy") is not None:
+        await _start_local_server()
+    else:
+        return
+    _monitor = asyncio.ensure_future(_watch_trivy_server())
+
+
+async def stop_pool():
+    """
+    Detiene el vigilante y el servidor trivy local. Se llama al parar la aplicación.
+    """
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        try:
+            await _monitor
+        except asyncio.CancelledError:
+            pass
+        _monitor = None
+    await _stop_local_server()
+
+
+def pool_status() -> dict:
+    """
+    Devuelve el estado de los backends de larga duración.
+    """
+    process = _trivy_server["process"]
+    return {
+        "trivy_server": {
+            "enabled": bool(TRIVY_SERVER or TRIVY_SERVER_URL),
+            "url": _trivy_server["url"],
+            "healthy": _trivy_server["healthy"],
+            "pid": process.pid if process is not None and process.returncode is None else None,
+            "restarts": _trivy_server["restarts"],
+        },
+        "linter_batching": {
+            "tools": LINTER_BATCH_TOOLS,
+            "window": LINTER_BATCH_WINDOW,
+            "max": LINTER_BATCH_MAX,
+        },
+    }
+
+
+class MicroBatcher:
+    """
+    Agrupa las rutas que llegan dentro de una ventana de tiempo en una única
+    llamada a una función por lotes, y devuelve a cada llamante su resultado.
+    """
+
+    def __init__(self, run_batch, window: float = LINTER_BATCH_WINDOW, max_size: int = LINTER_BATCH_MAX):
+        """
+        Args:
+            run_batch (Callable): Corrutina run_batch(rutas) que devuelve {ruta: resultado}.
+            window (float): Segundos que se espera a más rutas antes de ejecutar el lote.
+            max_size (int): Número de rutas que dispara el lote sin esperar a la ventana.
+        """
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, path: str):
+        """
+        Añade una ruta al lote en curso y espera su resultado.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((path, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.ensure_future(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # El lote se ejecuta en su propia tarea: si se cancela un llamante,
+            # el resto sigue recibiendo su resultado
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        try:
+            results = await self.run_batch([path for path, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for path, future in batch:
+            if not future.done():
+                future.set_result(results.get(path, {"error": "Missing batch result"}))
@@ -0,0 +1,258 @@
+"""
+runner.py
+
+Este módulo ejecuta las herramientas externas de análisis (hadolint, dclint,
+kube-linter, trivy) como subprocesos asíncronos, sin bloquear el event loop.
+
+Cada herramienta tiene un límite de ejecuciones concurrentes configurable
+mediante variables de entorno:
+
+    TOOL_CONCURRENCY            # Límite por defecto para todas las herramientas
+    TOOL_CONCURRENCY_HADOLINT   # Límite específico (nombre en mayúsculas, '-' -> '_')
+    TOOL_CONCURRENCY_KUBE_LINTER
+    ...
+
+y un tiempo máximo de ejecución en segundos, con el mismo esquema:
+
+    TOOL_TIMEOUT                # Timeout por defecto para todas las herramientas
+    TOOL_TIMEOUT_TRIVY          # Timeout específico
+    ...
+
+Cada herramienta se lanza en su propio grupo de procesos; si se supera el
+timeout o se cancela la petición, se mata el grupo completo (incluidos los
+procesos hijos que haya lanzado la herramienta).
+
+Si TOOL_MEMORY_BUDGET > 0, cada ejecución reserva además su memoria
+estimada (TOOL_MEMORY_<HERRAMIENTA>) de un presupuesto compartido por todas
+las herramientas (app.utils.admission) y espera si no cabe.
+
+La ruta de cada binario se busca en el PATH una sola vez por proceso, y la
+versión de cada herramienta se consulta una sola vez (load_tool_inventory()
+lo hace al arrancar, en segundo plano). Si la consulta falla, la versión es
+UNKNOWN_VERSION y no se guarda: la siguiente llamada vuelve a consultarla.
+tool_inventory() devuelve lo ya resuelto sin lanzar ningún proceso.
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+from contextlib import asynccontextmanager
+
+from app.utils import admission
+from app.utils.metrics import timed_tool
+
+DEFAULT_TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "120"))
+
+# Herramientas externas que usa el pipeline
+TOOLS = ("hadolint", "dclint", "kube-linter", "trivy")
+
+_semaphores: dict[str, asyncio.Semaphore] = {}
+_paths: dict[str, str | None] = {}
+
+
+def tool_concurrency(tool: str) -> int:
+    """
+    Devuelve el número máximo de ejecuciones simultáneas de una herramienta.
+
+    Args:
+        tool (str): Nombre del binario de la herramienta.
+
+    Returns:
+        int: Límite configurado (mínimo 1).
+    """
+    env_name = "TOOL_CONCURRENCY_" + tool.upper().replace("-", "_")
+    return max(1, int(os.getenv(env_name, DEFAULT_TOOL_CONCURRENCY)))
+
+
+def tool_timeout(tool: str) -> float:
+    """
+    Devuelve el tiempo máximo de ejecución de una herramienta en segundos.
+
+    Args:
+        tool (str): Nombre del binario de la herramienta.
+
+    Returns:
+        float: Timeout configurado.
+    """
+    env_name = "TOOL_TIMEOUT_" + tool.upper().replace("-", "_")
+    return float(os.getenv(env_name, DEFAULT_TOOL_TIMEOUT))
+
+
+class ToolTimeoutError(RuntimeError):
+    """
+    Una herramienta ha superado su timeout y se ha matado su grupo de procesos.
+    """
+
+    def __init__(self, tool: str, timeout: float):
+        super().__init__(f"{tool} superó el timeout de {timeout:g} s")
+        self.tool = tool
+        self.timeout = timeout
+
+
+def _kill_group(proc: asyncio.subprocess.Process):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def tool_path(tool: str) -> str | None:
+    """
+    Devuelve la ruta absoluta del binario de una herramienta, buscándola en
+    el PATH solo la primera vez.
+
+    Returns:
+        str | None: Ruta del binario, o None si no está instalado.
+    """
+    if tool not in _paths:
+        _paths[tool] = shutil.which(tool)
+    return _paths[tool]
+
+
+def _semaphore(tool: str) -> asyncio.Semaphore:
+    if tool not in _semaphores:
+        _semaphores[tool] = asyncio.Semaphore(tool_concurrency(tool))
+    return _semaphores[tool]
+
+
+@asynccontextmanager
+async def _tool_memory(tool: str):
+    budget = admission.tool_memory
+    if budget is None:
+        yield
+        return
+    weight = await budget.acquire(admission.tool_memory_weight(tool), block=True)
+    try:
+        yield
+    finally:
+        budget.release(weight)
+
+
+async def run_tool(tool: str, args: list[str], limited: bool = True) -> subprocess.CompletedProcess:
+    """
+    Ejecuta una herramienta como subproceso asíncrono respetando su límite de
+    concurrencia y su timeout.
+
+    Args:
+        tool (str): Nombre del binario a ejecutar.
+        args (list[str]): Argumentos de la línea de comandos.
+        limited (bool): Si es False no espera al límite de concurrencia ni al
+            presupuesto de memoria (consultas de versión, que no deben esperar
+            a los análisis en curso).
+
+    Returns:
+        subprocess.CompletedProcess: Resultado con returncode, stdout y stderr como texto.
+
+    Raises:
+        ToolTimeoutError: Si la herramienta supera tool_timeout(tool).
+    """
+    if not limited:
+        return await _spawn(tool, args)
+    async with _semaphore(tool), _tool_memory(tool):
+        return await _spawn(tool, args)
+
+
+async def _spawn(tool: str, args: list[str]) -> subprocess.CompletedProcess:
+    timeout = tool_timeout(tool)
+    with timed_tool(tool, "spawn"):
+        proc = await asyncio.create_subprocess_exec(
+            tool_path(tool) or tool, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+    try:
+        with timed_tool(tool, "run"):
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        _kill_group(proc)
+        await proc.wait()
+        raise ToolTimeoutError(tool, timeout)
+    except asyncio.CancelledError:
+        # Petición cancelada (p.ej. el cliente se ha desconectado)
+        _kill_group(proc)
+        await proc.wait()
+        raise
+
+    return subprocess.CompletedProcess(
+        [tool, *args],
+        proc.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace"),
+    )
+
+
+VERSION_ARGS = {
+    "kube-linter": ["version"],
+}
+
+# Versión de una herramienta que no se ha podido consultar
+UNKNOWN_VERSION = "unknown"
+
+_versions: dict[str, str] = {}
+_version_tasks: dict[str, asyncio.Task] = {}
+_inventory = {"loaded": False}
+
+
+async def _query_version(tool: str) -> str:
+    if tool_path(tool) is None:
+        return UNKNOWN_VERSION
+    try:
+        output = await run_tool(tool, VERSION_ARGS.get(tool, ["--version"]), limited=False)
+    except (OSError, ToolTimeoutError):
+        return UNKNOWN_VERSION
+    lines = (output.stdout or output.stderr).strip().splitlines()
+    return lines[0] if lines else UNKNOWN_VERSION
+
+
+async def tool_version(tool: str) -> str:
+    """
+    Devuelve la versión de una herramienta. Se consulta una sola vez por
+    proceso (las peticiones simultáneas comparten la consulta) y se guarda
+    en memoria; si la consulta falla no se guarda y se reintenta en la
+    siguiente llamada.
+
+    Args:
+        tool (str): Nombre del binario de la herramienta.
+
+    Returns:
+        str: Primera línea de la salida de versión, o UNKNOWN_VERSION si no se puede obtener.
+    """
+    if tool in _versions:
+        return _versions[tool]
+    task = _version_tasks.get(tool)
+    if task is None:
+        task = _version_tasks[tool] = asyncio.ensure_future(_query_version(tool))
+        task.add_done_callback(lambda _: _version_tasks.pop(tool, None))
+    version = await asyncio.shield(task)
+    if version != UNKNOWN_VERSION:
+        _versions[tool] = version
+    return version
+
+
+async def load_tool_inventory():
+    """
+    Resuelve la ruta y la versión de todas las herramientas (TOOLS) en paralelo.
+    """
+    await asyncio.gather(*(tool_version(tool) for tool in TOOLS))
+    _inventory["loaded"] = True
+
+
+def tool_inventory() -> dict:
+    """
+    Devuelve las herramientas ya resueltas sin lanzar ningún proceso.
+
+    Returns:
+        dict: {"loaded": bool, "tools": {herramienta: {"path", "version"}}};
+        version es None si aún no se ha consultado o no se ha podido obtener.
+    """
+    return {
+        "loaded": _inventory["loaded"],
+        "tools": {
+            tool: {"path": _paths.get(tool), "version": _versions.get(tool)}
+            for tool in TOOLS
+        },
+    }
@@ -1,26 +1,513 @@
+"""
+storage.py
+
+Persistencia del historial de análisis en una base de datos SQLite.
+
+Cada análisis se inserta como una fila nueva (O(1), sin reescribir el historial),
+el id lo asigna SQLite de forma atómica aunque haya escrituras concurrentes y
+existen índices por id, timestamp y filename.
+
+Además del JSON completo (columna data), cada fila guarda un resumen
+(columna summary) con las herramientas ejecutadas y el recuento de hallazgos
+por severidad, que permite filtrar y listar el historial sin decodificar
+el contenido completo de cada análisis.
+
+Los contenidos de archivo (original_content y suggested_content), la
+salida bruta de las herramientas (results) y los hallazgos normalizados
+(normalized_findings) no se duplican en cada entrada: se guardan una sola
+vez en la tabla blobs, direccionados por su SHA-256, y la entrada guarda la
+referencia (original_content_ref, suggested_content_ref, results_ref,
+normalized_findings_ref). Dentro de results, la lista de
+vulnerabilidades de cada imagen de trivy es a su vez un blob
+(Vulnerabilities_ref), de modo que el informe de una imagen se guarda una
+sola vez aunque aparezca en muchos análisis. Los blobs se comprimen con
+zstd (si está instalado zstandard) o gzip, según BLOB_COMPRESSION. Al leer
+el historial las referencias se resuelven de forma transparente.
+
+La tabla entry_blobs relaciona cada entrada con todos sus blobs (incluidos
+los informes de trivy), para que
+prune_results() (retención por antigüedad o número de entradas) y
+compact() (recompresión, borrado de blobs sin referencias y VACUUM) no
+tengan que decodificar el historial. Se ejecutan con app.maintenance.
+
+La tabla rollups guarda agregados diarios de los hallazgos (por
+herramienta, regla, archivo e imagen, y por severidad) y del número de
+análisis. Se actualiza en la misma transacción que save_result(), de modo
+que las estadísticas (app.routers.stats) se calculan en función del número
+de días y claves consultados, no del número de análisis o hallazgos.
+
+La tabla jobs guarda, si se activa la persistencia de la cola de análisis
+en segundo plano (app.utils.jobs), el estado de cada trabajo; el resultado
+no se duplica, se guarda el id de su entrada del historial. prune_jobs()
+borra los trabajos terminados.
+
+Si existe un results.json de versiones anteriores, se migra una única vez
+a la base de datos y se renombra a results.json.migrated.
+
+Varios procesos (workers de uvicorn o réplicas en el mismo nodo) pueden
+usar la misma base de datos: está en modo WAL, las escrituras usan
+transacciones BEGIN IMMEDIATE y esperan hasta 30 s si otro proceso está
+escribiendo, y la creación del esquema y las migraciones se hacen bajo un
+bloqueo de archivo (<RESULTS_DB_PATH>.lock, app.utils.locks) para que solo
+las ejecute un proceso.
+"""
+
+import hashlib
+import importlib.util
 import json
 import os
-from datetime import datetime, timezone
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.utils.locks import file_lock
+
+# zstandard es opcional; como gzip, solo se importa al comprimir o descomprimir
+HAS_ZSTANDARD = importlib.util.find_spec("zstandard") is not None
+
+DB_PATH = os.getenv("RESULTS_DB_PATH", "results.db")
+LEGACY_JSON_PATH = "results.json"
+# Compresión de los blobs nuevos: zstd, gzip o none (por defecto zstd si está disponible)
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zstd" if HAS_ZSTANDARD else "gzip")
+# Los blobs más pequeños se guardan sin comprimir
+BLOB_COMPRESSION_MIN_BYTES = int(os.getenv("BLOB_COMPRESSION_MIN_BYTES", "256"))
+# Filas por transacción en prune_results() y compact(), para no bloquear las
+# escrituras de los análisis durante toda la pasada
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    filename TEXT,
+    summary TEXT NOT NULL DEFAULT '{}',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results(timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_filename ON results(filename);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    encoding TEXT NOT NULL DEFAULT 'identity'
+);
+CREATE TABLE IF NOT EXISTS entry_blobs (
+    entry_id INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (entry_id, digest)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entry_blobs_digest ON entry_blobs(digest);
+CREATE TABLE IF NOT EXISTS rollups (
+    day TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, day, key, severity)
+) WITHOUT ROWID;
+"""
+
+CONTENT_FIELDS = ("original_content", "suggested_content")
+# Campos JSON que también se guardan como blob
+JSON_BLOB_FIELDS = ("normalized_findings",)
+BLOB_FIELDS = CONTENT_FIELDS + JSON_BLOB_FIELDS + ("results",)
+
+# Dimensiones de los agregados: campo del hallazgo que se cuenta. "scans"
+# cuenta análisis (clave y severidad vacías).
+ROLLUP_DIMENSIONS = ("tool", "rule", "file", "image")
+ROLLUP_SCANS = "scans"
+
+SUMMARY_FIELDS = ("id", "timestamp", "filename", "tools_run", "tool_status", "findings_count", "severity_counts")
+
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def build_summary(entry: dict) -> dict:
+    """
+    Calcula el resumen de un análisis: herramientas ejecutadas y su estado
+    (ok, timeout o error), número total de hallazgos y recuento por severidad
+    (en minúsculas).
+    """
+    findings = entry.get("normalized_findings") or []
+    severity_counts = {}
+    for finding in findings:
+        severity = str(finding.get("severity") or "unknown").lower()
+        severity_counts[severity] = severity_counts.get(severity, 0) + 1
+    return {
+        "tools_run": entry.get("tools_run") or [],
+        "tool_status": entry.get("tool_status") or {},
+        "findings_count": len(findings),
+        "severity_counts": severity_counts,
+    }
+
+
+def build_rollups(entry: dict) -> dict:
+    """
+    Calcula la contribución de un análisis a los agregados diarios.
+
+    Returns:
+        dict: {(dimensión, clave, severidad): número}
+    """
+    counts = {(ROLLUP_SCANS, "", ""): 1}
+    for finding in entry.get("normalized_findings") or []:
+        severity = str(finding.get("severity") or "unknown").lower()
+        for dimension in ROLLUP_DIMENSIONS:
+            key = finding.get(dimension)
+            if key is None:
+                continue
+            counts[(dimension, str(key), severity)] = counts.get((dimension, str(key), severity), 0) + 1
+    return counts
+
+
+def _add_rollups(conn: sqlite3.Connection, timestamp: str, entry: dict):
+    day = timestamp[:10]
+    conn.executemany(
+        "INSERT INTO rollups (day, dimension, key, severity, count) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(dimension, day, key, severity) DO UPDATE SET count = count + excluded.count",
+        [(day, dimension, key, severity, count) for (dimension, key, severity), count in build_rollups(entry).items()],
+    )
+
+
+def _rebuild_rollups(conn: sqlite3.Connection):
+    """
+    Recalcula los agregados a partir del historial.
+    """
+    conn.execute("DELETE FROM rollups")
+    for timestamp, data in conn.execute("SELECT timestamp, data FROM results").fetchall():
+        _add_rollups(conn, timestamp, _resolve_contents(conn, json.loads(data), JSON_BLOB_FIELDS))
+
+
+def _index_blob_refs(conn: sqlite3.Connection):
+    """
+    Registra en entry_blobs las referencias de las entradas guardadas antes
+    de que existiera la tabla.
+    """
+    for entry_id, data in conn.execute("SELECT id, data FROM results").fetchall():
+        _add_blob_refs(conn, entry_id, _blob_refs(json.loads(data)))
+
+
+# Migraciones de datos en orden; PRAGMA user_version guarda cuántas se han aplicado
+MIGRATIONS = (_rebuild_rollups, _index_blob_refs)
+
+
+def _run_migrations(conn: sqlite3.Connection):
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            if version < number:
+                migration(conn)
+        conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _migrate_legacy_json(conn: sqlite3.Connection):
+    """
+    Importa el historial de results.json (formato antiguo) conservando ids y timestamps.
+    Solo se ejecuta si la tabla está vacía.
+    """
+    if not os.path.exists(LEGACY_JSON_PATH):
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM results LIMIT 1").fetchone() is None:
+            with open(LEGACY_JSON_PATH, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            for item in legacy:
+                entry = dict(item)
+                entry_id = entry.pop("id", None)
+                timestamp = entry.pop("timestamp", None) or datetime.now(timezone.utc).isoformat()
+                conn.execute(
+                    "INSERT INTO results (id, timestamp, filename, summary, data) VALUES (?, ?, ?, ?, ?)",
+                    (entry_id, timestamp, entry.get("filename"),
+                     json.dumps(build_summary(entry)), json.dumps(entry)),
+                )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    os.replace(LEGACY_JSON_PATH, LEGACY_JSON_PATH + ".migrated")
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Abre una conexión a la base de datos, creando el esquema y migrando
+    el historial antiguo la primera vez.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    if DB_PATH not in _initialized_paths:
+        with _init_lock, file_lock(DB_PATH + ".lock"):
+            if DB_PATH not in _initialized_paths:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _migrate_legacy_json(conn)
+                _run_migrations(conn)
+                _initialized_paths.add(DB_PATH)
+    return conn
+
+
+def _encode_blob(value: str) -> tuple:
+    data = value.encode()
+    if len(data) < BLOB_COMPRESSION_MIN_BYTES or BLOB_COMPRESSION == "none":
+        return value, "identity"
+    if BLOB_COMPRESSION == "zstd" and HAS_ZSTANDARD:
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data), "zstd"
+    import gzip
+    return gzip.compress(data, mtime=0), "gzip"
+
+
+def _decode_blob(data, encoding: str) -> str:
+    if encoding == "zstd":
+        if not HAS_ZSTANDARD:
+            raise RuntimeError("El historial contiene blobs zstd: instala zstandard")
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data).decode()
+    if encoding == "gzip":
+        import gzip
+        return gzip.decompress(data).decode()
+    return data
+
+
+def _put_blob(conn: sqlite3.Connection, value: str) -> str:
+    """
+    Guarda un texto en la tabla blobs (una sola vez por contenido) y devuelve su SHA-256.
+    """
+    digest = hashlib.sha256(value.encode()).hexdigest()
+    if conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+        data, encoding = _encode_blob(value)
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (digest, data, encoding) VALUES (?, ?, ?)", (digest, data, encoding)
+        )
+    return digest
+
+
+def _get_blob(conn: sqlite3.Connection, digest: str) -> str | None:
+    row = conn.execute("SELECT data, encoding FROM blobs WHERE digest = ?", (digest,)).fetchone()
+    return _decode_blob(*row) if row else None
+
+
+def _blob_refs(stored: dict) -> set:
+    """
+    Devuelve los blobs referenciados directamente por una entrada guardada.
+    """
+    return {stored[f"{field}_ref"] for field in BLOB_FIELDS if stored.get(f"{field}_ref")}
+
+
+def _add_blob_refs(conn: sqlite3.Connection, entry_id: int, digests: set):
+    conn.executemany(
+        "INSERT OR IGNORE INTO entry_blobs (entry_id, digest) VALUES (?, ?)",
+        [(entry_id, digest) for digest in digests],
+    )
+
+
+def _store_contents(conn: sqlite3.Connection, entry: dict) -> tuple[dict, set]:
+    """
+    Guarda los contenidos de archivo, los hallazgos normalizados y los
+    resultados brutos de una entrada en la tabla blobs.
+
+    Returns:
+        tuple: (copia de la entrada con referencias en su lugar, SHA-256 de
+        todos los blobs usados, incluidos los informes de trivy)
+    """
+    stored = dict(entry)
+    digests = set()
+    for field in CONTENT_FIELDS:
+        value = stored.pop(field, None)
+        if value is None:
+            continue
+        stored[f"{field}_ref"] = _put_blob(conn, value)
+        digests.add(stored[f"{field}_ref"])
+    for field in JSON_BLOB_FIELDS:
+        value = stored.pop(field, None)
+        if value is None:
+            continue
+        stored[f"{field}_ref"] = _put_blob(conn, json.dumps(value))
+        digests.add(stored[f"{field}_ref"])
+
+    results = stored.pop("results", None)
+    if results is not None:
+        if isinstance(results.get("trivy"), list):
+            reports = []
+            for report in results["trivy"]:
+                if isinstance(report, dict) and "Vulnerabilities" in report:
+                    report = dict(report)
+                    report["Vulnerabilities_ref"] = _put_blob(conn, json.dumps(report.pop("Vulnerabilities")))
+                    digests.add(report["Vulnerabilities_ref"])
+                reports.append(report)
+            results = {**results, "trivy": reports}
+        stored["results_ref"] = _put_blob(conn, json.dumps(results))
+        digests.add(stored["results_ref"])
+    return stored, digests
+
+
+def _resolve_results(conn: sqlite3.Connection, digest: str) -> dict | None:
+    value = _get_blob(conn, digest)
+    if value is None:
+        return None
+    results = json.loads(value)
+    for report in results.get("trivy") or []:
+        if isinstance(report, dict) and "Vulnerabilities_ref" in report:
+            vulnerabilities = _get_blob(conn, report.pop("Vulnerabilities_ref"))
+            report["Vulnerabilities"] = json.loads(vulnerabilities) if vulnerabilities is not None else None
+    return results
+
+
+def _resolve_contents(conn: sqlite3.Connection, entry: dict, fields=BLOB_FIELDS) -> dict:
+    """
+    Sustituye las referencias a blobs de una entrada por su contenido.
+    """
+    for field in CONTENT_FIELDS:
+        digest = entry.pop(f"{field}_ref", None)
+        if digest is None or field not in fields:
+            continue
+        entry[field] = _get_blob(conn, digest)
+    for field in JSON_BLOB_FIELDS:
+        digest = entry.pop(f"{field}_ref", None)
+        if digest is None or field not in fields:
+            continue
+        value = _get_blob(conn, digest)
+        entry[field] = json.loads(value) if value is not None else None
+    digest = entry.pop("results_ref", None)
+    if digest is not None and "results" in fields:
+        entry["results"] = _resolve_results(conn, digest)
+    return entry
+
+
+def _row_to_entry(conn: sqlite3.Connection, row) -> dict:
+    entry_id, timestamp, data = row
+    return _resolve_contents(conn, {"id": entry_id, "timestamp": timestamp, **json.loads(data)})
+
+
+def iter_results(
+    limit: int | None = None,
+    before_id: int | None = None,
+    filename: str | None = None,
+    tool: str | None = None,
+    severity: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    fields: list[str] | None = None,
+):
+    """
+    Recorre el historial en orden descendente de id (más recientes primero),
+    leyendo las filas de la base de datos de una en una.
+
+    Args:
+        limit (int | None): Número máximo de resultados.
+        before_id (int | None): Cursor; solo devuelve resultados con id menor.
+        filename (str | None): Filtra por nombre de archivo exacto.
+        tool (str | None): Filtra análisis en los que se ejecutó la herramienta.
+        severity (str | None): Filtra análisis con algún hallazgo de esa severidad.
+        since (str | None): Timestamp ISO mínimo (inclusive).
+        until (str | None): Timestamp ISO máximo (exclusive).
+        fields (list[str] | None): Campos a devolver. Si todos pertenecen a
+            SUMMARY_FIELDS no se decodifica el contenido completo del análisis.
+
+    Yields:
+        dict: Cada resultado (completo o proyectado).
+    """
+    where, params = [], []
+    if before_id is not None:
+        where.append("id < ?")
+        params.append(before_id)
+    if filename is not None:
+        where.append("filename = ?")
+        params.append(filename)
+    if tool is not None:
+        where.append("EXISTS (SELECT 1 FROM json_each(summary, '$.tools_run') WHERE value = ?)")
+        params.append(tool)
+    if severity is not None:
+        where.append("EXISTS (SELECT 1 FROM json_each(summary, '$.severity_counts') WHERE key = ?)")
+        params.append(severity.lower())
+    if since is not None:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("timestamp < ?")
+        params.append(until)
+
+    summary_only = fields is not None and all(field in SUMMARY_FIELDS for field in fields)
+    data_column = "'{}'" if summary_only else "data"
+    query = f"SELECT id, timestamp, filename, summary, {data_column} FROM results"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    conn = _connect()
+    try:
+        for entry_id, timestamp, entry_filename, summary, data in conn.execute(query, params):
+            if fields is None:
+                yield _resolve_contents(conn, {"id": entry_id, "timestamp": timestamp, **json.loads(data)})
+                continue
+            entry = {"id": entry_id, "timestamp": timestamp, "filename": entry_filename,
+                     **json.loads(summary), **json.loads(data)}
+            entry = _resolve_contents(conn, entry, fields)
+            yield {field: entry[field] for field in fields if field in entry}
+    finally:
+        conn.close()
+
+
+def get_result(entry_id: int) -> dict | None:
+    """
+    Devuelve un resultado completo por su id, o None si no existe.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT id, timestamp, data FROM results WHERE id = ?", (entry_id,)).fetchone()
+        return _row_to_entry(conn, row) if row else None
+    finally:
+        conn.close()
 
-DB_PATH = "results.json"
 
 def load_all_results():
     """
-    Carga todos los resultados almacenados en el archivo JSON.
+    Carga todos los resultados almacenados en la base de datos.
 
     Returns:
     --------
-    Lista de diccionarios con los resultados previos.
-    Si el archivo no existe, retorna una lista vacía.
+    Lista de diccionarios con los resultados previos, ordenados por id.
+    Si no hay resultados, retorna una lista vacía.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT id, timestamp, data FROM results ORDER BY id")
+        return [_row_to_entry(conn, row) for row in rows.fetchall()]
+    finally:
+        conn.close()
+
+def history_stats() -> dict:
     """
-    if not os.path.exists(DB_PATH):
-        return []
-    with open(DB_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    Devuelve el tamaño del historial: número de análisis y bytes ocupados por
+    la base de datos (incluido el WAL).
+    """
+    conn = _connect()
+    try:
+        entries = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    finally:
+        conn.close()
+    size = sum(os.path.getsize(path) for path in (DB_PATH, DB_PATH + "-wal") if os.path.exists(path))
+    return {"entries": entries, "bytes": size}
 
-def save_result(entry: dict):
+def save_result(entry: dict) -> int:
     """
-    Guarda un nuevo resultado de análisis en un archivo JSON.
+    Guarda un nuevo resultado de análisis en la base de datos.
 
     Parámetros:
     -----------
@@ -30,19 +517,367 @@ def save_result(entry: dict):
 
     Lógica:
     -------
-    1. Carga todos los resultados existentes con load_all_results().
-    2. Añade un diccionario que incluye:
-        - id: número secuencial del análisis (basado en la longitud actual de la lista).
+    1. Inserta una fila con:
+        - id: asignado por SQLite (AUTOINCREMENT), seguro ante escrituras concurrentes.
         - timestamp: fecha y hora actual en UTC.
-        - **entry: todos los datos recibidos en la entrada.
-    3. Sobrescribe el archivo results.json con la nueva lista de resultados.
-    """
-
-    data = load_all_results()
-    data.append({
-        "id": len(data) + 1,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        **entry
-    })
-    with open(DB_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+        - filename: nombre del archivo, indexado para búsquedas.
+        - summary: resumen calculado con build_summary().
+        - data: el resto de la entrada serializada en JSON.
+    2. original_content, suggested_content, normalized_findings, results y
+       cada informe de imagen de trivy se guardan comprimidos una sola vez
+       en la tabla blobs y la entrada solo guarda su referencia.
+    3. Suma la contribución del análisis a los agregados diarios (tabla
+       rollups) en la misma transacción.
+    4. No se lee ni reescribe el historial existente.
+
+    Returns:
+    --------
+    int
+        id asignado al nuevo resultado.
+    """
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored, digests = _store_contents(conn, entry)
+            timestamp = datetime.now(timezone.utc).isoformat()
+            cursor = conn.execute(
+                "INSERT INTO results (timestamp, filename, summary, data) VALUES (?, ?, ?, ?)",
+                (timestamp, entry.get("filename"), json.dumps(build_summary(entry)), json.dumps(stored)),
+            )
+            _add_blob_refs(conn, cursor.lastrowid, digests)
+            _add_rollups(conn, timestamp, entry)
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def prune_results(max_age_days: float | None = None, max_entries: int | None = None) -> int:
+    """
+    Borra del historial los análisis más antiguos que max_age_days y los que
+    exceden las max_entries entradas más recientes, junto con los trabajos
+    en segundo plano que apuntan a ellos. Los agregados de
+    estadísticas (rollups) se conservan; los blobs que dejan de usarse se
+    eliminan con compact(). Se borra en transacciones de
+    MAINTENANCE_BATCH_SIZE análisis.
+
+    Returns:
+        int: Número de análisis borrados.
+    """
+    where, params = [], []
+    if max_age_days is not None:
+        where.append("timestamp < ?")
+        params.append((datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat())
+    if max_entries is not None:
+        where.append("id <= COALESCE((SELECT id FROM results ORDER BY id DESC LIMIT 1 OFFSET ?), 0)")
+        params.append(max_entries)
+    if not where:
+        return 0
+
+    conn = _connect()
+    try:
+        ids = [row[0] for row in conn.execute(f"SELECT id FROM results WHERE {' OR '.join(where)} ORDER BY id", params)]
+        for start in range(0, len(ids), MAINTENANCE_BATCH_SIZE):
+            batch = [(entry_id,) for entry_id in ids[start:start + MAINTENANCE_BATCH_SIZE]]
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("DELETE FROM entry_blobs WHERE entry_id = ?", batch)
+                conn.executemany("DELETE FROM results WHERE id = ?", batch)
+                # Los trabajos terminados cuyo resultado se ha borrado ya no sirven
+                conn.executemany("DELETE FROM jobs WHERE json_extract(data, '$.result_id') = ?", batch)
+        return len(ids)
+    finally:
+        conn.close()
+
+
+def compact() -> dict:
+    """
+    Compacta el historial:
+
+    1. Pasa al formato actual (resultados, hallazgos normalizados e informes
+       de trivy en blobs) las entradas guardadas con los resultados o los
+       hallazgos dentro de la entrada.
+    2. Comprime según BLOB_COMPRESSION los blobs guardados sin comprimir.
+    3. Borra los blobs que ya no usa ninguna entrada.
+    4. Ejecuta VACUUM y trunca el WAL para devolver el espacio al disco.
+
+    Los pasos 1 a 3 se hacen en transacciones de MAINTENANCE_BATCH_SIZE
+    filas, de modo que los análisis nuevos se pueden guardar entre una y otra.
+
+    Returns:
+        dict: {"rewritten", "recompressed", "deleted_blobs", "bytes_before", "bytes_after"}
+    """
+    bytes_before = history_stats()["bytes"]
+    conn = _connect()
+    try:
+        rewritten, last_id = 0, 0
+        while True:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    "SELECT id, data FROM results WHERE id > ? ORDER BY id LIMIT ?", (last_id, MAINTENANCE_BATCH_SIZE)
+                ).fetchall()
+                for entry_id, data in rows:
+                    entry = json.loads(data)
+                    if "results" not in entry and "normalized_findings" not in entry:
+                        continue
+                    stored, digests = _store_contents(conn, _resolve_contents(conn, entry))
+                    conn.execute("UPDATE results SET data = ? WHERE id = ?", (json.dumps(stored), entry_id))
+                    _add_blob_refs(conn, entry_id, digests)
+                    rewritten += 1
+            if len(rows) < MAINTENANCE_BATCH_SIZE:
+                break
+            last_id = rows[-1][0]
+
+        recompressed, last_digest = 0, ""
+        while True:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    "SELECT digest, data FROM blobs WHERE encoding = 'identity' AND digest > ? ORDER BY digest LIMIT ?",
+                    (last_digest, MAINTENANCE_BATCH_SIZE),
+                ).fetchall()
+                for digest, value in rows:
+                    data, encoding = _encode_blob(value)
+                    if encoding != "identity":
+                        conn.execute(
+                            "UPDATE blobs SET data = ?, encoding = ? WHERE digest = ?", (data, encoding, digest)
+                        )
+                        recompressed += 1
+            if len(rows) < MAINTENANCE_BATCH_SIZE:
+                break
+            last_digest = rows[-1][0]
+
+        deleted = 0
+        while True:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                count = conn.execute(
+                    "DELETE FROM blobs WHERE digest IN (SELECT digest FROM blobs WHERE NOT EXISTS "
+                    "(SELECT 1 FROM entry_blobs WHERE entry_blobs.digest = blobs.digest) LIMIT ?)",
+                    (MAINTENANCE_BATCH_SIZE,),
+                ).rowcount
+            deleted += count
+            if count < MAINTENANCE_BATCH_SIZE:
+                break
+
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return {
+        "rewritten": rewritten,
+        "recompressed": recompressed,
+        "deleted_blobs": deleted,
+        "bytes_before": bytes_before,
+        "bytes_after": history_stats()["bytes"],
+    }
+
+
+def _rollup_filter(dimension: str, since: str | None, until: str | None, severity: str | None, prefix: str = ""):
+    where, params = [f"{prefix}dimension = ?"], [dimension]
+    if since is not None:
+        where.append(f"{prefix}day >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{prefix}day < ?")
+        params.append(until)
+    if severity is not None:
+        where.append(f"{prefix}severity = ?")
+        params.append(severity.lower())
+    return " AND ".join(where), params
+
+
+def stats_totals(since: str | None = None, until: str | None = None) -> dict:
+    """
+    Devuelve los totales de un rango de días: análisis, hallazgos, y
+    hallazgos por severidad y por herramienta.
+
+    Args:
+        since (str | None): Día inicial (YYYY-MM-DD, inclusive).
+        until (str | None): Día final (YYYY-MM-DD, exclusive).
+    """
+    conn = _connect()
+    try:
+        where, params = _rollup_filter(ROLLUP_SCANS, since, until, None)
+        scans = conn.execute(f"SELECT COALESCE(SUM(count), 0) FROM rollups WHERE {where}", params).fetchone()[0]
+        where, params = _rollup_filter("tool", since, until, None)
+        by_tool, by_severity = {}, {}
+        for key, severity, count in conn.execute(
+            f"SELECT key, severity, SUM(count) FROM rollups WHERE {where} GROUP BY key, severity", params
+        ):
+            by_tool[key] = by_tool.get(key, 0) + count
+            by_severity[severity] = by_severity.get(severity, 0) + count
+    finally:
+        conn.close()
+    return {
+        "scans": scans,
+        "findings": sum(by_tool.values()),
+        "severity_counts": by_severity,
+        "tool_counts": by_tool,
+    }
+
+
+def stats_trend(since: str | None = None, until: str | None = None, tool: str | None = None) -> list:
+    """
+    Devuelve la evolución diaria: análisis y hallazgos por severidad de cada día.
+
+    Args:
+        since (str | None): Día inicial (YYYY-MM-DD, inclusive).
+        until (str | None): Día final (YYYY-MM-DD, exclusive).
+        tool (str | None): Solo los hallazgos de esta herramienta.
+
+    Returns:
+        list: [{"day", "scans", "findings", "severity_counts"}] en orden de día.
+    """
+    days = {}
+
+    def bucket(day: str) -> dict:
+        return days.setdefault(day, {"day": day, "scans": 0, "findings": 0, "severity_counts": {}})
+
+    conn = _connect()
+    try:
+        where, params = _rollup_filter(ROLLUP_SCANS, since, until, None)
+        for day, count in conn.execute(f"SELECT day, SUM(count) FROM rollups WHERE {where} GROUP BY day", params):
+            bucket(day)["scans"] = count
+        where, params = _rollup_filter("tool", since, until, None)
+        if tool is not None:
+            where += " AND key = ?"
+            params.append(tool)
+        for day, severity, count in conn.execute(
+            f"SELECT day, severity, SUM(count) FROM rollups WHERE {where} GROUP BY day, severity", params
+        ):
+            item = bucket(day)
+            item["findings"] += count
+            item["severity_counts"][severity] = count
+    finally:
+        conn.close()
+    return [days[day] for day in sorted(days)]
+
+
+def stats_top(
+    dimension: str,
+    limit: int = 10,
+    since: str | None = None,
+    until: str | None = None,
+    severity: str | None = None,
+) -> list:
+    """
+    Devuelve las claves con más hallazgos de una dimensión (reglas, imágenes,
+    archivos o herramientas) con su recuento por severidad.
+
+    Args:
+        dimension (str): Una de ROLLUP_DIMENSIONS.
+        limit (int): Número máximo de claves.
+        since (str | None): Día inicial (YYYY-MM-DD, inclusive).
+        until (str | None): Día final (YYYY-MM-DD, exclusive).
+        severity (str | None): Solo cuenta hallazgos de esta severidad.
+
+    Returns:
+        list: [{"key", "findings", "severity_counts"}] de mayor a menor.
+    """
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"Dimensión desconocida: {dimension}")
+    where, params = _rollup_filter(dimension, since, until, severity)
+    joined_where, _ = _rollup_filter(dimension, since, until, severity, prefix="r.")
+    query = f"""
+        WITH totals AS (
+            SELECT key, SUM(count) AS total FROM rollups WHERE {where}
+            GROUP BY key ORDER BY total DESC, key LIMIT ?
+        )
+        SELECT r.key, totals.total, r.severity, SUM(r.count)
+        FROM rollups r JOIN totals ON r.key = totals.key
+        WHERE {joined_where}
+        GROUP BY r.key, r.severity
+        ORDER BY totals.total DESC, r.key
+    """
+    conn = _connect()
+    try:
+        top = {}
+        for key, total, key_severity, count in conn.execute(query, params + [limit] + params):
+            item = top.setdefault(key, {"key": key, "findings": total, "severity_counts": {}})
+            item["severity_counts"][key_severity] = count
+    finally:
+        conn.close()
+    return list(top.values())
+
+
+# Campos de la respuesta de /scan/ que no se guardan en el historial
+JOB_RESULT_EXTRA_FIELDS = ("partial", "cache", "incremental")
+
+def save_job(job: dict):
+    """
+    Inserta o actualiza el estado de un trabajo de la cola de análisis.
+
+    El resultado no se duplica: ya está en el historial, así que solo se
+    guarda su id (result_id) y los campos de la respuesta que no están en
+    la entrada del historial.
+    """
+    data = {key: value for key, value in job.items() if key != "result"}
+    result = job.get("result")
+    if result is not None and result.get("id") is not None:
+        data["result_id"] = result["id"]
+        data["result_extra"] = {key: result[key] for key in JOB_RESULT_EXTRA_FIELDS if key in result}
+    elif result is not None:
+        data["result"] = result
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, status, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data",
+            (job["id"], job["status"], json.dumps(data)),
+        )
+    finally:
+        conn.close()
+
+def load_job(job_id: str) -> dict | None:
+    """
+    Devuelve un trabajo guardado por su id, con su resultado leído del
+    historial, o None si no existe.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    job = json.loads(row[0])
+    result_id = job.pop("result_id", None)
+    extra = job.pop("result_extra", None) or {}
+    if result_id is not None:
+        entry = get_result(result_id)
+        job["result"] = {**entry, **extra} if entry is not None else None
+    return job
+
+def prune_jobs(max_age_seconds: float) -> int:
+    """
+    Borra los trabajos terminados (done o error) hace más de max_age_seconds.
+
+    Returns:
+        int: Número de trabajos borrados.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)).isoformat()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') "
+                "AND json_extract(data, '$.finished_at') < ?",
+                (cutoff,),
+            ).rowcount
+    finally:
+        conn.close()
+
+def load_unfinished_jobs() -> list:
+    """
+    Devuelve los trabajos que estaban en cola o en ejecución.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT data FROM jobs WHERE status IN ('queued', 'running')")
+        return [json.loads(row[0]) for row in rows]
+    finally:
+        conn.close()
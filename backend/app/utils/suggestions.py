@@ -1,5 +1,10 @@
 import re
-import yaml
+
+from app.utils.manifests import dump_yaml, dump_yaml_all, iter_containers, parse_yaml
+
+# Versión de las reglas de remediación. Debe incrementarse al cambiarlas para
+# invalidar las remediaciones guardadas en la caché de análisis.
+REMEDIATION_VERSION = "2"
 
 def suggest_remediations_dockerfile(content: str) -> str:
     """
@@ -86,7 +91,7 @@ def suggest_remediations_docker_compose(content: str) -> str:
         str: Contenido modificado con sugerencias aplicadas.
     """
 
-def suggest_remediations_docker_compose(content: str) -> str:
+def suggest_remediations_docker_compose(content: str, documents: list | None = None) -> str:
     """
     Genera un docker-compose 'remediado' con buenas prácticas:
       - Evitar :latest en imágenes
@@ -95,18 +100,22 @@ def suggest_remediations_docker_compose(content: str) -> str:
       - Forzar usuario no-root si no existe (1000:1000)
       - Establecer límites de recursos si no existen (deploy.resources)
     La función es defensiva ante compos que no sigan al 100% el esquema.
+
+    Si se pasan los documentos ya parseados (parse_yaml), se usan en lugar de
+    volver a parsear el contenido y se modifican en el sitio.
     """
-    try:
-        parsed = yaml.safe_load(content)
-    except Exception:
+    if documents is None:
+        documents = parse_yaml(content)
+    if not documents:
         return content
+    parsed = documents[0]
 
     if not isinstance(parsed, dict):
         return content
 
     services = parsed.get("services") or {}
     if not isinstance(services, dict):
-        return yaml.safe_dump(parsed, default_flow_style=False, sort_keys=False)
+        return dump_yaml(parsed, sort_keys=False)
 
     for service_name, service in services.items():
         if not isinstance(service, dict):
@@ -145,14 +154,17 @@ def suggest_remediations_docker_compose(content: str) -> str:
         services[service_name] = service
 
     parsed["services"] = services
-    return yaml.safe_dump(parsed, default_flow_style=False, sort_keys=False)
+    return dump_yaml(parsed, sort_keys=False)
 
 
 
-def suggest_remediations_kubernetes_yaml(content: str) -> str:
+def suggest_remediations_kubernetes_yaml(content: str, documents: list | None = None) -> str:
     """
     Genera sugerencias de remediaciones para manifiestos Kubernetes.
 
+    Se aplican a todos los contenedores (containers, initContainers y
+    ephemeralContainers) de cualquier workload, incluidos Pod y CronJob.
+
     Reglas implementadas:
     - Añadir readOnlyRootFilesystem: true si no está presente.
     - Añadir runAsNonRoot: true si no está presente.
@@ -161,26 +173,22 @@ def suggest_remediations_kubernetes_yaml(content: str) -> str:
 
     Args:
         content (str): Contenido YAML de Kubernetes.
+        documents (list | None): Documentos ya parseados (parse_yaml); se
+            modifican en el sitio. Si es None se parsea el contenido.
 
     Returns:
         str: Contenido modificado con sugerencias aplicadas.
     """
 
-    try:
-        parsed = list(yaml.safe_load_all(content))
-    except Exception:
+    parsed = documents if documents is not None else parse_yaml(content)
+    if parsed is None:
         return content
 
     for doc in parsed:
         if not isinstance(doc, dict):
             continue
 
-        spec = doc.get("spec", {})
-        template = spec.get("template", {})
-        pod_spec = template.get("spec", {})
-        containers = pod_spec.get("containers", [])
-
-        for container in containers:
+        for path, container in iter_containers(doc):
             sc = container.get("securityContext", {})
 
             if "readOnlyRootFilesystem" not in sc:
@@ -192,14 +200,11 @@ def suggest_remediations_kubernetes_yaml(content: str) -> str:
 
             container["securityContext"] = sc
 
-            if "resources" not in container:
+            # Los contenedores efímeros no admiten resources
+            if "resources" not in container and ".ephemeralContainers[" not in path:
                 container["resources"] = {
                     "limits": {"cpu": "500m", "memory": "256Mi"},
                     "requests": {"cpu": "250m", "memory": "128Mi"}
                 }
 
-        template["spec"] = pod_spec
-        spec["template"] = template
-        doc["spec"] = spec
-
-    return yaml.dump_all(parsed, default_flow_style=False)
\ No newline at end of file
+    return dump_yaml_all(parsed)
\ No newline at end of file
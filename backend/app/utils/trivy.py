@@ -0,0 +1,191 @@
+"""
+trivy.py
+
+Análisis de imágenes con trivy con caché por imagen.
+
+- Los resultados se guardan por referencia de imagen, o por digest cuando la
+  referencia lo incluye (imagen@sha256:...), y son compartidos por todos los
+  archivos que usan la misma imagen base.
+- Las entradas se invalidan cuando cambia la versión de la base de datos de
+  vulnerabilidades de trivy (consultada como mucho cada TRIVY_DB_CHECK_INTERVAL
+  segundos) o cuando caduca su TTL (TRIVY_CACHE_TTL).
+- Las peticiones concurrentes de una misma imagen comparten un único proceso
+  trivy en curso en lugar de lanzar uno cada una. Con la caché en disco
+  (CACHE_DIR, app.utils.cache) esto vale también entre procesos: un bloqueo
+  de archivo por imagen hace que solo un worker ejecute trivy y el resto
+  lea su resultado de la caché.
+- Si todas las peticiones que esperan un análisis se cancelan, el proceso
+  trivy se detiene.
+- La caché guarda las vulnerabilidades por columnas (VulnerabilityTable),
+  deduplicadas por (VulnerabilityID, PkgName).
+- Si hay un servidor trivy disponible (app.utils.pool), trivy se ejecuta en
+  modo cliente contra él.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from app.utils.cache import SharedCache
+from app.utils.locks import async_file_lock
+from app.utils.metrics import timed_tool
+from app.utils.pool import trivy_server_url
+from app.utils.runner import ToolTimeoutError, run_tool
+from app.utils.vulns import VulnerabilityTable
+
+TRIVY_CACHE_MAX_ENTRIES = int(os.getenv("TRIVY_CACHE_MAX_ENTRIES", "512"))
+TRIVY_CACHE_TTL = float(os.getenv("TRIVY_CACHE_TTL", "21600"))
+TRIVY_DB_CHECK_INTERVAL = float(os.getenv("TRIVY_DB_CHECK_INTERVAL", "300"))
+
+image_cache = SharedCache(
+    "trivy", TRIVY_CACHE_MAX_ENTRIES, TRIVY_CACHE_TTL,
+    encode=VulnerabilityTable.columns, decode=VulnerabilityTable.from_columns,
+)
+
+_inflight: dict[str, asyncio.Task] = {}
+_waiters: dict[str, int] = {}
+_db_version = {"value": "unknown", "checked_at": None, "task": None}
+
+
+def image_ref_key(image: str) -> str:
+    """
+    Devuelve la parte de la referencia que identifica el contenido de la imagen:
+    el digest si se conoce, o la referencia completa (nombre:tag) en otro caso.
+    """
+    if "@sha256:" in image:
+        return image[image.index("@") + 1:]
+    return image
+
+
+def cached_trivy_db_version() -> str | None:
+    """
+    Devuelve la última versión conocida de la base de datos de trivy sin
+    consultarla, o None si aún no se ha consultado.
+    """
+    return _db_version["value"] if _db_version["checked_at"] is not None else None
+
+
+async def _refresh_db_version() -> str:
+    try:
+        # Fuera del límite de concurrencia de trivy: no espera a los análisis en curso
+        output = await run_tool("trivy", ["version", "--format", "json"], limited=False)
+        db = json.loads(output.stdout).get("VulnerabilityDB") or {}
+        _db_version["value"] = f'{db.get("Version", "")}:{db.get("UpdatedAt", "")}' if db else "unknown"
+    except (OSError, ToolTimeoutError, json.JSONDecodeError, AttributeError):
+        _db_version["value"] = "unknown"
+    _db_version["checked_at"] = time.monotonic()
+    return _db_version["value"]
+
+
+async def trivy_db_version() -> str:
+    """
+    Devuelve la versión de la base de datos de vulnerabilidades de trivy.
+
+    La primera vez espera a la consulta. Después devuelve al momento el
+    último valor conocido y, si tiene más de TRIVY_DB_CHECK_INTERVAL
+    segundos, lanza en segundo plano una consulta nueva (una sola a la vez).
+
+    Returns:
+        str: Versión y fecha de actualización de la base de datos, o "unknown".
+    """
+    checked_at = _db_version["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < TRIVY_DB_CHECK_INTERVAL:
+        return _db_version["value"]
+
+    task = _db_version["task"]
+    if task is None:
+        task = _db_version["task"] = asyncio.ensure_future(_refresh_db_version())
+        task.add_done_callback(lambda _: _db_version.update(task=None))
+    if checked_at is not None:
+        return _db_version["value"]
+    return await asyncio.shield(task)
+
+
+async def run_trivy(image: str):
+    """
+    Ejecuta trivy sobre una imagen y devuelve sus vulnerabilidades como
+    VulnerabilityTable (app.utils.vulns), o {"error"} si la salida no es válida.
+    """
+    args = ["image", "--quiet", "--format", "json"]
+    server = trivy_server_url()
+    if server:
+        args += ["--server", server]
+    output = await run_tool("trivy", args + [image])
+    try:
+        with timed_tool("trivy", "parse"):
+            return VulnerabilityTable.from_trivy(json.loads(output.stdout))
+    except json.JSONDecodeError:
+        return {"error": "Error parsing trivy output"}
+
+
+async def scan_image(image: str):
+    """
+    Analiza una imagen con trivy usando la caché por imagen y compartiendo
+    los análisis en curso.
+
+    Args:
+        image (str): Referencia de la imagen (nombre:tag o nombre@sha256:...).
+
+    Returns:
+        tuple: (resultado, estado) donde estado es "hit" (caché), "shared"
+        (se ha reutilizado un análisis en curso) o "miss".
+
+    Raises:
+        ToolTimeoutError: Si trivy supera su timeout.
+    """
+    # La caché se consulta primero con la última versión conocida de la base
+    # de datos, sin esperar a ninguna consulta de versión
+    known = cached_trivy_db_version()
+    if known is not None:
+        cached = await image_cache.aget(f"{image_ref_key(image)}:{known}")
+        if cached is not None:
+            await trivy_db_version()    # Refresca la versión en segundo plano si toca
+            return cached, "hit"
+
+    key = f"{image_ref_key(image)}:{await trivy_db_version()}"
+    cached = await image_cache.aget(key)
+    if cached is not None:
+        return cached, "hit"
+
+    task = _inflight.get(key)
+    owner = task is None
+    if owner:
+        task = asyncio.ensure_future(_scan_shared(image, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # shield: si se cancela esta petición, el análisis sigue para el resto;
+    # solo se detiene cuando ya no lo espera nadie
+    _waiters[key] = _waiters.get(key, 0) + 1
+    try:
+        result, status = await asyncio.shield(task)
+    finally:
+        _waiters[key] -= 1
+        if not _waiters[key]:
+            del _waiters[key]
+            if not task.done():
+                task.cancel()
+    return result, status if owner else "shared"
+
+
+async def _scan_shared(image: str, key: str) -> tuple:
+    """
+    Ejecuta trivy y guarda el resultado en la caché. Con caché en disco, lo
+    hace bajo el bloqueo de la imagen: si otro proceso la analizó mientras
+    se esperaba el bloqueo, se reutiliza su resultado ("shared").
+    """
+    if image_cache.disk is None:
+        result = await run_trivy(image)
+        if not (isinstance(result, dict) and "error" in result):
+            image_cache.set(key, result)
+        return result, "miss"
+
+    async with async_file_lock(image_cache.disk.lock_path(key)):
+        cached = await image_cache.aget(key)
+        if cached is not None:
+            return cached, "shared"
+        result = await run_trivy(image)
+        if not (isinstance(result, dict) and "error" in result):
+            await image_cache.aset(key, result)
+    return result, "miss"
@@ -0,0 +1,101 @@
+"""
+vulns.py
+
+Representación por columnas de las vulnerabilidades de una imagen.
+
+trivy devuelve un objeto por vulnerabilidad con muchos campos que no se
+usan (referencias, CVSS, descripciones completas...). VulnerabilityTable se
+construye en una sola pasada sobre el JSON de trivy y guarda solo los campos
+necesarios, una lista por campo:
+
+- Deduplica por (VulnerabilityID, PkgName): trivy repite la misma
+  vulnerabilidad en varios targets de la imagen.
+- Recorta Description a DESCRIPTION_MAX_CHARS.
+- Comparte las cadenas repetidas (paquetes, versiones, severidades), de
+  modo que la tabla ocupa mucho menos que una lista de diccionarios.
+
+Es lo que guarda la caché por imagen (app.utils.trivy); en la caché en
+disco se guarda columns() y se reconstruye con from_columns(). Los hallazgos
+normalizados se generan directamente desde las columnas
+(app.utils.parsers.normalize_trivy) y la lista de diccionarios del informe
+solo se construye con records() al componer la respuesta.
+"""
+
+DESCRIPTION_MAX_CHARS = 200
+
+# Campos del informe por vulnerabilidad, en el orden de las columnas
+FIELDS = ("VulnerabilityID", "PkgName", "InstalledVersion", "FixedVersion", "Severity", "Title", "Description")
+
+
+class VulnerabilityTable:
+    """
+    Vulnerabilidades de una imagen como listas paralelas (una por campo de FIELDS).
+    """
+
+    __slots__ = ("ids", "packages", "installed", "fixed", "severities", "titles", "descriptions")
+
+    def __init__(self):
+        self.ids = []
+        self.packages = []
+        self.installed = []
+        self.fixed = []
+        self.severities = []
+        self.titles = []
+        self.descriptions = []
+
+    @classmethod
+    def from_trivy(cls, data: dict) -> "VulnerabilityTable":
+        """
+        Construye la tabla a partir de la salida JSON de trivy image.
+        """
+        table = cls()
+        seen = set()
+        shared = {}
+        share = shared.setdefault
+        for target in data.get("Results") or []:
+            for vuln in target.get("Vulnerabilities") or []:
+                key = (vuln.get("VulnerabilityID"), vuln.get("PkgName"))
+                if key in seen:
+                    continue
+                seen.add(key)
+                table.ids.append(key[0])
+                table.packages.append(share(key[1], key[1]))
+                installed = vuln.get("InstalledVersion")
+                table.installed.append(share(installed, installed))
+                fixed = vuln.get("FixedVersion")
+                table.fixed.append(share(fixed, fixed))
+                severity = vuln.get("Severity")
+                table.severities.append(share(severity, severity))
+                table.titles.append(vuln.get("Title"))
+                table.descriptions.append((vuln.get("Description") or "")[:DESCRIPTION_MAX_CHARS])
+        return table
+
+    @classmethod
+    def from_columns(cls, columns: list) -> "VulnerabilityTable":
+        """
+        Reconstruye la tabla a partir de columns() (p.ej. leída de la caché en
+        disco), volviendo a compartir las cadenas repetidas.
+        """
+        table = cls()
+        shared = {}
+        share = shared.setdefault
+        (table.ids, packages, installed, fixed, severities, table.titles, table.descriptions) = columns
+        table.packages = [share(value, value) for value in packages]
+        table.installed = [share(value, value) for value in installed]
+        table.fixed = [share(value, value) for value in fixed]
+        table.severities = [share(value, value) for value in severities]
+        return table
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def columns(self) -> tuple:
+        return (self.ids, self.packages, self.installed, self.fixed,
+                self.severities, self.titles, self.descriptions)
+
+    def records(self) -> list:
+        """
+        Devuelve las vulnerabilidades como lista de diccionarios (formato del
+        informe de /scan/).
+        """
+        return [dict(zip(FIELDS, row)) for row in zip(*self.columns())]
@@ -0,0 +1,10 @@
+"""
+bench
+
+Benchmarks reproducibles del backend: /scan/ de extremo a extremo con
+herramientas falsas de latencia y salida controladas, normalizadores,
+remediaciones y reglas internas con archivos de 1 KB a 10 MB generados a
+partir de inputs/, e historial en SQLite de 1.000 a 1.000.000 de entradas.
+
+Uso (desde backend/): python -m bench run --output bench.json
+"""
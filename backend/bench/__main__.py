@@ -0,0 +1,169 @@
+"""
+Punto de entrada de los benchmarks (ejecutar desde backend/).
+
+    python -m bench run [--suites scan,parsers,suggestions,storage,startup] [--output bench.json]
+    python -m bench compare base.json nuevo.json
+
+run escribe un JSON con los metadatos de la ejecución (commit, versión de
+Python, parámetros) y los resultados de cada suite (ver bench.suites).
+compare muestra la variación de p50 y p99 entre dos ejecuciones.
+
+Con --startup-budget, run termina con error si la mediana de importación de
+app.main supera el presupuesto (para usarlo en CI).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from bench import fake_tools
+from bench.corpus import parse_size
+
+SUITES = ("scan", "parsers", "suggestions", "storage", "startup")
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _size_list(value: str) -> list[int]:
+    return [parse_size(item) for item in value.split(",") if item]
+
+
+def _git_commit() -> str | None:
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure_environment(args, workdir: str):
+    """
+    Prepara el entorno antes de importar la aplicación: herramientas falsas
+    en el PATH, base de datos y directorios temporales y sin servidor trivy.
+    """
+    tools_dir = fake_tools.install(os.path.join(workdir, "tools"))
+    os.environ["PATH"] = tools_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["BENCH_TOOL_LATENCY"] = str(args.tool_latency)
+    os.environ["BENCH_TOOL_FINDINGS"] = str(args.tool_findings)
+    os.environ["RESULTS_DB_PATH"] = os.path.join(workdir, "results.db")
+    os.environ["JOB_DIR"] = os.path.join(workdir, "jobs")
+    os.environ["TRIVY_SERVER"] = "0"
+    os.environ.pop("TRIVY_SERVER_URL", None)
+
+
+def run(args):
+    suites = [suite for suite in args.suites.split(",") if suite]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Suites desconocidas: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="auditor-bench-") as workdir:
+        _configure_environment(args, workdir)
+        from bench import suites as bench_suites
+
+        results = []
+        for suite in suites:
+            print(f"[bench] {suite}...", file=sys.stderr)
+            if suite == "scan":
+                results += bench_suites.run_scan(args.concurrency, args.requests, args.scan_size, args.cache)
+            elif suite == "parsers":
+                results += bench_suites.run_parsers(args.findings, args.repeat)
+            elif suite == "suggestions":
+                results += bench_suites.run_suggestions(args.sizes, args.repeat)
+            elif suite == "storage":
+                results += bench_suites.run_storage(
+                    args.history_sizes, args.samples, args.repeat, workdir, args.load_all_max
+                )
+            elif suite == "startup":
+                results += bench_suites.run_startup(args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key != "func"},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"[bench] {len(results)} resultados en {args.output}", file=sys.stderr)
+
+    if args.startup_budget is not None:
+        startup = next((r for r in results if r["suite"] == "startup" and r["name"] == "import_app_main"), None)
+        if startup is not None and startup["stats"]["p50"] * 1000 > args.startup_budget:
+            raise SystemExit(
+                f"[bench] La importación de app.main tarda {startup['stats']['p50'] * 1000:.0f} ms "
+                f"(presupuesto: {args.startup_budget:g} ms)"
+            )
+
+
+def _result_key(result: dict) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['suite']}/{result['name']}[{params}]"
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = {_result_key(result): result["stats"] for result in json.load(f)["results"]}
+    with open(args.new) as f:
+        new = {_result_key(result): result["stats"] for result in json.load(f)["results"]}
+
+    print(f"{'benchmark':<70} {'p50 base':>10} {'p50 nuevo':>10} {'Δp50':>8} {'Δp99':>8}")
+    for key in sorted(base.keys() & new.keys()):
+        old_stats, new_stats = base[key], new[key]
+        deltas = [
+            f"{(new_stats[p] / old_stats[p] - 1) * 100:+.1f}%" if old_stats[p] else "n/a"
+            for p in ("p50", "p99")
+        ]
+        print(f"{key:<70} {old_stats['p50'] * 1000:>8.2f}ms {new_stats['p50'] * 1000:>8.2f}ms {deltas[0]:>8} {deltas[1]:>8}")
+    for key in sorted(base.keys() ^ new.keys()):
+        print(f"{key:<70} (solo en {'base' if key in base else 'nuevo'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks del backend")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Ejecuta las suites y guarda los resultados en JSON")
+    run_parser.add_argument("--suites", default=",".join(SUITES), help="Suites separadas por comas")
+    run_parser.add_argument("--output", default="bench.json", help="Archivo JSON de resultados (- para stdout)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Repeticiones de cada medida")
+    run_parser.add_argument("--tool-latency", type=float, default=0.05, help="Segundos por ejecución de herramienta falsa")
+    run_parser.add_argument("--tool-findings", type=int, default=5, help="Hallazgos por archivo de las herramientas falsas")
+    run_parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16], help="Niveles de concurrencia (scan)")
+    run_parser.add_argument("--requests", type=int, default=32, help="Peticiones por serie (scan)")
+    run_parser.add_argument("--scan-size", type=parse_size, default=parse_size("4K"), help="Tamaño de los archivos subidos (scan)")
+    run_parser.add_argument("--cache", action="store_true", help="Repite el mismo contenido para medir la caché (scan)")
+    run_parser.add_argument("--findings", type=_int_list, default=[10, 1000, 10000], help="Hallazgos por salida (parsers)")
+    run_parser.add_argument("--sizes", type=_size_list, default=_size_list("1K,100K,1M,10M"), help="Tamaños de archivo (suggestions)")
+    run_parser.add_argument("--history-sizes", type=_int_list, default=[1000, 10000, 100000], help="Tamaños del historial (storage), p.ej. 1000,1000000")
+    run_parser.add_argument("--samples", type=int, default=200, help="Inserciones medidas por tamaño de historial (storage)")
+    run_parser.add_argument("--load-all-max", type=int, default=100000, help="Historial máximo para medir load_all_results (storage)")
+    run_parser.add_argument("--startup-budget", type=float, default=None, help="Máximo en ms para importar app.main (startup)")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compara dos ejecuciones")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
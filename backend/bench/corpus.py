@@ -0,0 +1,80 @@
+"""
+corpus.py
+
+Generación de archivos de prueba de un tamaño dado a partir de los ejemplos
+de inputs/ (Dockerfile.insecure, docker-compose.yaml y deployment.yaml).
+
+- Dockerfile: se repiten las instrucciones RUN del ejemplo.
+- docker-compose: se repiten los servicios con nombres distintos.
+- Kubernetes: se repiten los documentos con metadata.name distintos.
+
+El contenido depende solo de la semilla y del tamaño, de modo que los
+resultados entre ejecuciones son comparables.
+"""
+
+import os
+
+INPUTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "inputs")
+
+SEEDS = {
+    "Dockerfile": "Dockerfile.insecure",
+    "docker-compose.yaml": "docker-compose.yaml",
+    "deployment.yaml": "deployment.yaml",
+}
+
+
+def read_seed(filename: str) -> str:
+    """
+    Devuelve el contenido del ejemplo de inputs/ correspondiente a un tipo de archivo.
+    """
+    with open(os.path.join(INPUTS_DIR, SEEDS[filename]), encoding="utf-8") as f:
+        return f.read()
+
+
+def _grow(header: str, block, size: int) -> str:
+    parts = [header]
+    length = len(header)
+    index = 0
+    while length < size:
+        part = block(index)
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return "".join(parts)
+
+
+def generate(filename: str, size: int, variant: int = 0) -> str:
+    """
+    Genera un archivo del tipo indicado de aproximadamente size bytes.
+
+    Args:
+        filename (str): Dockerfile, docker-compose.yaml o deployment.yaml.
+        size (int): Tamaño aproximado en bytes (como mínimo el del ejemplo).
+        variant (int): Cambia el contenido (y por tanto su hash) sin cambiar su tamaño,
+            para evitar la caché por contenido.
+
+    Returns:
+        str: Contenido generado.
+    """
+    seed = read_seed(filename)
+    marker = f"# bench variant {variant:08d}\n"
+
+    if filename == "Dockerfile":
+        return _grow(marker + seed, lambda i: f"RUN echo bench-{i} > /tmp/bench-{i}\n", size)
+
+    if filename == "docker-compose.yaml":
+        services = seed.split("services:\n", 1)[1]
+        return _grow(marker + seed, lambda i: services.replace("  web:", f"  web{i}:", 1), size)
+
+    return _grow(marker + seed, lambda i: "---\n" + seed.replace("name: insecure-app", f"name: insecure-app-{i}"), size)
+
+
+def parse_size(value: str) -> int:
+    """
+    Convierte tamaños como 1K, 100K, 1M o 10M en bytes.
+    """
+    value = value.strip().upper()
+    units = {"K": 1024, "M": 1024 * 1024}
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
@@ -0,0 +1,114 @@
+"""
+fake_tools.py
+
+Sustitutos de hadolint, dclint, kube-linter y trivy para los benchmarks.
+
+Cada herramienta se instala como un script ejecutable en un directorio que se
+antepone al PATH, con la misma interfaz de línea de comandos y el mismo
+formato JSON de salida que la real. kube-linter informa de cada objeto por
+separado (K8sObject) y emula dangling-service: un Service cuyo selector no
+coincide con las etiquetas de ningún pod del mismo archivo. La latencia y el
+tamaño de la salida se controlan con variables de entorno:
+
+    BENCH_TOOL_LATENCY      # Segundos que tarda cada ejecución (por defecto 0.05)
+    BENCH_TOOL_FINDINGS     # Hallazgos por archivo (o vulnerabilidades por imagen)
+"""
+
+import os
+import stat
+import sys
+
+_SCRIPT = '''#!{python}
+import json, os, sys, time
+
+TOOL = {tool!r}
+LATENCY = float(os.getenv("BENCH_TOOL_LATENCY", "0.05"))
+FINDINGS = int(os.getenv("BENCH_TOOL_FINDINGS", "5"))
+args = sys.argv[1:]
+
+if args[:1] in (["--version"], ["version"]):
+    if TOOL == "trivy":
+        print(json.dumps({{"Version": "bench", "VulnerabilityDB": {{"Version": 2, "UpdatedAt": "bench"}}}}))
+    else:
+        print(TOOL + " bench")
+    sys.exit(0)
+
+if TOOL == "trivy" and args[:1] == ["server"]:
+    sys.exit(1)
+
+time.sleep(LATENCY)
+paths = [arg for arg in args if os.path.isfile(arg)]
+
+if TOOL == "hadolint":
+    output = [
+        {{"code": "DL%04d" % i, "level": "warning", "message": "bench finding %d" % i, "line": i + 1, "file": path}}
+        for path in paths for i in range(FINDINGS)
+    ]
+elif TOOL == "dclint":
+    output = [
+        {{"filePath": path, "messages": [
+            {{"rule": "bench-%d" % i, "severity": "minor", "message": "bench finding %d" % i, "line": i + 1}}
+            for i in range(FINDINGS)
+        ]}}
+        for path in paths
+    ]
+elif TOOL == "kube-linter":
+    import yaml
+
+    def report(path, check, message, doc):
+        metadata = doc.get("metadata") or {{}}
+        return {{"Check": check, "Diagnostic": {{"Message": message}}, "Remediation": "bench",
+                 "Object": {{"Metadata": {{"FilePath": path}}, "K8sObject": {{
+                     "GroupVersionKind": {{"Kind": doc.get("kind")}},
+                     "Namespace": metadata.get("namespace", ""), "Name": metadata.get("name")}}}}}}
+
+    def pod_labels(doc):
+        if doc.get("kind") == "Pod":
+            return (doc.get("metadata") or {{}}).get("labels") or {{}}
+        template = (doc.get("spec") or {{}}).get("template") or {{}}
+        return (template.get("metadata") or {{}}).get("labels") or {{}}
+
+    reports = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                docs = [doc for doc in yaml.safe_load_all(f) if isinstance(doc, dict)]
+        except yaml.YAMLError:
+            docs = []
+        for doc in docs:
+            reports += [report(path, "bench-%d" % i, "bench finding %d" % i, doc) for i in range(FINDINGS)]
+            selector = (doc.get("spec") or {{}}).get("selector") if doc.get("kind") == "Service" else None
+            if selector and not any(selector.items() <= pod_labels(other).items() for other in docs):
+                reports.append(report(path, "dangling-service", "no pods found matching service labels", doc))
+    output = {{"Reports": reports}}
+else:
+    output = {{"Results": [{{"Target": args[-1], "Vulnerabilities": [
+        {{"VulnerabilityID": "CVE-BENCH-%d" % i, "PkgName": "pkg%d" % i, "InstalledVersion": "1.0",
+          "FixedVersion": "1.1", "Severity": "HIGH", "Title": "bench vulnerability %d" % i,
+          "Description": "x" * 300}}
+        for i in range(FINDINGS)
+    ]}}]}}
+
+print(json.dumps(output))
+'''
+
+TOOLS = ("hadolint", "dclint", "kube-linter", "trivy")
+
+
+def install(directory: str) -> str:
+    """
+    Escribe las herramientas falsas en un directorio.
+
+    Args:
+        directory (str): Directorio destino (se crea si no existe).
+
+    Returns:
+        str: El directorio, para anteponerlo al PATH.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for tool in TOOLS:
+        path = os.path.join(directory, tool)
+        with open(path, "w") as f:
+            f.write(_SCRIPT.format(python=sys.executable, tool=tool))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return directory
@@ -0,0 +1,296 @@
+"""
+suites.py
+
+Benchmarks del backend. Cada suite devuelve una lista de resultados con el
+formato:
+
+{
+    "suite": str,       # scan, parsers, suggestions, storage o startup
+    "name": str,        # Operación medida
+    "params": dict,     # Parámetros (concurrencia, tamaño, historial...)
+    "stats": {
+        "n": int,               # Número de muestras
+        "mean": float,          # Segundos
+        "p50": float,
+        "p90": float,
+        "p99": float,
+        "min": float,
+        "max": float,
+        "throughput": float     # Operaciones por segundo
+    }
+}
+
+Las suites importan la aplicación de forma diferida: __main__ configura antes
+el entorno (PATH con las herramientas falsas y base de datos temporal).
+"""
+
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+
+from bench.corpus import SEEDS, generate
+
+FILE_TYPES = tuple(SEEDS)
+
+
+def summarize(durations: list[float], wall: float | None = None) -> dict:
+    """
+    Calcula las estadísticas de una serie de duraciones en segundos.
+
+    Args:
+        durations (list[float]): Duración de cada operación.
+        wall (float | None): Tiempo total transcurrido, para el throughput con
+            operaciones concurrentes; si es None se usa la suma de duraciones.
+    """
+    ordered = sorted(durations)
+    n = len(ordered)
+
+    def percentile(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * n) - 1)] if n else 0.0
+
+    total = wall if wall is not None else sum(ordered)
+    return {
+        "n": n,
+        "mean": sum(ordered) / n if n else 0.0,
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "min": ordered[0] if n else 0.0,
+        "max": ordered[-1] if n else 0.0,
+        "throughput": n / total if total else 0.0,
+    }
+
+
+def _measure(func, repeat: int) -> list[float]:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _result(suite: str, name: str, params: dict, durations: list[float], wall: float | None = None) -> dict:
+    return {"suite": suite, "name": name, "params": params, "stats": summarize(durations, wall)}
+
+
+def run_scan(concurrency: list[int], requests: int, size: int, cache: bool = False) -> list:
+    """
+    Mide POST /scan/ (latencia y throughput) con distintos niveles de
+    concurrencia, para cada tipo de archivo.
+
+    Args:
+        concurrency (list[int]): Peticiones simultáneas.
+        requests (int): Peticiones por tipo de archivo y nivel de concurrencia.
+        size (int): Tamaño de los archivos subidos en bytes.
+        cache (bool): Si es False cada petición sube un contenido distinto y
+            se vacían las cachés antes de cada serie.
+    """
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("La suite scan necesita httpx (pip install httpx)")
+
+    from app.main import app
+    from app.utils.cache import scan_cache
+    from app.utils.trivy import image_cache
+
+    async def series(filename: str, level: int) -> tuple[list[float], float]:
+        semaphore = asyncio.Semaphore(level)
+        transport = httpx.ASGITransport(app=app)
+        durations = []
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def one(index: int):
+                content = generate(filename, size, 0 if cache else index)
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/scan/", files={"file": (filename, content.encode())})
+                    durations.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(index) for index in range(requests)))
+            return durations, time.perf_counter() - start
+
+    results = []
+    for level in concurrency:
+        for filename in FILE_TYPES:
+            if not cache:
+                scan_cache.clear()
+                image_cache.clear()
+            durations, wall = asyncio.run(series(filename, level))
+            params = {"file": filename, "concurrency": level, "size": size, "cache": cache}
+            results.append(_result("scan", "scan_file", params, durations, wall))
+    return results
+
+
+def _raw_outputs(findings: int) -> dict:
+    return {
+        "hadolint": [
+            {"code": f"DL{i:04d}", "level": "warning", "message": f"finding {i}", "line": i, "file": "Dockerfile"}
+            for i in range(findings)
+        ],
+        "dclint": [{"filePath": "docker-compose.yaml", "messages": [
+            {"rule": f"rule-{i}", "severity": "minor", "message": f"finding {i}", "line": i}
+            for i in range(findings)
+        ]}],
+        "kube-linter": {"Reports": [
+            {"Check": f"check-{i}", "Diagnostic": {"Message": f"finding {i}"}, "Remediation": "fix",
+             "Object": {"Metadata": {"FilePath": "deployment.yaml"}}}
+            for i in range(findings)
+        ]},
+        "trivy": [
+            {"VulnerabilityID": f"CVE-{i}", "PkgName": f"pkg{i}", "InstalledVersion": "1", "FixedVersion": "2",
+             "Severity": "HIGH", "Title": f"vulnerability {i}", "Description": "x" * 200}
+            for i in range(findings)
+        ],
+    }
+
+
+def run_parsers(findings_counts: list[int], repeat: int) -> list:
+    """
+    Mide los normalizadores de app.utils.parsers con salidas de distinto tamaño.
+    """
+    from app.utils.pipeline import NORMALIZERS
+
+    results = []
+    for findings in findings_counts:
+        for tool, data in _raw_outputs(findings).items():
+            durations = _measure(lambda: NORMALIZERS[tool](data, "bench"), repeat)
+            results.append(_result("parsers", f"normalize_{tool}", {"findings": findings}, durations))
+    return results
+
+
+def run_suggestions(sizes: list[int], repeat: int) -> list:
+    """
+    Mide el parseo YAML, las reglas internas y las remediaciones de
+    app.utils.suggestions con archivos de distinto tamaño.
+    """
+    from app.utils.manifests import parse_yaml
+    from app.utils.pipeline import NATIVE_CHECKS, REMEDIATORS, detect_linter
+
+    results = []
+    for size in sizes:
+        for filename in FILE_TYPES:
+            content = generate(filename, size)
+            linter = detect_linter(filename)
+            params = {"file": filename, "size": len(content.encode())}
+
+            if linter == "hadolint":
+                remediate = lambda: REMEDIATORS[linter](content)
+                check = lambda: NATIVE_CHECKS[linter](content, filename)
+            else:
+                # Los remediadores modifican los documentos: se parsean en cada repetición
+                remediate = lambda: REMEDIATORS[linter](content, parse_yaml(content))
+                documents = parse_yaml(content)
+                check = lambda: NATIVE_CHECKS[linter](content, filename, documents)
+                results.append(_result("suggestions", "parse_yaml", params, _measure(lambda: parse_yaml(content), repeat)))
+
+            results.append(_result("suggestions", f"remediate_{linter}", params, _measure(remediate, repeat)))
+            if linter in NATIVE_CHECKS:
+                results.append(_result("suggestions", f"native_checks_{linter}", params, _measure(check, repeat)))
+    return results
+
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _import_time(module: str) -> tuple[float, dict]:
+    """
+    Importa un módulo en un intérprete nuevo con python -X importtime.
+
+    Returns:
+        tuple: (tiempo acumulado del módulo en segundos, {módulo: tiempo
+        acumulado} de los módulos importados)
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1e6
+    return modules.get(module, 0.0), modules
+
+
+def run_startup(repeat: int) -> list:
+    """
+    Mide el arranque en frío: importación de app.main (python -X importtime,
+    un intérprete nuevo por repetición) y los módulos de la aplicación y
+    dependencias pesadas que más tardan.
+    """
+    durations, modules = [], {}
+    for _ in range(repeat):
+        duration, times = _import_time("app.main")
+        durations.append(duration)
+        for name, value in times.items():
+            modules.setdefault(name, []).append(value)
+
+    results = [_result("startup", "import_app_main", {}, durations)]
+    tracked = [name for name in modules if name != "app.main" and (name.startswith("app.") or name in ("fastapi", "yaml", "sqlite3"))]
+    for name in sorted(tracked, key=lambda name: -sorted(modules[name])[len(modules[name]) // 2])[:15]:
+        results.append(_result("startup", "import", {"module": name}, modules[name]))
+    return results
+
+
+def _history_entry(index: int) -> dict:
+    filename = FILE_TYPES[index % len(FILE_TYPES)]
+    return {
+        "filename": filename,
+        "original_content": generate(filename, 0),
+        "suggested_content": generate(filename, 0, 1),
+        "tools_run": ["hadolint", "trivy"],
+        "tool_status": {"hadolint": "ok", "trivy": "ok"},
+        "results": {"hadolint": [], "trivy": []},
+        "normalized_findings": [
+            {"tool": "trivy", "file": filename, "rule": f"CVE-{i}", "severity": "HIGH",
+             "message": "bench", "line": None, "fix": "2"}
+            for i in range(index % 10)
+        ],
+    }
+
+
+def run_storage(history_sizes: list[int], samples: int, repeat: int, db_dir: str, load_all_max: int) -> list:
+    """
+    Mide app.utils.storage con historiales de distinto tamaño: inserción,
+    primera página del historial (resumen y filtrada), lectura por id y, hasta
+    load_all_max entradas, load_all_results().
+    """
+    from app.utils import storage
+
+    results = []
+    for history_size in sorted(history_sizes):
+        storage.DB_PATH = os.path.join(db_dir, f"history-{history_size}.db")
+        for path in (storage.DB_PATH, storage.DB_PATH + "-wal", storage.DB_PATH + "-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+        entries = [_history_entry(index) for index in range(len(FILE_TYPES) * 10)]
+        save_durations = []
+        for index in range(history_size):
+            start = time.perf_counter()
+            last_id = storage.save_result(entries[index % len(entries)])
+            if index >= history_size - samples:
+                save_durations.append(time.perf_counter() - start)
+
+        params = {"history": history_size}
+        results.append(_result("storage", "save_result", params, save_durations))
+        results.append(_result("storage", "history_page", params, _measure(
+            lambda: list(storage.iter_results(limit=50, fields=["id", "timestamp", "filename"])), repeat)))
+        results.append(_result("storage", "history_page_full", params, _measure(
+            lambda: list(storage.iter_results(limit=50)), repeat)))
+        results.append(_result("storage", "history_page_filtered", params, _measure(
+            lambda: list(storage.iter_results(limit=50, severity="high", fields=["id", "findings_count"])), repeat)))
+        results.append(_result("storage", "get_result", params, _measure(
+            lambda: storage.get_result(last_id // 2 or 1), repeat)))
+        if history_size <= load_all_max:
+            results.append(_result("storage", "load_all_results", params, _measure(storage.load_all_results, repeat)))
+    return results
@@ -0,0 +1,14 @@
+"""
+conftest.py
+
+Configuración común de los tests: el historial y la caché en disco se
+guardan en un directorio temporal, nunca en el directorio de trabajo.
+"""
+
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="auditor-tests-")
+os.environ.setdefault("RESULTS_DB_PATH", os.path.join(_TMP, "results.db"))
+os.environ.setdefault("TRIVY_SERVER", "0")
+os.environ.pop("CACHE_DIR", None)
@@ -0,0 +1,73 @@
+"""
+test_archives.py
+
+Extracción de archivos comprimidos para /scan/batch.
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.archives import ArchiveError, extract_archive
+
+
+def _zip(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _tar_gz(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def _zeroed_zip() -> bytes:
+    data = bytearray(_zip({"Dockerfile": "FROM alpine:3\n" * 200}))
+    data[30:70] = b"\0" * 40
+    return bytes(data)
+
+
+def _truncated_tar_gz() -> bytes:
+    data = _tar_gz({"Dockerfile": os.urandom(20000)})
+    return data[:len(data) // 2]
+
+
+def test_extracts_regular_files_without_original_paths(tmp_path):
+    archive = tmp_path / "a.tar.gz"
+    archive.write_bytes(_tar_gz({"../etc/Dockerfile": b"FROM alpine:3\n", "k8s/app.yaml": b"kind: Pod\n"}))
+    dest = tmp_path / "out"
+    dest.mkdir()
+
+    extracted = extract_archive(str(archive), str(dest))
+
+    assert [name for name, _ in extracted] == ["../etc/Dockerfile", "k8s/app.yaml"]
+    assert all(os.path.dirname(path) == str(dest) for _, path in extracted)
+
+
+@pytest.mark.parametrize("data", [_zeroed_zip(), _truncated_tar_gz(), b"PK\x03\x04garbage"])
+def test_damaged_archive_raises_archive_error(tmp_path, data):
+    archive = tmp_path / "archive"
+    archive.write_bytes(data)
+
+    with pytest.raises(ArchiveError):
+        extract_archive(str(archive), str(tmp_path))
+
+
+@pytest.mark.parametrize("filename, data", [("a.zip", _zeroed_zip()), ("a.tar.gz", _truncated_tar_gz())])
+def test_batch_rejects_damaged_archive(filename, data):
+    response = TestClient(app).post("/scan/batch", files={"archive": (filename, data)})
+
+    assert response.status_code == 400
@@ -0,0 +1,170 @@
+"""
+test_incremental.py
+
+Reanálisis incremental de manifiestos Kubernetes: el resultado de un
+reanálisis incremental debe ser igual al de un análisis completo del mismo
+contenido. Usa las herramientas falsas de bench, cuyo kube-linter informa
+de cada objeto y emula dangling-service.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils import pipeline, runner
+from app.utils.incremental import plan_rescan
+from app.utils.storage import get_result
+from bench import fake_tools
+
+SERVICE = """apiVersion: v1
+kind: Service
+metadata:
+  name: web-svc
+spec:
+  selector:
+    app: web
+  ports:
+    - port: {port}
+"""
+
+DEPLOYMENT = """apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: {name}
+spec:
+  selector:
+    matchLabels:
+      app: {name}
+  template:
+    metadata:
+      labels:
+        app: {name}
+    spec:
+      containers:
+        - name: main
+          image: {image}
+"""
+
+CONFIG_MAP = """apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: settings
+data:
+  key: {value}
+"""
+
+
+def manifest(*documents: str) -> str:
+    return "---\n".join(documents)
+
+
+BASE = manifest(
+    SERVICE.format(port=80),
+    DEPLOYMENT.format(name="web", image="nginx:1.1"),
+    DEPLOYMENT.format(name="worker", image="redis:6"),
+    CONFIG_MAP.format(value="a"),
+)
+
+
+@pytest.fixture(autouse=True)
+def fake_tools_path(tmp_path, monkeypatch):
+    directory = fake_tools.install(str(tmp_path / "bin"))
+    monkeypatch.setenv("PATH", directory, prepend=":")
+    monkeypatch.setenv("BENCH_TOOL_LATENCY", "0")
+    monkeypatch.setenv("BENCH_TOOL_FINDINGS", "2")
+    monkeypatch.setattr(runner, "_paths", {})
+    monkeypatch.setattr(runner, "_versions", {})
+    monkeypatch.setattr(runner, "_semaphores", {})
+    monkeypatch.setattr(pipeline, "LINTER_BATCH_TOOLS", [])
+
+
+def _scan(tmp_path, content: str, previous: dict | None = None) -> dict:
+    path = tmp_path / "upload.yaml"
+    path.write_text(content)
+    return asyncio.run(pipeline.analyze_file("app.yaml", str(path), previous=previous))
+
+
+def _findings(response: dict) -> list:
+    return sorted(
+        (f["tool"], f.get("object"), f["rule"], f["message"], f.get("image"))
+        for f in response["normalized_findings"]
+    )
+
+
+def _reports(response: dict) -> list:
+    return sorted(
+        (report["Object"]["K8sObject"]["Name"], report["Check"])
+        for report in response["results"]["kube-linter"]["Reports"]
+    )
+
+
+def _rescan(tmp_path, new_content: str) -> tuple[dict, dict]:
+    """
+    Analiza BASE y después new_content de forma incremental y completa.
+    """
+    previous = get_result(_scan(tmp_path, BASE)["id"])
+    incremental = _scan(tmp_path, new_content, previous)
+    full = _scan(tmp_path, new_content)
+    assert _findings(incremental) == _findings(full)
+    assert _reports(incremental) == _reports(full)
+    assert incremental["suggested_content"] == full["suggested_content"]
+    return incremental, full
+
+
+def test_edited_unit_is_rescanned_alone(tmp_path):
+    new = BASE.replace("redis:6", "redis:7")
+
+    incremental, _ = _rescan(tmp_path, new)
+
+    assert incremental["incremental"]["tools"]["kube-linter"] == "partial"
+    assert incremental["incremental"]["changed"] == ["Deployment/worker"]
+    assert incremental["incremental"]["relinted"] == []
+
+
+def test_removed_unit_reports_are_dropped(tmp_path):
+    new = manifest(
+        SERVICE.format(port=80),
+        DEPLOYMENT.format(name="web", image="nginx:1.1"),
+        CONFIG_MAP.format(value="a"),
+    )
+
+    incremental, _ = _rescan(tmp_path, new)
+
+    assert incremental["incremental"]["tools"]["kube-linter"] == "reused"
+    assert "worker" not in {name for name, _ in _reports(incremental)}
+
+
+def test_related_object_is_relinted(tmp_path):
+    # Sin la Deployment, el Service queda colgando: hay que volver a analizarlo
+    new = manifest(
+        SERVICE.format(port=80),
+        DEPLOYMENT.format(name="worker", image="redis:6"),
+        CONFIG_MAP.format(value="a"),
+    )
+
+    incremental, _ = _rescan(tmp_path, new)
+
+    assert incremental["incremental"]["relinted"] == ["Service/web-svc"]
+    assert ("web-svc", "dangling-service") in _reports(incremental)
+
+
+def test_edited_service_relints_its_deployment(tmp_path):
+    new = BASE.replace("port: 80", "port: 81")
+
+    incremental, _ = _rescan(tmp_path, new)
+
+    assert incremental["incremental"]["relinted"] == ["Deployment/web"]
+    assert ("web-svc", "dangling-service") not in _reports(incremental)
+
+
+def test_plan_blanks_only_unrelated_units():
+    new = BASE.replace("port: 80", "port: 81")
+
+    plan = plan_rescan("kube-linter", BASE, new)
+
+    assert plan["changed_labels"] == {"Service/web-svc"}
+    assert plan["relinted_labels"] == {"Deployment/web"}
+    assert plan["reused_labels"] == {"Deployment/worker", "ConfigMap/settings"}
+    assert "redis:6" not in plan["partial_content"]
+    assert "nginx:1.1" in plan["partial_content"]
+    assert len(plan["partial_content"].splitlines()) == len(new.splitlines())
@@ -0,0 +1,28 @@
+"""
+test_runner.py
+
+Consulta de versiones de las herramientas.
+"""
+
+import asyncio
+
+from app.utils import runner
+
+
+def test_failed_version_query_is_retried(monkeypatch):
+    answers = iter([runner.UNKNOWN_VERSION, "hadolint 2.12.0"])
+    calls = []
+
+    async def query_version(tool):
+        calls.append(tool)
+        return next(answers)
+
+    monkeypatch.setattr(runner, "_query_version", query_version)
+    monkeypatch.setattr(runner, "_versions", {})
+
+    async def versions():
+        return [await runner.tool_version("hadolint") for _ in range(3)]
+
+    assert asyncio.run(versions()) == [runner.UNKNOWN_VERSION, "hadolint 2.12.0", "hadolint 2.12.0"]
+    assert len(calls) == 2
+    assert runner.tool_inventory()["tools"]["hadolint"]["version"] == "hadolint 2.12.0"
@@ -9,18 +9,21 @@ function App() {
   const [error, setError] = useState<string | null>(null);
   const [severityFilter, setSeverityFilter] = useState<string>("all");
   const [history, setHistory] = useState<any[]>([]);
+  const [historyCursor, setHistoryCursor] = useState<number | null>(null);
   const [selectedEntry, setSelectedEntry] = useState<any | null>(null);
 
   useEffect(() => {
     fetchHistory();
   }, []);
 
-  // Cargar historial de análisis
-  const fetchHistory = async () => {
+  // Cargar historial de análisis (primera página, o la siguiente si se pasa cursor)
+  const fetchHistory = async (cursor: number | null = null) => {
     try {
-      const res = await fetch("http://localhost:8000/history/");
+      const params = cursor === null ? "" : `&cursor=${cursor}`;
+      const res = await fetch(`http://localhost:8000/history/?fields=id,timestamp,filename${params}`);
       const data = await res.json();
-      setHistory(data.history);
+      setHistory(previous => cursor === null ? data.history : [...previous, ...data.history]);
+      setHistoryCursor(data.next_cursor ?? null);
     } catch {
       console.error("No se pudo cargar el historial.");
     }
@@ -121,8 +124,9 @@ function App() {
                 {history.map((entry) => (
                   <li key={entry.id}>
                     <button
-                      onClick={() => {
-                        setSelectedEntry(entry);
+                      onClick={async () => {
+                        const res = await fetch(`http://localhost:8000/history/${entry.id}`);
+                        setSelectedEntry(await res.json());
                         setResponse(null);
                       }}
                       className="text-blue-600 hover:underline text-sm"
@@ -133,6 +137,14 @@ function App() {
                 ))}
               </ul>
             )}
+            {historyCursor !== null && (
+              <button
+                onClick={() => fetchHistory(historyCursor)}
+                className="mt-4 text-blue-600 hover:underline text-sm"
+              >
+                Cargar más
+              </button>
+            )}
           </section>
 
           {/* Resultados */}